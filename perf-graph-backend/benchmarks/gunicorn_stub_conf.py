@@ -0,0 +1,27 @@
+"""
+`src/gunicorn_conf.py` with the stubs from `stubs.py` installed in every worker after fork, for
+`worker_scaling.py`. The stubs are configured through the BENCH_* environment variables that script sets.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gunicorn_conf import *  # noqa: E402,F401,F403
+from gunicorn_conf import post_fork as _post_fork  # noqa: E402
+
+
+def post_fork(server, worker):
+    _post_fork(server, worker)
+    import stubs
+    from core.persistence.vector_db import embeddings_dimension
+
+    stubs.install_stubs(
+        stubs.StubChatModel(
+            first_token_latency=float(os.environ["BENCH_LLM_TTFT"]),
+            token_latency=float(os.environ["BENCH_LLM_TOKEN_LATENCY"]),
+            answer_tokens=int(os.environ["BENCH_LLM_TOKENS"]),
+        ),
+        stubs.recommendation_transport(latency=float(os.environ["BENCH_BACKEND_LATENCY"])),
+        stubs.open_local_vector_store(os.environ["BENCH_VECTOR_DB_PATH"], embeddings_dimension),
+    )
@@ -0,0 +1,404 @@
+"""
+End-to-end load benchmark for the agent's /invoke and /stream endpoints.
+
+By default the real FastAPI app (`routes.application.create_app`) is served in-process by uvicorn,
+with the LLM, perf-agent-backend and the vector DB replaced by the stubs in `stubs.py`, so results
+reflect the service's own overhead and concurrency behaviour. Pass `--url` to drive an already
+running deployment instead (per-node timings are then unavailable).
+
+Examples (from perf-graph-backend/):
+    python benchmarks/load_test.py --concurrency 32 --duration 30 --output benchmarks/results/baseline.json
+    python benchmarks/load_test.py --concurrency 32 --duration 30 --output benchmarks/results/new.json \
+        --compare benchmarks/results/baseline.json --max-regression 0.10
+
+With `--compare`, the process exits with status 1 if a latency percentile or TTFT grew, or
+throughput shrank, by more than `--max-regression`.
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    latency: float
+    ok: bool
+    ttft: Optional[float] = None
+
+
+@dataclass
+class Recorder:
+    samples: list[Sample] = field(default_factory=list)
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+def _summary(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"count": 0}
+    array = np.asarray(values) * 1000
+    summary = {"count": len(values), "mean_ms": float(array.mean()), "max_ms": float(array.max())}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(array, p))
+    return summary
+
+
+# --- per-node timing ---
+
+class NodeTimer(BaseCallbackHandler):
+    """Callback handler timing every LangGraph node run (retriever / model / tools)."""
+
+    # Called on the event loop rather than in an executor, so timings are not skewed by thread hops.
+    run_inline = True
+
+    def __init__(self):
+        self._starts: dict[uuid.UUID, tuple[str, float]] = {}
+        self.durations: dict[str, list[float]] = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, metadata=None, **kwargs):
+        # Node runs are the only chains tagged with the step they belong to.
+        if tags and metadata and any(t.startswith("graph:step:") for t in tags):
+            node = metadata.get("langgraph_node", "")
+            # Skip LangGraph's internal nodes such as __start__.
+            if node and not node.startswith("__"):
+                self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def _finish(self, run_id):
+        started = self._starts.pop(run_id, None)
+        if started:
+            node, start = started
+            self.durations[node].append(time.perf_counter() - start)
+
+    def reset(self):
+        self.durations.clear()
+
+
+def _install_node_timer() -> NodeTimer:
+    """Attach a NodeTimer to every run started from the current context (i.e. by the in-process server)."""
+    handler = NodeTimer()
+    var: contextvars.ContextVar = contextvars.ContextVar("benchmark_node_timer", default=None)
+    register_configure_hook(var, inheritable=True)
+    var.set(handler)
+    return handler
+
+
+# --- in-process server ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _prepare_environment(workdir: str):
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embeddings.sqlite3")
+    os.environ.setdefault("CHECKPOINTER_TYPE", "memory")
+    os.environ["CHECKPOINT_SQLITE_PATH"] = os.path.join(workdir, "checkpoints.sqlite3")
+
+
+@contextlib.asynccontextmanager
+async def _in_process_server(args, workdir: str):
+    import uvicorn
+    import stubs
+    from core.persistence.vector_db import embeddings_dimension
+    from routes.application import create_app
+
+    vector_db = stubs.seed_local_vector_store(os.path.join(workdir, "vector_db"), args.users, embeddings_dimension)
+    stubs.install_stubs(
+        stubs.StubChatModel(
+            first_token_latency=args.llm_ttft,
+            token_latency=args.llm_token_latency,
+            answer_tokens=args.llm_tokens,
+        ),
+        stubs.recommendation_transport(latency=args.backend_latency),
+        vector_db,
+    )
+
+    port = _free_port()
+    config = uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning",
+                            timeout_keep_alive=120)
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+# --- load generation ---
+
+async def _invoke(client: httpx.AsyncClient, payload: dict) -> Sample:
+    start = time.perf_counter()
+    response = await client.post("/invoke", json=payload)
+    return Sample("invoke", time.perf_counter() - start, response.status_code == 200)
+
+
+async def _stream(client: httpx.AsyncClient, payload: dict) -> Sample:
+    start = time.perf_counter()
+    ttft = None
+    ok = False
+    async with client.stream("POST", "/stream", json={**payload, "stream_tokens": True}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return Sample("stream", time.perf_counter() - start, False)
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                ok = True
+                break
+            event_type = json.loads(data).get("type")
+            if event_type == "token" and ttft is None:
+                ttft = time.perf_counter() - start
+            elif event_type == "error":
+                break
+    return Sample("stream", time.perf_counter() - start, ok, ttft)
+
+
+async def _run_load(base_url: str, args, recorder: Recorder, users: list[str],
+                    requests: Optional[int], duration: Optional[float]):
+    import stubs
+
+    rng = random.Random(args.seed)
+    remaining = [requests] if requests is not None else None
+    deadline = time.monotonic() + duration if duration is not None else None
+
+    def next_request() -> bool:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+        return time.monotonic() < deadline
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        async def worker():
+            while next_request():
+                payload = {
+                    "message": rng.choice(stubs.PROMPTS),
+                    "agent_config": {"user_id": rng.choice(users)},
+                }
+                call = _stream if rng.random() < args.stream_ratio else _invoke
+                try:
+                    sample = await call(client, payload)
+                except httpx.HTTPError as e:
+                    endpoint = "stream" if call is _stream else "invoke"
+                    recorder.errors[type(e).__name__] += 1
+                    sample = Sample(endpoint, 0.0, False)
+                recorder.samples.append(sample)
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _report(args, recorder: Recorder, elapsed: float, node_timer: Optional[NodeTimer]) -> dict[str, Any]:
+    endpoints = {}
+    for endpoint in ("invoke", "stream"):
+        samples = [s for s in recorder.samples if s.endpoint == endpoint]
+        if not samples:
+            continue
+        ok = [s for s in samples if s.ok]
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": len(samples) - len(ok),
+            "throughput_rps": len(ok) / elapsed,
+            "latency": _summary([s.latency for s in ok]),
+        }
+        if endpoint == "stream":
+            endpoints[endpoint]["ttft"] = _summary([s.ttft for s in ok if s.ttft is not None])
+
+    total_ok = sum(1 for s in recorder.samples if s.ok)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": args.url or "in-process",
+        },
+        "config": {
+            key: getattr(args, key)
+            for key in ("concurrency", "duration", "requests", "warmup", "stream_ratio", "users", "seed",
+                        "llm_ttft", "llm_token_latency", "llm_tokens", "backend_latency")
+        },
+        "total": {
+            "requests": len(recorder.samples),
+            "errors": len(recorder.samples) - total_ok,
+            "error_types": dict(recorder.errors),
+            "elapsed_s": elapsed,
+            "throughput_rps": total_ok / elapsed,
+        },
+        "endpoints": endpoints,
+        "nodes": {node: _summary(values) for node, values in sorted(node_timer.durations.items())}
+        if node_timer else {},
+    }
+
+
+def _print_report(report: dict[str, Any]):
+    total = report["total"]
+    print(f"\n{total['requests']} requests in {total['elapsed_s']:.1f}s, {total['errors']} errors, "
+          f"{total['throughput_rps']:.1f} req/s")
+    header = f"{'':22}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (ms)"
+    print(header)
+
+    def row(label: str, summary: dict[str, float]):
+        if not summary.get("count"):
+            return
+        print(f"{label:22}{summary['count']:>8}{summary['mean_ms']:>10.1f}{summary['p50_ms']:>10.1f}"
+              f"{summary['p95_ms']:>10.1f}{summary['p99_ms']:>10.1f}{summary['max_ms']:>10.1f}")
+
+    for endpoint, stats in report["endpoints"].items():
+        row(f"/{endpoint} latency", stats["latency"])
+        if "ttft" in stats:
+            row(f"/{endpoint} TTFT", stats["ttft"])
+    for node, summary in report["nodes"].items():
+        row(f"node {node}", summary)
+
+
+def _compare(report: dict[str, Any], baseline: dict[str, Any], max_regression: float) -> bool:
+    """Print current vs. baseline; return True if nothing regressed by more than `max_regression`."""
+    print(f"\nComparison with baseline (commit {baseline['meta'].get('commit')}):")
+    passed = True
+
+    def check(label: str, current: Optional[float], previous: Optional[float], higher_is_better: bool):
+        nonlocal passed
+        if current is None or not previous:
+            return
+        change = (current - previous) / previous
+        regressed = (-change if higher_is_better else change) > max_regression
+        passed = passed and not regressed
+        print(f"  {label:32}{previous:>10.1f} -> {current:>10.1f}  ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+
+    check("throughput req/s", report["total"]["throughput_rps"], baseline["total"]["throughput_rps"], True)
+    for endpoint, stats in report["endpoints"].items():
+        previous = baseline["endpoints"].get(endpoint)
+        if not previous:
+            continue
+        for metric in ("latency", "ttft"):
+            for p in PERCENTILES:
+                key = f"p{p}_ms"
+                check(f"/{endpoint} {metric} {key}", stats.get(metric, {}).get(key),
+                      previous.get(metric, {}).get(key), False)
+    for node, summary in report["nodes"].items():
+        check(f"node {node} p95_ms", summary.get("p95_ms"),
+              baseline.get("nodes", {}).get(node, {}).get("p95_ms"), False)
+    return passed
+
+
+async def _main(args) -> int:
+    import stubs
+
+    node_timer = None
+    with tempfile.TemporaryDirectory(prefix="perf-bench-") as workdir:
+        if args.url:
+            server = contextlib.nullcontext(args.url.rstrip("/"))
+            users = stubs.user_ids(args.users)
+        else:
+            _prepare_environment(workdir)
+            server = _in_process_server(args, workdir)
+            users = stubs.user_ids(args.users)
+            node_timer = _install_node_timer()
+
+        # The app prints diagnostics on hot paths; keep them out of the report.
+        quiet = open(os.devnull, "w") if not args.verbose else None
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            async with server as base_url:
+                if args.warmup:
+                    await _run_load(base_url, args, Recorder(), users, requests=args.warmup, duration=None)
+                if node_timer:
+                    node_timer.reset()
+                recorder = Recorder()
+                start = time.perf_counter()
+                await _run_load(base_url, args, recorder, users, requests=args.requests,
+                                duration=None if args.requests else args.duration)
+                elapsed = time.perf_counter() - start
+        if quiet:
+            quiet.close()
+
+    report = _report(args, recorder, elapsed, node_timer)
+    _print_report(report)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not _compare(report, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running service instead of an in-process app with stubs.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run (ignored with --requests).")
+    parser.add_argument("--requests", type=int, help="Total number of requests to send.")
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring.")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="Fraction of requests sent to /stream.")
+    parser.add_argument("--users", type=int, default=1000, help="Number of distinct user profiles.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-ttft", type=float, default=0.05, help="Stub LLM time to first token (s).")
+    parser.add_argument("--llm-token-latency", type=float, default=0.005, help="Stub LLM delay between tokens (s).")
+    parser.add_argument("--llm-tokens", type=int, default=40, help="Tokens per stub LLM answer.")
+    parser.add_argument("--backend-latency", type=float, default=0.02, help="Stub perf-agent-backend latency (s).")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Allowed relative regression before --compare fails.")
+    parser.add_argument("--verbose", action="store_true", help="Do not silence the app's stdout.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(parse_args())))
@@ -0,0 +1,268 @@
+"""
+Recall and latency of the Milvus collection layouts and ANN indexes `MilvusClientWrapper` can create.
+
+Synthetic profiles (clustered, L2-normalized vectors, like text embeddings) are inserted into one
+collection per layout (`flat`: no partition key, `partitioned`: `user_id` as the partition key) and
+index type, built with `milvus_index_params()`. Ground truth is an exact NumPy scan. For every
+search-time ef (HNSW) or nprobe (IVF) the report lists:
+    recall@k        share of the exact k nearest profiles found, over --queries queries
+    single p50/p95  latency of one query per search call, as `search_documents` sends them
+    batch ms/query  time per query when --batch-size queries share one call (`search_documents_batch`)
+and, per collection, insert + index build time and the latency of a lookup by user id as
+`get_document` sends it (the `user_id` clause only prunes partitions in the partitioned layout).
+
+Needs a Milvus 2.5+ server (filter templates). The collections are dropped afterwards. Vectors
+are held in memory: 1M profiles of 1536 dimensions take 6 GB, so lower --dimension on small machines
+(recall depends on the data's structure more than on the dimension).
+
+Example (from perf-graph-backend/, against docker-compose's Milvus):
+    python benchmarks/milvus_index.py --uri http://localhost:19530 --profiles 1000000 \
+        --index HNSW IVF_FLAT --ef 16 32 64 128 --nprobe 8 16 32 64 --output /tmp/milvus.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+LAYOUTS = {"flat": None, "partitioned": "user_id"}
+
+
+def _profile_ids(count: int) -> list[str]:
+    return [f"bench-profile-{i:07d}" for i in range(count)]
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _profiles(args, centers: np.ndarray) -> Iterator[np.ndarray]:
+    """The profile vectors in chunks, reproducibly: --seed fixes every chunk."""
+    for start in range(0, args.profiles, args.insert_batch):
+        rng = np.random.default_rng([args.seed, start])
+        count = min(args.insert_batch, args.profiles - start)
+        points = centers[rng.integers(len(centers), size=count)]
+        yield _normalize(points + args.spread * rng.standard_normal((count, args.dimension), dtype=np.float32))
+
+
+def _dataset(args) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(args.seed)
+    centers = _normalize(rng.standard_normal((args.clusters, args.dimension), dtype=np.float32))
+    vectors = np.concatenate(list(_profiles(args, centers)))
+    # Queries are perturbed profiles, as a profile rewritten by its user would be.
+    sample = vectors[rng.choice(args.profiles, size=args.queries, replace=False)]
+    queries = _normalize(sample + args.spread * rng.standard_normal(sample.shape, dtype=np.float32))
+    return vectors, queries
+
+
+def _ground_truth(vectors: np.ndarray, queries: np.ndarray, k: int, chunk: int = 100_000) -> list[set[int]]:
+    """Exact top-k rows by cosine similarity (inner product of normalized vectors), scanned in chunks."""
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        scores = np.concatenate([best_scores, queries @ vectors[start:start + chunk].T], axis=1)
+        rows = np.concatenate([best_rows, np.broadcast_to(
+            np.arange(start, min(start + chunk, len(vectors))), (len(queries), scores.shape[1] - best_rows.shape[1])
+        )], axis=1)
+        top = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_rows = np.take_along_axis(rows, top, axis=1)
+    return [set(row) for row in best_rows.tolist()]
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    samples = sorted(samples)
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {"p50_ms": quantiles[49] * 1000, "p95_ms": quantiles[94] * 1000}
+
+
+def _configure_index(args, index_type: str):
+    from core import settings
+
+    settings.MILVUS_INDEX_TYPE = index_type
+    settings.MILVUS_METRIC_TYPE = args.metric
+    settings.MILVUS_HNSW_M = args.hnsw_m
+    settings.MILVUS_HNSW_EF_CONSTRUCTION = args.hnsw_ef_construction
+    settings.MILVUS_IVF_NLIST = args.ivf_nlist
+
+
+def _build(client, args, name: str, index_type: str, partition_key: Optional[str], vectors: np.ndarray) -> float:
+    from pymilvus import DataType, MilvusClient
+
+    from core.persistence.vector_db import milvus_index_params
+
+    _configure_index(args, index_type)
+    index = milvus_index_params()
+    schema = MilvusClient.create_schema(enable_dynamic_field=True, partition_key_field=partition_key)
+    schema.add_field("pk", DataType.VARCHAR, is_primary=True, max_length=64)
+    schema.add_field("vector", DataType.FLOAT_VECTOR, dim=args.dimension)
+    if partition_key:
+        schema.add_field(partition_key, DataType.VARCHAR, max_length=64)
+    index_params = client.prepare_index_params()
+    index_params.add_index("vector", index_type=index["index_type"], metric_type=index["metric_type"],
+                           params=index["params"])
+
+    if client.has_collection(name):
+        client.drop_collection(name)
+    start = time.perf_counter()
+    client.create_collection(name, schema=schema, index_params=index_params)
+    ids = _profile_ids(args.profiles)
+    for offset in range(0, args.profiles, args.insert_batch):
+        rows = [
+            {"pk": doc_id, "vector": vector, **({partition_key: doc_id} if partition_key else {})}
+            for doc_id, vector in zip(ids[offset:offset + args.insert_batch],
+                                      vectors[offset:offset + args.insert_batch].tolist())
+        ]
+        client.insert(name, rows)
+    client.flush(name)
+    client.release_collection(name)
+    client.load_collection(name)
+    return time.perf_counter() - start
+
+
+def _search_runs(client, args, name: str, index_type: str, queries: np.ndarray, truth: list[set[int]]) -> list[dict]:
+    from core import settings
+    from core.persistence.vector_db import milvus_search_params
+
+    if index_type == "HNSW":
+        sweep = [("ef", value) for value in args.ef]
+    elif index_type.startswith("IVF"):
+        sweep = [("nprobe", value) for value in args.nprobe]
+    else:
+        sweep = [(None, None)]
+    data = queries.tolist()
+    runs = []
+    for param, value in sweep:
+        if param == "ef":
+            settings.MILVUS_SEARCH_EF = value
+        elif param == "nprobe":
+            settings.MILVUS_SEARCH_NPROBE = value
+        search_params = milvus_search_params(index_type, args.metric, k=args.k)
+
+        latencies, found = [], []
+        for query in data:
+            start = time.perf_counter()
+            hits = client.search(name, data=[query], limit=args.k, search_params=search_params)[0]
+            latencies.append(time.perf_counter() - start)
+            found.append({int(hit["id"].rsplit("-", 1)[1]) for hit in hits})
+        recall = statistics.fmean(len(f & t) / args.k for f, t in zip(found, truth))
+
+        start = time.perf_counter()
+        for offset in range(0, len(data), args.batch_size):
+            client.search(name, data=data[offset:offset + args.batch_size], limit=args.k, search_params=search_params)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(data)
+
+        runs.append({
+            "param": f"{param}={value}" if param else "-",
+            "search_params": search_params,
+            f"recall_at_{args.k}": recall,
+            "single": _percentiles(latencies),
+            "batch_ms_per_query": batch_ms,
+        })
+    return runs
+
+
+def _lookups(client, args, name: str, partition_key: Optional[str]) -> dict[str, float]:
+    """Lookups by id, with the expression `get_document` sends."""
+    rng = np.random.default_rng(args.seed)
+    expr = "pk == {doc_id}" + (f" && {partition_key} == {{doc_id}}" if partition_key else "")
+    ids = _profile_ids(args.profiles)
+    latencies = []
+    for row in rng.choice(args.profiles, size=args.lookups):
+        start = time.perf_counter()
+        client.query(name, filter=expr, filter_params={"doc_id": ids[row]}, output_fields=["pk"], limit=1)
+        latencies.append(time.perf_counter() - start)
+    return _percentiles(latencies)
+
+
+def _main(args) -> dict[str, Any]:
+    from pymilvus import MilvusClient
+
+    # core's settings are read from the environment on import; nothing is sent to OpenAI.
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    print(f"Generating {args.profiles} profiles of dimension {args.dimension}...", flush=True)
+    vectors, queries = _dataset(args)
+    truth = _ground_truth(vectors, queries, args.k)
+    client = MilvusClient(uri=args.uri, token=args.token)
+    collections = []
+    for layout in args.layout:
+        for index_type in args.index:
+            name = f"bench_{layout}_{index_type.lower()}"
+            print(f"Building {name}...", flush=True)
+            try:
+                build_seconds = _build(client, args, name, index_type, LAYOUTS[layout], vectors)
+                collections.append({
+                    "layout": layout,
+                    "index": index_type,
+                    "build_seconds": build_seconds,
+                    "lookup": _lookups(client, args, name, LAYOUTS[layout]),
+                    "runs": _search_runs(client, args, name, index_type, queries, truth),
+                })
+            finally:
+                if not args.keep:
+                    client.drop_collection(name)
+    return {"profiles": args.profiles, "dimension": args.dimension, "k": args.k, "batch_size": args.batch_size,
+            "collections": collections}
+
+
+def _print_report(report: dict[str, Any]):
+    k = report["k"]
+    print(f"\n{report['profiles']} profiles, dimension {report['dimension']}, k={k}, "
+          f"batches of {report['batch_size']} queries")
+    print(f"{'layout':<13}{'index':<10}{'build s':>9}{'lookup p50':>12}{'lookup p95':>12}")
+    for collection in report["collections"]:
+        lookup = collection["lookup"]
+        print(f"{collection['layout']:<13}{collection['index']:<10}{collection['build_seconds']:>9.1f}"
+              f"{lookup['p50_ms']:>12.2f}{lookup['p95_ms']:>12.2f}")
+    print(f"\n{'layout':<13}{'index':<10}{'param':<12}{'recall':>8}{'p50 ms':>9}{'p95 ms':>9}{'batch ms/q':>12}")
+    for collection in report["collections"]:
+        for run in collection["runs"]:
+            print(f"{collection['layout']:<13}{collection['index']:<10}{run['param']:<12}"
+                  f"{run[f'recall_at_{k}']:>8.3f}{run['single']['p50_ms']:>9.2f}{run['single']['p95_ms']:>9.2f}"
+                  f"{run['batch_ms_per_query']:>12.3f}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="http://localhost:19530", help="Milvus server.")
+    parser.add_argument("--token", default="root:Milvus")
+    parser.add_argument("--profiles", type=int, default=100_000, help="Profiles inserted per collection.")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=1000, help="Clusters the synthetic profiles are drawn around.")
+    parser.add_argument("--spread", type=float, default=0.03, help="Per-dimension noise around a cluster center.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per query.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Queries per batched search call.")
+    parser.add_argument("--lookups", type=int, default=200, help="Lookups by user id per collection.")
+    parser.add_argument("--layout", nargs="+", choices=list(LAYOUTS), default=list(LAYOUTS))
+    parser.add_argument("--index", nargs="+", default=["HNSW", "IVF_FLAT"], help="Index types to build.")
+    parser.add_argument("--metric", default="COSINE")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-ef-construction", type=int, default=200)
+    parser.add_argument("--ivf-nlist", type=int, default=1024)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128], help="HNSW search ef values.")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64], help="IVF search nprobe values.")
+    parser.add_argument("--insert-batch", type=int, default=2000, help="Rows per insert call.")
+    parser.add_argument("--keep", action="store_true", help="Keep the collections.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = _main(arguments)
+    _print_report(result)
+    if arguments.output:
+        Path(arguments.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(arguments.output).write_text(json.dumps(result, indent=2))
+        print(f"\nResults written to {arguments.output}")
@@ -0,0 +1,123 @@
+"""
+Cost of the similar-users kNN graph (`core.similar_users`) against searching on demand.
+
+A local vector store is seeded with `--users` stub profiles, then:
+    rebuild    time to build the whole graph from the stored vectors
+    read       latency of `aneighbour_profiles` (graph lookup + neighbour profiles through the profile
+               cache), against an ANN query per request (`asearch_documents` on the user's profile,
+               as an on-demand endpoint would run it)
+    update     time to recompute the neighbours of `--changes` profiles after they were rewritten
+The local store scans exactly, so the on-demand column is a brute-force scan; Milvus would be faster
+per query but still a vector search on the request path, and the rebuild, which is quadratic here,
+would be far cheaper.
+
+Example (from perf-graph-backend/):
+    python benchmarks/similar_users.py --users 5000 --reads 500 --changes 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_ms": quantiles[49] * 1000, "p95_ms": quantiles[94] * 1000}
+
+
+async def _timed(samples: list[float], coroutine):
+    start = time.perf_counter()
+    result = await coroutine
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+async def _main(args) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="perf-similar-") as workdir:
+        # core's settings are read from the environment on import; nothing is sent to OpenAI.
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embeddings.sqlite3")
+        import stubs
+        import core.persistence.db_factory
+        from core import settings
+        from core.persistence.cached_vector_db import CachedVectorDBClient
+        from core.persistence.vector_db import embeddings_dimension
+        from core.similar_users import SimilarUsersIndex
+        from langchain_core.documents import Document
+
+        client = stubs.seed_local_vector_store(os.path.join(workdir, "vector_db"), args.users, embeddings_dimension)
+        client = CachedVectorDBClient(client, maxsize=settings.PROFILE_CACHE_MAXSIZE, ttl=settings.PROFILE_CACHE_TTL)
+        core.persistence.db_factory._vector_db_client = client
+        index = SimilarUsersIndex(k=args.k, update_delay=0, rebuild_interval=0, batch_size=args.batch_size)
+        users = stubs.user_ids(args.users)
+        rng = random.Random(args.seed)
+
+        start = time.perf_counter()
+        await index.rebuild()
+        rebuild_seconds = time.perf_counter() - start
+
+        graph_reads, ann_reads = [], []
+        for user_id in rng.choices(users, k=args.reads):
+            await _timed(graph_reads, index.aneighbour_profiles(user_id, args.k))
+        for user_id in rng.choices(users, k=args.reads):
+            profile = await client.aget_document(user_id)
+            await _timed(ann_reads, client.asearch_documents(profile.page_content, k=args.k + 1))
+
+        changed = rng.sample(users, args.changes)
+        profiles = [await client.aget_document(rng.choice(users)) for _ in changed]
+        await client.aadd_documents(changed, [Document(page_content=profile.page_content) for profile in profiles])
+        index.mark_changed(*changed)
+        start = time.perf_counter()
+        await index.update()
+        update_seconds = time.perf_counter() - start
+
+    return {
+        "users": args.users,
+        "k": args.k,
+        "rebuild_seconds": rebuild_seconds,
+        "read": {"graph": _percentiles(graph_reads), "on_demand_ann": _percentiles(ann_reads)},
+        "update": {"changes": args.changes, "seconds": update_seconds},
+    }
+
+
+def _print_report(report: dict[str, Any]):
+    print(f"\n{report['users']} profiles, k={report['k']}")
+    print(f"rebuild: {report['rebuild_seconds']:.2f}s")
+    print(f"{'read':<16}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, summary in report["read"].items():
+        print(f"{name:<16}{summary['p50_ms']:>10.3f}{summary['p95_ms']:>10.3f}")
+    update = report["update"]
+    print(f"update of {update['changes']} changed profiles: {update['seconds'] * 1000:.0f} ms")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000, help="Number of stub profiles.")
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per profile.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Profiles per batched search.")
+    parser.add_argument("--reads", type=int, default=500, help="Reads timed per method.")
+    parser.add_argument("--changes", type=int, default=100, help="Profiles rewritten before the update.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = asyncio.run(_main(arguments))
+    _print_report(result)
+    if arguments.output:
+        Path(arguments.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(arguments.output).write_text(json.dumps(result, indent=2))
+        print(f"\nResults written to {arguments.output}")
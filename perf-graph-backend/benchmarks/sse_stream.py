@@ -0,0 +1,164 @@
+"""
+Micro-benchmark of the /stream path: graph events consumed, SSE frames per second and CPU time per stream.
+
+Runs `stream_message_generator` directly (no HTTP server), with the stubs from `stubs.py` streaming
+`--chars-per-token`-character chunks. Each streaming engine (`STREAM_ENGINE`) is run without
+coalescing, then the default engine once per coalescing mode:
+    off          one frame per LLM chunk
+    bytes=N      `coalesce_tokens_bytes=N`
+    window=Nms   `coalesce_tokens_ms=N`
+It also times the frame encoder alone: the previous `json.dumps` f-string frames against
+`core.sse.token_frame`.
+
+Example (from perf-graph-backend/):
+    python benchmarks/sse_stream.py --streams 64 --tokens 400 --chars-per-token 2 --output /tmp/sse.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def _legacy_token_frame(content: str) -> bytes:
+    # The frame format before core.sse: json.dumps into an f-string, encoded by Starlette.
+    return f"data: {json.dumps({'type': 'token', 'content': content})}\n\n".encode()
+
+
+def _time_encoders(samples: int) -> dict[str, float]:
+    from core.sse import token_frame
+
+    tokens = ["ab", " c", "é ", "de", "\"q", "xy"] * (samples // 6)
+    results = {}
+    for name, encode in (("json_fstring", _legacy_token_frame), ("orjson_template", token_frame)):
+        start = time.perf_counter()
+        for token in tokens:
+            encode(token)
+        results[name] = len(tokens) / (time.perf_counter() - start)
+    return results
+
+
+async def _run_streams(args, engine: str, mode: str, coalesce_ms: float, coalesce_bytes: int) -> dict[str, Any]:
+    from prometheus_client import REGISTRY
+    from core import settings
+    from routes.api_agent import stream_message_generator
+    from schema import StreamInput
+    import stubs
+
+    def engine_events() -> float:
+        return REGISTRY.get_sample_value("agent_stream_engine_events_total", {"engine": engine}) or 0.0
+
+    settings.STREAM_ENGINE = engine
+    events_before = engine_events()
+
+    users = stubs.user_ids(args.users)
+    frames = 0
+    payload_bytes = 0
+
+    async def one(index: int):
+        nonlocal frames, payload_bytes
+        user_input = StreamInput(
+            message="Hello! What can you help me with?",
+            agent_config={"user_id": users[index % len(users)]},
+            coalesce_tokens_ms=coalesce_ms,
+            coalesce_tokens_bytes=coalesce_bytes,
+        )
+        async for frame in stream_message_generator(user_input):
+            if frame.startswith(b'data: {"type":"token"'):
+                frames += 1
+                payload_bytes += len(frame)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.streams)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    return {
+        "engine": engine,
+        "mode": mode,
+        "engine_events_per_stream": (engine_events() - events_before) / args.streams,
+        "token_frames": frames,
+        "token_frames_per_stream": frames / args.streams,
+        "token_bytes_per_stream": payload_bytes / args.streams,
+        "token_frames_per_s": frames / elapsed,
+        "cpu_ms_per_stream": cpu * 1000 / args.streams,
+        "elapsed_s": elapsed,
+    }
+
+
+async def _main(args) -> dict[str, Any]:
+    import stubs
+
+    with tempfile.TemporaryDirectory(prefix="perf-sse-") as workdir:
+        # Before the first import of core: settings are read from the environment once.
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embeddings.sqlite3")
+        from core.persistence.vector_db import embeddings_dimension
+
+        vector_db = stubs.seed_local_vector_store(os.path.join(workdir, "vector_db"), args.users, embeddings_dimension)
+        stubs.install_stubs(
+            stubs.StubChatModel(
+                first_token_latency=0.0,
+                token_latency=args.token_latency,
+                answer_tokens=args.tokens,
+                token_size=args.chars_per_token,
+            ),
+            stubs.recommendation_transport(latency=0.0),
+            vector_db,
+        )
+        runs = [(engine, "off", 0.0, 0) for engine in args.engines]
+        runs += [(args.engines[-1], f"bytes={size}", 0.0, size) for size in args.coalesce_bytes]
+        runs += [(args.engines[-1], f"window={window:g}ms", window, 0) for window in args.coalesce_ms]
+
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for engine in args.engines:
+                await _run_streams(args, engine, "warmup", 0.0, 0)
+            runs = [await _run_streams(args, *run) for run in runs]
+    return {"encoders_frames_per_s": _time_encoders(args.encoder_samples), "streams": runs}
+
+
+def _print_report(report: dict[str, Any]):
+    print("\nEncoder frames/s:")
+    for name, rate in report["encoders_frames_per_s"].items():
+        print(f"  {name:18}{rate:>14,.0f}")
+    print(f"\n{'engine':10}{'mode':14}{'events/stream':>15}{'frames/stream':>15}{'bytes/stream':>14}"
+          f"{'frames/s':>12}{'CPU ms/stream':>15}")
+    for run in report["streams"]:
+        print(f"{run['engine']:10}{run['mode']:14}{run['engine_events_per_stream']:>15.1f}"
+              f"{run['token_frames_per_stream']:>15.1f}{run['token_bytes_per_stream']:>14.0f}"
+              f"{run['token_frames_per_s']:>12.0f}{run['cpu_ms_per_stream']:>15.2f}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=64, help="Concurrent streams per mode.")
+    parser.add_argument("--tokens", type=int, default=200, help="Words per stub LLM answer.")
+    parser.add_argument("--chars-per-token", type=int, default=2, help="Characters per streamed chunk.")
+    parser.add_argument("--token-latency", type=float, default=0.0005, help="Stub LLM delay between chunks (s).")
+    parser.add_argument("--engines", nargs="+", default=["events", "astream"],
+                        help="STREAM_ENGINE values to compare; coalescing modes use the last one.")
+    parser.add_argument("--coalesce-bytes", type=int, nargs="*", default=[64])
+    parser.add_argument("--coalesce-ms", type=float, nargs="*", default=[20.0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--encoder-samples", type=int, default=600_000)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = asyncio.run(_main(arguments))
+    _print_report(result)
+    if arguments.output:
+        Path(arguments.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(arguments.output).write_text(json.dumps(result, indent=2))
+        print(f"\nResults written to {arguments.output}")
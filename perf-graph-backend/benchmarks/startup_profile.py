@@ -0,0 +1,176 @@
+"""
+Startup profile of the app: import time per module and time until `/ready`.
+
+Each run starts fresh interpreters from src/:
+    imports  `python -X importtime -c "import main"`; the slowest modules (self time) and top-level
+             packages (summed self time), plus the total for `main`.
+    startup  `import main`, then the app's lifespan entered directly (no server) and timed until it
+             yields, which is when uvicorn starts listening, then until every warm-up step of
+             `core.readiness` has finished, each with its own time. The vector DB is a local store
+             under a temporary directory; nothing is sent to OpenAI.
+The fastest of `--repeat` runs is reported, as the others include cold disk caches.
+
+With `--budget-import-ms` / `--budget-ready-ms`, the process exits with status 1 if importing `main`,
+or becoming ready, took longer. tests/test_startup_budget.py runs the same profile as a pytest check.
+
+Example (from perf-graph-backend/):
+    python benchmarks/startup_profile.py --repeat 3 --budget-import-ms 2000 --budget-ready-ms 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Optional
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+def _environment(workdir: str) -> dict[str, str]:
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+        "PYTHONPATH": os.pathsep.join([str(SRC_DIR), os.environ.get("PYTHONPATH", "")]),
+        "VECTOR_DB_TYPE": "local",
+        "LOCAL_VECTOR_DB_PATH": os.path.join(workdir, "vector_db"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite3"),
+        "CHECKPOINTER_TYPE": "memory",
+    }
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every line `-X importtime` printed."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def profile_imports(env: dict[str, str], top: int) -> dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = _parse_importtime(result.stderr)
+    packages: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    total_us = next(cumulative for name, _, cumulative in modules if name == "main")
+    return {
+        "total_ms": total_us / 1000,
+        "modules": [{"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+                    for name, self_us, cumulative_us in sorted(modules, key=lambda m: -m[1])[:top]],
+        "packages": [{"package": name, "self_ms": self_us / 1000}
+                     for name, self_us in sorted(packages.items(), key=lambda p: -p[1])[:top]],
+    }
+
+
+async def _startup_child(timeout: float) -> dict[str, Any]:
+    """Runs in the child interpreter started by `profile_startup`."""
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+
+    from core.readiness import get_readiness
+
+    readiness = get_readiness()
+    async with main.app.router.lifespan_context(main.app):
+        listening = time.perf_counter()
+        while not readiness.ready and time.perf_counter() - listening < timeout:
+            await asyncio.sleep(0.01)
+        ready = time.perf_counter() if readiness.ready else None
+        report = readiness.report()
+    return {
+        "import_ms": (imported - start) * 1000,
+        "listening_ms": (listening - start) * 1000,
+        "ready_ms": (ready - start) * 1000 if ready else None,
+        "steps": report["steps"],
+    }
+
+
+def profile_startup(env: dict[str, str], timeout: float) -> dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", "--ready-timeout", str(timeout)],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _main(args) -> dict[str, Any]:
+    imports, startups = [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="perf-startup-") as workdir:
+            env = _environment(workdir)
+            imports.append(profile_imports(env, args.top))
+            startups.append(profile_startup(env, args.ready_timeout))
+    return {
+        "python": sys.version.split()[0],
+        "imports": min(imports, key=lambda run: run["total_ms"]),
+        "startup": min(startups, key=lambda run: run["ready_ms"] if run["ready_ms"] is not None else float("inf")),
+    }
+
+
+def _print_report(report: dict[str, Any]):
+    imports, startup = report["imports"], report["startup"]
+    print(f"\nimport main: {imports['total_ms']:.0f} ms (python {report['python']})")
+    print(f"\n{'module':<60}{'self ms':>10}{'cum. ms':>10}")
+    for module in imports["modules"]:
+        print(f"{module['module']:<60}{module['self_ms']:>10.1f}{module['cumulative_ms']:>10.1f}")
+    print(f"\n{'package':<60}{'self ms':>10}")
+    for package in imports["packages"]:
+        print(f"{package['package']:<60}{package['self_ms']:>10.1f}")
+    ready = f"{startup['ready_ms']:.0f} ms" if startup["ready_ms"] is not None else "not ready"
+    print(f"\nimported {startup['import_ms']:.0f} ms, listening {startup['listening_ms']:.0f} ms, ready {ready}")
+    print(f"{'warm-up step':<20}{'status':>10}{'ms':>10}{'attempts':>10}")
+    for name, step in startup["steps"].items():
+        seconds = f"{step['seconds'] * 1000:.0f}" if step["seconds"] is not None else "-"
+        print(f"{name:<20}{step['status']:>10}{seconds:>10}{step['attempts']:>10}")
+
+
+def _check_budgets(report: dict[str, Any], args) -> bool:
+    passed = True
+    import_ms, ready_ms = report["imports"]["total_ms"], report["startup"]["ready_ms"]
+    if args.budget_import_ms is not None and import_ms > args.budget_import_ms:
+        print(f"FAIL: import main took {import_ms:.0f} ms (budget {args.budget_import_ms:.0f} ms)")
+        passed = False
+    if args.budget_ready_ms is not None and (ready_ms is None or ready_ms > args.budget_ready_ms):
+        took = f"{ready_ms:.0f} ms" if ready_ms is not None else "longer than --ready-timeout"
+        print(f"FAIL: becoming ready took {took} (budget {args.budget_ready_ms:.0f} ms)")
+        passed = False
+    return passed
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported.")
+    parser.add_argument("--top", type=int, default=15, help="Modules and packages listed.")
+    parser.add_argument("--ready-timeout", type=float, default=60.0, help="Seconds to wait for the warm-up.")
+    parser.add_argument("--budget-import-ms", type=float, help="Fail if importing main takes longer.")
+    parser.add_argument("--budget-ready-ms", type=float, help="Fail if becoming ready takes longer.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.child:
+        # The app logs to stdout; the result is the last line.
+        print(json.dumps(asyncio.run(_startup_child(arguments.ready_timeout))))
+        sys.exit(0)
+    result = _main(arguments)
+    _print_report(result)
+    if arguments.output:
+        Path(arguments.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(arguments.output).write_text(json.dumps(result, indent=2))
+        print(f"\nResults written to {arguments.output}")
+    if not _check_budgets(result, arguments):
+        sys.exit(1)
@@ -0,0 +1,266 @@
+"""
+Stand-ins for the external services the agent depends on, with configurable latency,
+so the service can be load-tested without OpenAI, perf-agent-backend or Milvus.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, Optional
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage, ToolMessage, message_chunk_to_message
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+NOTES = ["Vanilla", "Bergamot", "Rose", "Oud", "Amber", "Tonka Bean", "Jasmine", "Sandalwood", "Musk", "Iris"]
+TYPES = ["Woody", "Floral", "Gourmand", "Fresh", "Oriental"]
+
+PROMPTS = [
+    "Recommend me something with vanilla and amber.",
+    "I love rose and oud, what should I try?",
+    "Something fresh with bergamot for the summer, please.",
+    "Tell me why sandalwood lasts so long on skin.",
+    "Hello! What can you help me with?",
+    "Which jasmine fragrances would suit me?",
+    "Tell me more about iris in perfumery.",
+    "I want a musk and tonka bean scent for the evening.",
+]
+
+_ANSWER = (
+    "Based on your love of warm, enveloping accords, I would suggest exploring a few compositions "
+    "that balance a creamy heart with a luminous opening and a long, soft drydown on the skin. "
+).split(" ")
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that answers instantly-but-not-quite: it waits `first_token_latency` seconds, then
+    streams `answer_tokens` tokens `token_latency` seconds apart. Prompts mentioning known notes get
+    a `recommend_fragrances_func` call, prompts starting with "Tell me" get the expert tool;
+    after a tool result the model answers. Only a model returned by `bind_tools` calls tools, so
+    the expert tool's and compaction's inner calls always answer in text.
+    """
+
+    first_token_latency: float = 0.05
+    token_latency: float = 0.005
+    answer_tokens: int = 40
+    # Characters per streamed chunk; None streams whole words.
+    token_size: Optional[int] = None
+    tools_bound: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "StubChatModel":
+        return self.model_copy(update={"tools_bound": True})
+
+    def _tool_call(self, messages: list[BaseMessage]) -> Optional[dict]:
+        last = messages[-1]
+        if not self.tools_bound or not isinstance(last, HumanMessage) or any(isinstance(m, ToolMessage) for m in messages):
+            return None
+        text = str(last.content)
+        notes = [note for note in NOTES if note.lower() in text.lower()]
+        if notes:
+            return {"name": "recommend_fragrances_func", "args": {"notes": notes, "count": 3},
+                    "id": f"call_{uuid.uuid4().hex[:12]}"}
+        if text.startswith("Tell me"):
+            return {"name": "provide_answer_for_missing_information", "args": {"user_question": text},
+                    "id": f"call_{uuid.uuid4().hex[:12]}"}
+        return None
+
+    def _tokens(self) -> list[str]:
+        words = [_ANSWER[i % len(_ANSWER)] + " " for i in range(self.answer_tokens)]
+        if self.token_size is None:
+            return words
+        text = "".join(words)
+        return [text[i:i + self.token_size] for i in range(0, len(text), self.token_size)]
+
+    def _usage(self, messages: list[BaseMessage], output_tokens: int) -> dict:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _chunks(self, messages: list[BaseMessage]) -> Iterator[tuple[float, AIMessageChunk]]:
+        """(delay before the chunk, chunk) pairs shared by the sync and async paths."""
+        call = self._tool_call(messages)
+        if call:
+            yield self.first_token_latency, AIMessageChunk(
+                content="",
+                tool_call_chunks=[tool_call_chunk(name=call["name"], args=json.dumps(call["args"]),
+                                                  id=call["id"], index=0)],
+                usage_metadata=self._usage(messages, 20),
+            )
+            return
+        tokens = self._tokens()
+        for i, token in enumerate(tokens):
+            last = i == len(tokens) - 1
+            yield (self.first_token_latency if i == 0 else self.token_latency), AIMessageChunk(
+                content=token,
+                usage_metadata=self._usage(messages, len(tokens)) if last else None,
+            )
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for delay, chunk in self._chunks(messages):
+            time.sleep(delay)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for delay, chunk in self._chunks(messages):
+            await asyncio.sleep(delay)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    @staticmethod
+    def _result(chunks: list[ChatGenerationChunk]) -> ChatResult:
+        message = chunks[0].message
+        for chunk in chunks[1:]:
+            message += chunk.message
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(message))])
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return self._result(list(self._stream(messages, stop, run_manager, **kwargs)))
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return self._result([chunk async for chunk in self._astream(messages, stop, run_manager, **kwargs)])
+
+
+def fragrance_catalog(size: int = 200, seed: int = 0) -> list[dict]:
+    """Synthetic catalog in perf-agent-backend's response shape."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"frag-{i:05d}",
+            "name": f"Benchmark No. {i + 1}",
+            "brand": f"Maison Stub {i % 12}",
+            "topNotes": rng.sample(NOTES, 2),
+            "middleNotes": rng.sample(NOTES, 2),
+            "baseNotes": rng.sample(NOTES, 2),
+            "sillage": rng.choice(["ModerateSillage", "StrongSillage", "BeastModeSillage"]),
+            "longevity": rng.choice(["ShortLongevity", "ModerateLongevity", "LongLongevity"]),
+            "types": rng.sample(TYPES, 2),
+        }
+        for i in range(size)
+    ]
+
+
+def _matches(fragrance: dict, payload: dict) -> bool:
+    """perf-agent-backend's filter semantics (FragranceOntology.matchesFilters)."""
+    if payload.get("brandName") and payload["brandName"].casefold() != fragrance["brand"].casefold():
+        return False
+    if payload.get("fragranceName") and payload["fragranceName"].casefold() != fragrance["name"].casefold():
+        return False
+    if not set(payload.get("types") or []) <= set(fragrance["types"]):
+        return False
+    notes = fragrance["topNotes"] + fragrance["middleNotes"] + fragrance["baseNotes"]
+    if payload.get("notes") and not any(note in notes for note in payload["notes"]):
+        return False
+    if payload.get("hasLongevity") and fragrance["longevity"] not in payload["hasLongevity"]:
+        return False
+    if payload.get("hasSillage") and fragrance["sillage"] not in payload["hasSillage"]:
+        return False
+    return True
+
+
+def recommendation_transport(latency: float = 0.02, seed: int = 0) -> httpx.MockTransport:
+    """
+    Mock transport answering `POST /api/agent/recommend` like perf-agent-backend, after `latency` seconds.
+    It filters a synthetic catalog; an unfiltered request also returns a few non-fragrance individuals.
+    """
+    catalog = fragrance_catalog(seed=seed)
+    individuals = [{"id": f"note-{note}", "name": None, "brand": None, "topNotes": [], "middleNotes": [],
+                    "baseNotes": [], "sillage": None, "longevity": None, "types": ["FragranceNote"]}
+                   for note in NOTES]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if request.url.path != "/api/agent/recommend":
+            return httpx.Response(404)
+        payload = json.loads(request.content)
+        found = [fragrance for fragrance in catalog if _matches(fragrance, payload)]
+        if not any(payload.get(key) for key in ("types", "notes", "hasLongevity", "hasSillage", "brandName",
+                                                "fragranceName")):
+            found += individuals
+        if payload.get("count") is not None:
+            found = found[:payload["count"]]
+        if not found:
+            return httpx.Response(200, text="No fragrances")
+        return httpx.Response(200, json=found)
+
+    return httpx.MockTransport(handler)
+
+
+def user_ids(count: int) -> list[str]:
+    return [f"bench-user-{i:06d}" for i in range(count)]
+
+
+def open_local_vector_store(path: str, dimension: int):
+    """Local vector store at `path` embedding with the deterministic fake model the seeded profiles use."""
+    from core.persistence.local_vector_db import LocalVectorDBClient
+
+    return LocalVectorDBClient(path, embedding=DeterministicFakeEmbedding(size=dimension))
+
+
+def seed_local_vector_store(path: str, users: int, dimension: int):
+    """Local vector store filled with `users` synthetic profiles embedded by a deterministic fake model."""
+    client = open_local_vector_store(path, dimension)
+    rng = random.Random(42)
+    ids = user_ids(users)
+    documents = [
+        Document(page_content=(
+            f"I enjoy {', '.join(rng.sample(NOTES, 3))} notes and {rng.choice(TYPES).lower()} fragrances. "
+            f"My collection includes a few niche perfumes and I prefer long-lasting scents."
+        ))
+        for _ in ids
+    ]
+    for i in range(0, users, 1000):
+        client.add_documents(ids[i:i + 1000], documents[i:i + 1000])
+    return client
+
+
+def install_stubs(chat_model: BaseChatModel, transport: httpx.AsyncBaseTransport, vector_db_client):
+    """Point the agent's LLM, recommendation client and vector DB at the stubs. Call before the app starts."""
+    import agents.agentic_rag
+    import agents.compaction
+    import agents.tools.unknown_information
+    import core.persistence.db_factory
+    import core.persistence.vector_db
+    import core.recommendation_client
+    from core import settings
+    from core.persistence.cached_vector_db import CachedVectorDBClient
+
+    def get_model(*args, **kwargs):
+        return chat_model
+
+    agents.agentic_rag.get_model = get_model
+    agents.compaction.get_model = get_model
+    agents.tools.unknown_information.get_model = get_model
+
+    core.recommendation_client.recommendation_client = core.recommendation_client.RecommendationClient(
+        settings.API_URL, transport=transport
+    )
+
+    # Mirror init_db_clients, which skips clients that are already set.
+    if settings.PROFILE_CACHE_ENABLED:
+        vector_db_client = CachedVectorDBClient(
+            vector_db_client, maxsize=settings.PROFILE_CACHE_MAXSIZE, ttl=settings.PROFILE_CACHE_TTL
+        )
+    core.persistence.db_factory._vector_db_client = vector_db_client
+
+    # Only the semantic response cache embeds at request time; identical questions still match.
+    core.persistence.vector_db.embeddings = DeterministicFakeEmbedding(size=core.persistence.vector_db.embeddings_dimension)
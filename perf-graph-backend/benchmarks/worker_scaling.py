@@ -0,0 +1,188 @@
+"""
+Throughput of the production launcher (`gunicorn -c gunicorn_conf.py main:app`) by worker count.
+
+For each `--workers` value, gunicorn is started with the stubs from `stubs.py` installed in every worker
+(`gunicorn_stub_conf.py`), driven with the load generator of `load_test.py` for `--duration` seconds,
+then stopped. The report lists throughput, scaling relative to the first worker count, latency
+percentiles and the workers' total RSS and PSS; compare with `--no-preload` to see what preloading
+the app in the master saves.
+
+The load generator runs in this process on the same machine, so scaling flattens once the server
+and the client together use every core; on a small machine, drive a separate deployment with
+`load_test.py --url` instead.
+
+Example (from perf-graph-backend/):
+    python benchmarks/worker_scaling.py --workers 1 2 4 --concurrency 64 --duration 20 --output /tmp/workers.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+
+def _workers_memory_mb(master_pid: int) -> Optional[dict[str, float]]:
+    """
+    Summed RSS and PSS of the master's children, from /proc; None where it is unavailable. RSS counts
+    pages shared with the master in every worker, PSS splits them between the processes sharing them.
+    """
+    try:
+        children = Path(f"/proc/{master_pid}/task/{master_pid}/children").read_text().split()
+        totals = {"rss": 0.0, "pss": 0.0}
+        for pid in children:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+                field, _, value = line.partition(":")
+                if field.lower() in totals:
+                    totals[field.lower()] += int(value.split()[0]) / 1024
+        return totals
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextlib.asynccontextmanager
+async def _gunicorn(workers: int, env: dict[str, str], startup_timeout: float):
+    from load_test import _free_port
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", str(BENCH_DIR / "gunicorn_stub_conf.py"), "main:app"],
+        cwd=SRC_DIR,
+        env={**env, "WEB_CONCURRENCY": str(workers), "HOST": "127.0.0.1", "PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+                with contextlib.suppress(httpx.HTTPError):
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                if time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn did not become healthy in time")
+                await asyncio.sleep(0.2)
+        yield base_url, process.pid
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _run(args, workers: int, env: dict[str, str], users: list[str]) -> dict[str, Any]:
+    from load_test import Recorder, _run_load, _summary
+
+    async with _gunicorn(workers, env, args.startup_timeout) as (base_url, master_pid):
+        if args.warmup:
+            await _run_load(base_url, args, Recorder(), users, requests=args.warmup, duration=None)
+        recorder = Recorder()
+        start = time.perf_counter()
+        await _run_load(base_url, args, recorder, users, requests=None, duration=args.duration)
+        elapsed = time.perf_counter() - start
+        memory = _workers_memory_mb(master_pid)
+
+    ok = [sample for sample in recorder.samples if sample.ok]
+    return {
+        "workers": workers,
+        "requests": len(recorder.samples),
+        "errors": len(recorder.samples) - len(ok),
+        "throughput_rps": len(ok) / elapsed,
+        "preload": not args.no_preload,
+        "latency": _summary([sample.latency for sample in ok]),
+        "ttft": _summary([sample.ttft for sample in ok if sample.ttft is not None]),
+        "workers_memory_mb": memory,
+    }
+
+
+async def _main(args) -> dict[str, Any]:
+    import stubs
+
+    with tempfile.TemporaryDirectory(prefix="perf-workers-") as workdir:
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+            "PYTHONPATH": os.pathsep.join([str(SRC_DIR), os.environ.get("PYTHONPATH", "")]),
+            "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite3"),
+            "PRELOAD_APP": str(not args.no_preload).lower(),
+            "CHECKPOINTER_TYPE": "sqlite",
+            "CHECKPOINT_SQLITE_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, "prometheus"),
+            "BENCH_VECTOR_DB_PATH": os.path.join(workdir, "vector_db"),
+            "BENCH_LLM_TTFT": str(args.llm_ttft),
+            "BENCH_LLM_TOKEN_LATENCY": str(args.llm_token_latency),
+            "BENCH_LLM_TOKENS": str(args.llm_tokens),
+            "BENCH_BACKEND_LATENCY": str(args.backend_latency),
+        }
+        # Seeding imports core, whose settings are read from the environment once.
+        os.environ.update({key: env[key] for key in ("OPENAI_API_KEY", "EMBEDDING_CACHE_PATH")})
+        from core.persistence.vector_db import embeddings_dimension
+
+        stubs.seed_local_vector_store(env["BENCH_VECTOR_DB_PATH"], args.users, embeddings_dimension)
+        users = stubs.user_ids(args.users)
+        runs = [await _run(args, workers, env, users) for workers in args.workers]
+
+    baseline = runs[0]["throughput_rps"] / runs[0]["workers"] if runs[0]["throughput_rps"] else None
+    for run in runs:
+        run["scaling_efficiency"] = run["throughput_rps"] / (baseline * run["workers"]) if baseline else None
+    return {"cpus": os.cpu_count(), "concurrency": args.concurrency, "runs": runs}
+
+
+def _print_report(report: dict[str, Any]):
+    print(f"\n{report['cpus']} CPUs, {report['concurrency']} concurrent clients")
+    print(f"{'workers':>8}{'req/s':>10}{'efficiency':>12}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'RSS MB':>10}{'PSS MB':>10}")
+    for run in report["runs"]:
+        latency = run["latency"]
+        memory = run["workers_memory_mb"] or {}
+        rss, pss = (f"{memory[key]:.0f}" if key in memory else "-" for key in ("rss", "pss"))
+        print(f"{run['workers']:>8}{run['throughput_rps']:>10.1f}{run['scaling_efficiency'] or 0:>12.0%}"
+              f"{run['errors']:>8}{latency.get('p50_ms', 0):>10.1f}{latency.get('p95_ms', 0):>10.1f}"
+              f"{latency.get('p99_ms', 0):>10.1f}{rss:>10}{pss:>10}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare.")
+    parser.add_argument("--no-preload", action="store_true", help="Run with PRELOAD_APP=false.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to measure per worker count.")
+    parser.add_argument("--warmup", type=int, default=50, help="Requests sent before measuring.")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="Fraction of requests sent to /stream.")
+    parser.add_argument("--users", type=int, default=1000, help="Number of distinct user profiles.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--startup-timeout", type=float, default=120.0, help="Seconds to wait for gunicorn.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-ttft", type=float, default=0.05, help="Stub LLM time to first token (s).")
+    parser.add_argument("--llm-token-latency", type=float, default=0.005, help="Stub LLM delay between tokens (s).")
+    parser.add_argument("--llm-tokens", type=int, default=40, help="Tokens per stub LLM answer.")
+    parser.add_argument("--backend-latency", type=float, default=0.02, help="Stub perf-agent-backend latency (s).")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = asyncio.run(_main(arguments))
+    _print_report(result)
+    if arguments.output:
+        Path(arguments.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(arguments.output).write_text(json.dumps(result, indent=2))
+        print(f"\nResults written to {arguments.output}")
@@ -1,3 +1,3 @@
-from agents.agents import DEFAULT_AGENT, get_agent, get_all_agent_info
+from agents.agents import DEFAULT_AGENT, build_agents, get_agent, get_all_agent_info, reset_checkpointers
 
-__all__ = ["get_agent", "get_all_agent_info", "DEFAULT_AGENT"]
+__all__ = ["get_agent", "get_all_agent_info", "build_agents", "reset_checkpointers", "DEFAULT_AGENT"]
@@ -2,88 +2,75 @@ import json
 import logging
 from datetime import datetime
 from typing import Any, Literal
-from functools import lru_cache, partial
+from functools import lru_cache
 import asyncio
+import time
 
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, BaseMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, BaseMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
+from langchain_core.runnables.config import merge_configs
 from langchain_core.tools import StructuredTool
 
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, END
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from agents.compaction import compact_messages
+from agents.fast_path import fast_path, fast_path_route
+from agents.prompts import build_prompt
 from agents.tools.recommend_fragrances import recommend_fragrances_func, FragranceRecommendationInput
+from agents.tools.similar_users import similar_users_preferences, SimilarUsersInput
 from agents.tools.unknown_information import provide_answer_for_missing_information, UnknownInformationInput
-from agents.utils import document_to_string, get_agent_request_value, get_last_message_content, get_last_user_message_content, AgentState, get_last_message, ToolResponse
+from agents.utils import document_to_string, get_agent_request_value, get_last_user_message_content, AgentState, get_last_message, ToolResponse
 from core.persistence.db_factory import get_vector_db_client
-from core.persistence.vector_db import GenericMetadataFilter
+from core.semantic_cache import profile_fingerprint
 from core import get_model, settings
+from core.metrics import TOOL_SECONDS, record_token_usage, timed_node
+from memory import initialize_database
 
 logger = logging.getLogger(__name__)
 
-INIT_SYSTEM_INSTRUCTIONS = f"""
-Today's date is {datetime.now().strftime("%B %d, %Y")}.
-
-You are a knowledgeable and helpful assistant that provides expert-level fragrance recommendations tailored to individual preferences via tools.
-You live in a system where users describe their favourite fragrances, their collection, scent interests, their fragrance collection or fragrance types, notes, performance characteristics (longevity, sillage), or specific brands and names.
-
-You may receive a request from the user involving some or all of the following elements:
-- "types": Fragrance categories such as "woody", "floral", "oriental", "fresh", etc.
-- "notes": Specific ingredients like "bergamot", "vanilla", "oud", "rose", etc.
-- "hasLongevity": Desired lasting power of the fragrance (e.g. "long-lasting", "moderate", "soft").
-- "hasSillage": Desired projection (e.g. "strong", "moderate", "intimate").
-- "brandName": A specific fragrance house or brand (e.g. "Dior", "Creed", "Maison Francis Kurkdjian").
-- "fragranceName": A known fragrance the user likes or is curious about.
-- "count": A limit on how many results to return.
-
-You may also receive a request that does not include any of the above elements, but is still related to fragrances. In this case, you should provide an answer related to the question via tools.
-
-Your job is to:
-1. Interpret the user's input, preferences, or questions clearly and convert them into a meaningful fragrance suggestion or insight.
-2. If necessary, make a selection of recommended fragrances based on the user's stated desires, tastes, or even context (e.g. season, occasion).
-3. Avoid referencing or mentioning system components such as APIs, databases, tools, frameworks, or any underlying mechanism.
-4. When applicable, you may highlight why a fragrance fits the criteria — e.g. its typical composition, performance, or brand signature.
-5. Present the output in a way that sounds natural, stylish, and human. Your tone is warm, elegant, and refined, like a fragrance concierge at a high-end boutique.
-6. Suggest fragrances suiting the user's preferences - notes, fragrances, types, but do not provide links or purchase options. Focus on the fragrance itself and its characteristics.
-
-Be prepared to reason through user input, even if it includes partial or loosely structured information. 
-If a user is unsure or open-ended and doesn't want experiment, help guide them with clarifying questions, or suggest discovery sets, (e.g. "If you enjoy amber and spice, you might love...").
-
-
-Do NOT say you couldn’t find something in “the system.” 
-Do not include links, code, or any mention of internal processes in your final responses.
-You are here to inspire, inform, and recommend — not to explain how the system works, do not tell to user that you don't know.
-"""
-
 NO_DOCS_FOUND_MESSAGE = "No relevant information found for the user. Tell the user to ask again.\n\n"
 
-def retrieve_data(state: AgentState, config: RunnableConfig) -> AgentState:
+def profile_route(state: AgentState, config: RunnableConfig) -> Literal["retriever", "fast_path"]:
+    """
+    Load the profile when the thread starts, when the thread is continued for another user, or once
+    the loaded profile is older than PROFILE_RECHECK_INTERVAL; otherwise reuse the one in the state.
+    """
     user_id = get_agent_request_value(config, "user_id", "")
-    filters = GenericMetadataFilter(
-        user_id=user_id,
-    )
+    if not state.get("profile_version") or state.get("profile_user_id") != user_id:
+        return "retriever"
+    if time.time() - state.get("profile_checked_at", 0.0) >= settings.PROFILE_RECHECK_INTERVAL:
+        return "retriever"
+    return "fast_path"
+
 
-    last_message_content = get_last_message_content(state)
+async def retrieve_data(state: AgentState, config: RunnableConfig) -> AgentState:
+    user_id = get_agent_request_value(config, "user_id", "")
 
     vector_db_client = get_vector_db_client()
-    vector_result = vector_db_client.get_document(doc_id=user_id)
-    #vector_result = vector_db_client.search_documents(query=last_message_content, filters=filters)
+    vector_result = await vector_db_client.aget_document(doc_id=user_id)
+    version = profile_fingerprint(vector_result)
+    if version == state.get("profile_version") and user_id == state.get("profile_user_id"):
+        logger.debug("User information unchanged.")
+        return {"profile_checked_at": time.time()}
 
     init_message = "------ Starting obtaining user information from database ----- \n"
     if vector_result:
-        print(f"User information found: {vector_result.page_content.strip()}")
-        #retrieved_docs = f"User information:\n{vector_result[0].page_content.strip()}\n"
+        logger.debug(f"User information found: {vector_result.page_content.strip()}")
         retrieved_docs = vector_result.page_content.strip()
     else:
-        print("No user information found.")
+        logger.debug("No user information found.")
         retrieved_docs = NO_DOCS_FOUND_MESSAGE
 
     end_message = "\n----- End obtaining user information from the vector database -----"
 
-    return {"messages": state["messages"] + [SystemMessage(content=init_message + retrieved_docs + end_message)]}
+    return {
+        "profile": init_message + retrieved_docs + end_message,
+        "profile_user_id": user_id,
+        "profile_version": version,
+        "profile_checked_at": time.time(),
+    }
 
 
 @lru_cache(maxsize=1)
@@ -93,61 +80,60 @@ def get_agent_tools():
     As they are not dynamic, we can cache them.
     """
     recommend_fragrances_tool = StructuredTool.from_function(
-        func=recommend_fragrances_func,
+        coroutine=recommend_fragrances_func,
         name="recommend_fragrances_func",
         args_schema=FragranceRecommendationInput
     )
 
     answer_for_missing_information_tool = StructuredTool.from_function(
-        func=provide_answer_for_missing_information,
+        coroutine=provide_answer_for_missing_information,
         name="provide_answer_for_missing_information",
         args_schema=UnknownInformationInput
     )
 
-    return [
+    tools = [
         recommend_fragrances_tool,
         answer_for_missing_information_tool
     ]
-
-def combine_system_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
-    system_messages = [m.content for m in messages if isinstance(m, SystemMessage)] # TODO what are other system messages
-    other_messages = [m for m in messages if not isinstance(m, SystemMessage)] # here are the tools
-
-    # Combine all system messages into one
-    combined_system_msg = SystemMessage(content="\n\n".join([INIT_SYSTEM_INSTRUCTIONS] + system_messages))
-
-    return [combined_system_msg] + other_messages
-
-
-def wrap_model(model: BaseChatModel, user_id: str, user_question: str) -> RunnableSerializable[Any, BaseMessage]:
-    model = model.bind_tools(get_agent_tools()).with_config(
-        metadata={
-            "user_id": user_id,
-            "user_question": user_question,
-        }
-    )
-
+    if settings.SIMILAR_USERS_ENABLED:
+        tools.append(StructuredTool.from_function(
+            coroutine=similar_users_preferences,
+            name="similar_users_preferences",
+            args_schema=SimilarUsersInput
+        ))
+    return tools
+
+@lru_cache(maxsize=32)
+def get_bound_model(model_name: str) -> RunnableSerializable[Any, BaseMessage]:
+    """
+    Prompt assembly piped into the tool-bound model, built once per model instead of re-binding the
+    tool schemas on every model call.
+    """
     preprocessor = RunnableLambda(
-        lambda state: combine_system_messages(state["messages"]),
+        lambda state: build_prompt(state["messages"], state.get("summary", ""), state.get("profile", "")),
         name="StateModifier",
     )
-    return preprocessor | model
+    return preprocessor | get_model(model_name).bind_tools(get_agent_tools())
+
 
 async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
-    model = get_model(get_agent_request_value(config, "model", settings.DEFAULT_MODEL))
+    model_name = get_agent_request_value(config, "model", settings.DEFAULT_MODEL)
 
     user_id = get_agent_request_value(config, "user_id", "")
     user_question = get_last_user_message_content(state)
     
-    print(f"LAST USER User question: {user_question}")
+    logger.debug(f"Last user question: {user_question}")
 
-    model_runnable = wrap_model(model, user_id, user_question)
+    model_runnable = get_bound_model(model_name)
+    config = merge_configs(config, {"metadata": {"user_id": user_id, "user_question": user_question}})
 
     response = await model_runnable.ainvoke(state, config)
-    state["messages"].append(response)
+    record_token_usage(model_name, response)
+    # Only the new message: node outputs are streamed to the client, and a continued thread's earlier
+    # messages must not be re-sent.
     if response.tool_calls:
-        state["tool_calls"] = response.tool_calls
-    return state
+        return {"messages": [response], "tool_calls": response.tool_calls}
+    return {"messages": [response]}
 
 def pending_tool_calls(state: AgentState) -> Literal["tools", "done"]:
     """
@@ -164,23 +150,30 @@ def pending_tool_calls(state: AgentState) -> Literal["tools", "done"]:
 
 async def call_tools(state: AgentState, config: RunnableConfig) -> AgentState:
     tasks = []
-    assets = state.get("assets", [])
+    assets = list(state.get("assets", []))
     for tool_call in state["tool_calls"]:
         tool_func = next((t for t in get_agent_tools() if t.name == tool_call["name"]), None)
         if tool_func:
             tasks.append(run_tool(tool_func, tool_call["args"], tool_call["id"], config))
 
     results = await asyncio.gather(*tasks)
+    tool_msgs = []
     for tool_msg, tool_assets in results:
-        state["messages"].append(tool_msg)
+        tool_msgs.append(tool_msg)
         assets.extend(tool_assets)
 
-    state["assets"] = assets
-    return state
+    return {"messages": tool_msgs, "assets": assets}
 
 async def run_tool(tool_func, args, tool_call_id, config):
-    loop = asyncio.get_running_loop()
-    result = await loop.run_in_executor(None, partial(tool_func.invoke, args, config))
+    # Every agent tool is a coroutine and runs on the event loop, so a cancelled request cancels it too.
+    # The tool call id in the metadata lets tools label what they stream to the client.
+    start = time.perf_counter()
+    status = "error"
+    try:
+        result = await tool_func.ainvoke(args, merge_configs(config, {"metadata": {"tool_call_id": tool_call_id}}))
+        status = "ok"
+    finally:
+        TOOL_SECONDS.labels(tool_func.name, status).observe(time.perf_counter() - start)
 
     try:
         parsed = ToolResponse.model_validate(json.loads(result))
@@ -202,22 +195,24 @@ def build_agent_graph():
     This is where the agent's flow and logic are defined.
     """
     agent = StateGraph(AgentState)
-    agent.add_node("retriever", retrieve_data)
-    agent.add_node("model", acall_model)
+    agent.add_node("retriever", timed_node("retriever", retrieve_data))
+    agent.add_node("fast_path", timed_node("fast_path", fast_path))
+    agent.add_node("compact", timed_node("compact", compact_messages))
+    agent.add_node("model", timed_node("model", acall_model))
 
-    agent.set_entry_point("retriever")
+    agent.set_conditional_entry_point(profile_route, {"retriever": "retriever", "fast_path": "fast_path"})
 
-    agent.add_edge("retriever", "model")
-    agent.add_edge("tools", "model")
+    agent.add_edge("retriever", "fast_path")
+    agent.add_conditional_edges("fast_path", fast_path_route, {"tools": "tools", "model": "compact"})
+    agent.add_edge("tools", "compact")
+    agent.add_edge("compact", "model")
 
-    agent.add_node("tools", call_tools)
+    agent.add_node("tools", timed_node("tools", call_tools))
     agent.add_conditional_edges("model", pending_tool_calls, {"tools": "tools", "done": END})
 
     # Compile and expose the agent graph
-    return agent.compile(checkpointer=MemorySaver())
+    return agent.compile(checkpointer=initialize_database())
 
-# Compile and expose the agent graph
-agentic_rag = build_agent_graph()
 #
 # output_dir = "static/images"
 # os.makedirs(output_dir, exist_ok=True)
@@ -1,9 +1,11 @@
+import threading
 from dataclasses import dataclass
+from typing import Callable, Optional
 
 from langgraph.graph.state import CompiledStateGraph
 
-from agents.agentic_rag import agentic_rag
 from core import settings
+from memory import initialize_database
 from schema import AgentInfo
 
 DEFAULT_AGENT = settings.DEFAULT_AGENT
@@ -13,19 +15,47 @@ RECOMMENDATION_AGENT = "agentic-rag-alfa"
 @dataclass
 class Agent:
     description: str
-    graph: CompiledStateGraph
+    # Compiles the graph; called once, on first use or by the startup warm-up.
+    build: Callable[[], CompiledStateGraph]
+    graph: Optional[CompiledStateGraph] = None
+
+
+def _build_agentic_rag() -> CompiledStateGraph:
+    # The graph module pulls in the tools and their clients; import it only when the graph is needed.
+    from agents.agentic_rag import build_agent_graph
+
+    return build_agent_graph()
 
 
 agents: dict[str, Agent] = {
-    RECOMMENDATION_AGENT: Agent(description="Fragrances recommendation.", graph=agentic_rag),
+    RECOMMENDATION_AGENT: Agent(description="Fragrances recommendation.", build=_build_agentic_rag),
 }
+_build_lock = threading.Lock()
 
 
 def get_agent(agent_id: str) -> CompiledStateGraph:
-    return agents[agent_id].graph
+    agent = agents[agent_id]
+    if agent.graph is None:
+        with _build_lock:
+            if agent.graph is None:
+                agent.graph = agent.build()
+    return agent.graph
+
+
+def build_agents():
+    """Compile every agent graph now instead of on its first request."""
+    for agent_id in agents:
+        get_agent(agent_id)
 
 
 def get_all_agent_info() -> list[AgentInfo]:
     return [
         AgentInfo(key=agent_id, description=agent.description) for agent_id, agent in agents.items()
     ]
+
+
+def reset_checkpointers():
+    """Give every compiled graph a new checkpointer, so a forked worker opens its own storage connections."""
+    for agent in agents.values():
+        if agent.graph is not None:
+            agent.graph.checkpointer = initialize_database()
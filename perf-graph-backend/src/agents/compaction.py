@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+import tiktoken
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+from agents.utils import AgentState, get_agent_request_value
+from core import get_model, settings
+from core.metrics import record_token_usage
+
+logger = logging.getLogger(__name__)
+
+# Tokens the chat format adds around every message (role, separators), as in OpenAI's cookbook.
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a user and a fragrance concierge.
+Merge the previous summary with the new messages below into one concise summary.
+Keep the user's stated preferences, dislikes, constraints (budget, season, occasion), fragrances already
+recommended and any open questions. Drop greetings, repetition and styling. Write plain prose, at most 200 words.
+"""
+
+_counters: dict[str, Callable[[str], int]] = {}
+_counters_lock = threading.Lock()
+
+
+def _load_counter(model_name: str) -> Callable[[str], int]:
+    with _counters_lock:
+        if model_name not in _counters:
+            _counters[model_name] = _new_counter(model_name)
+        return _counters[model_name]
+
+
+def _new_counter(model_name: str) -> Callable[[str], int]:
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # tiktoken downloads its BPE files on first use; without them fall back to an estimate.
+        logger.warning(f"No tiktoken encoding for '{model_name}' ({e}); estimating 4 characters per token.")
+        return lambda text: len(text) // 4 + 1
+
+    # Memoized: a thread's older messages are re-counted on every model call.
+    @lru_cache(maxsize=4096)
+    def count(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return count
+
+
+async def aget_token_counter(model_name: str) -> Callable[[str], int]:
+    """Token counter for `model_name`, loaded off the event loop the first time (it may hit the network)."""
+    counter = _counters.get(model_name)
+    if counter is None:
+        counter = await asyncio.to_thread(_load_counter, model_name)
+    return counter
+
+
+def preload_token_counters(model_names: Iterable[str]):
+    """Load token counters up front, e.g. in the gunicorn master so forked workers share the encodings."""
+    for model_name in model_names:
+        _load_counter(str(model_name))
+
+
+def count_message_tokens(message: BaseMessage, count: Callable[[str], int]) -> int:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    tokens = _MESSAGE_OVERHEAD_TOKENS + count(content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += count(json.dumps([[call["name"], call["args"]] for call in message.tool_calls]))
+    return tokens
+
+
+def token_budget(model_name: str) -> int:
+    return settings.COMPACTION_TOKEN_BUDGETS.get(str(model_name), settings.COMPACTION_DEFAULT_TOKEN_BUDGET)
+
+
+def _transcript(messages: list[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        match message:
+            case HumanMessage():
+                lines.append(f"User: {message.content}")
+            case AIMessage() if message.tool_calls:
+                lines.append("Assistant looked up: " + ", ".join(json.dumps(call["args"]) for call in message.tool_calls))
+            case AIMessage():
+                lines.append(f"Assistant: {message.content}")
+            case ToolMessage():
+                lines.append(f"Lookup result: {message.content}")
+    return "\n".join(lines)
+
+
+async def summarize(model_name: str, summary: str, messages: list[BaseMessage], config: RunnableConfig) -> str:
+    """Fold `messages` into the running `summary` with one (non-streamed) LLM call."""
+    model = get_model(model_name).with_config(tags=["compaction"])
+    response = await model.ainvoke(
+        [
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=f"Previous summary:\n{summary or '(none)'}\n\nNew messages:\n{_transcript(messages)}"),
+        ],
+        config,
+    )
+    record_token_usage(model_name, response)
+    return response.content.strip()
+
+
+def _cut_index(messages: list[BaseMessage], tokens: list[int], keep_budget: int) -> int:
+    """
+    Index from which messages are kept verbatim: the earliest HumanMessage whose tail fits in
+    `keep_budget`, but never later than the last HumanMessage, so the current turn (and every tool
+    call/result pair) stays intact.
+    """
+    human_indexes = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not human_indexes:
+        return 0
+    cut = human_indexes[-1]
+    tail = sum(tokens[cut:])
+    for index in reversed(human_indexes[:-1]):
+        tail += sum(tokens[index:cut])
+        if tail > keep_budget:
+            break
+        cut = index
+    return cut
+
+
+async def compact_messages(state: AgentState, config: RunnableConfig) -> dict[str, Any]:
+    """
+    Keep the prompt within the model's token budget.
+
+    The profile and summary count towards the budget but are never dropped. If the conversation is
+    over budget, whole turns before the kept tail are folded into `state["summary"]` and removed
+    from the state.
+    """
+    messages = state["messages"]
+    model_name = get_agent_request_value(config, "model", settings.DEFAULT_MODEL)
+    count = await aget_token_counter(str(model_name))
+    summary = state.get("summary", "")
+    profile = state.get("profile", "")
+    tokens = [count_message_tokens(m, count) for m in messages]
+    total = sum(tokens) + sum(count(text) for text in (summary, profile) if text)
+    budget = token_budget(model_name)
+
+    if total <= budget:
+        return {}
+    cut = _cut_index(messages, tokens, int(budget * settings.COMPACTION_KEEP_RATIO))
+    older = messages[:cut]
+    if not older:
+        return {}
+    logger.debug(f"Compacting {len(older)} messages ({total} tokens over a {budget} token budget).")
+    return {
+        "summary": await summarize(model_name, summary, older, config),
+        "messages": [RemoveMessage(id=message.id) for message in older],
+    }
@@ -0,0 +1,197 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Literal, Optional
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+
+from agents.tools.recommend_fragrances import FragranceRecommendationInput
+from agents.utils import AgentState, get_last_user_message_content
+from core import settings
+from core.metrics import FAST_PATH_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Vocabulary of the perf-agent-backend ontology (fragrAIntica.owx). The backend matches notes, types,
+# longevity and sillage case-sensitively, so the values below are the exact strings it expects.
+NOTES = (
+    "Aldehydes", "Almond", "Amber", "Ambergris", "Amberwood", "Ambrette", "Ambrette Seed", "Ambrox",
+    "Ambroxan", "Apple", "Aquatic Notes", "Bamboo", "Bay Leaf", "Benzoin", "Bergamot", "Black Currant",
+    "Black Pepper", "Black Truffle", "Blood Mandarin", "Cacao", "Calabrian Bergamot", "Caramel", "Cardamom",
+    "Carnation", "Cedar", "Cedarwood", "Chestnut", "Chinese Pepper", "Chocolate", "Cinnamon", "Clary Sage",
+    "Coffee", "Coriander", "Cumin", "Cyclamen", "Damask Rose", "Fig Leaves", "Fir Resin", "Freesia",
+    "Fruity Accords", "Gardenia", "Geranium", "Ginger", "Grapefruit", "Green Mandarin", "Green Notes",
+    "Green Tea", "Honey", "Honeysuckle", "Incense", "Iris", "Jasmine", "Juniper", "Kulfi Accord", "Lavender",
+    "Leather", "Lemon", "Lily", "Lily-of-the-Valley", "Lotus", "Lychee", "Mandarin", "Melon", "Mint", "Musk",
+    "Myrrh", "Neroli", "Nutmeg", "Opoponax", "Orange", "Orange Blossom", "Orange Flower", "Orchid", "Oregano",
+    "Orris", "Oud", "Papyrus", "Patchouli", "Pear", "Pelargonium", "Peony", "Pepper", "Pine", "Pineapple",
+    "Pink Pepper", "Rangoon Creeper", "Red Algae", "Red Berries", "Rose", "Rosemary", "Rosewood", "Saffron",
+    "Sage", "Sandalwood", "Sea Notes", "Sea Salt", "Seaweed", "Sichuan Pepper", "Sicilian Lemon", "Smoke",
+    "Spices", "Star Anise", "Sugar", "Tobacco Leaf", "Tonka Bean", "Tuberose", "Tulip", "Tunisian Neroli",
+    "Vanilla", "Verbena", "Vetiver", "Violet", "Violet Accord", "Water Lily", "White Rose", "Woody Accords",
+    "Ylang-Ylang",
+)
+TYPES = {
+    "Woody": ("woody", "woods"),
+    "Floral": ("floral", "flowery"),
+    "Fresh": ("fresh",),
+    "Gourmand": ("gourmand",),
+    "Oriental": ("oriental",),
+}
+BRANDS = (
+    "Armani", "Byredo", "Calvin Klein", "Chanel", "Dior", "Diptyque", "Dolce and Gabbana", "Giorgio Armani",
+    "Gucci", "Guerlain", "Hermès", "Jean Paul Gaultier", "Jo Malone", "Kilian", "Le Labo",
+    "Maison Francis Kurkdjian", "Maison Margiela", "Mugler", "Narciso Rodriguez", "Paco Rabanne", "Prada",
+    "Serge Lutens", "Tom Ford", "Trussardi", "Versace", "YSL",
+)
+LONGEVITY = {
+    "LongLongevity": ("long-lasting", "long lasting", "lasts all day", "all-day", "all day", "long longevity",
+                      "great longevity", "lasts long"),
+    "ModerateLongevity": ("moderate longevity", "average longevity"),
+    "ShortLongevity": ("short longevity", "short-lived", "short lived"),
+}
+SILLAGE = {
+    "BeastModeSillage": ("beast mode", "beast-mode", "beastmode"),
+    "StrongSillage": ("strong sillage", "strong projection", "projects well", "loud"),
+    "ModerateSillage": ("moderate sillage", "moderate projection"),
+}
+# Catalog fragrances. A request naming one ("something like Sauvage") is about that fragrance and
+# needs the model's judgement, so any of these sends the request down the normal path.
+FRAGRANCE_NAMES = (
+    "Acqua di Gio", "Acqua di Gioia", "Code Profumo", "Baccarat Rouge 540", "Flowerhead", "Gypsy Water",
+    "CK One", "Coco Noir", "No. 5", "Dior Homme", "Sauvage", "J’adore", "Eau Rose", "Light Blue", "Eternity",
+    "Bloom", "Guilty", "Pour Homme", "Shalimar", "Le Male", "Red Roses", "Santal 33", "Love, Don’t Be Shy",
+    "Jazz Club", "A*Men", "Angel", "Narciso Rodriguez for Her", "Neroli Portofino", "1 Million", "Candy",
+    "L’Homme", "By the Fireplace", "Ambre Sultan", "Terre d’Hermès", "Black Orchid", "Noir Extreme",
+    "Noir Femme", "Oud Wood", "Tobacco Vanille", "Dylan Blue", "Wood Sage and Sea Salt", "Black Opium",
+    "La Nuit",
+)
+
+# Phrasings that ask for an explanation, a comparison or an exclusion: the structured tool cannot express them.
+_NEEDS_MODEL = re.compile(
+    r"\b(?:why|how|explain|tell me|difference|compare|versus|vs|similar|alternative|alternatives|dupe|dupes|"
+    r"layer|layering|not|no|without|except|avoid|hate|dislike|don'?t|never|instead|cheaper|price|budget)\b",
+    re.IGNORECASE,
+)
+# Request phrasing that carries no preference of its own.
+_FILLER = frozenset("""
+    a an and any anything are be best can could do for fragrance fragrances from give good great has have i
+    in is it looking look love like me more my need nice notes note of on one ones or perfume perfumes please
+    recommend recommendation recommendations scent scents smell smelling some something suggest suggestion
+    suggestions that the to try want which with would you cologne colognes featuring containing by find show
+    options really very i'm im i'd id prefer enjoy get also
+""".split())
+_WORD = re.compile(r"[^\W_]+(?:['’\-][^\W_]+)*")
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                 "nine": 9, "ten": 10}
+_COUNT = re.compile(
+    r"\b(?:top\s+)?(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")\s+(?:\w+\s+){0,2}?"
+    r"(?:fragrances|perfumes|scents|colognes|options|recommendations|suggestions|ones)\b"
+    r"|\btop\s+(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")\b",
+    re.IGNORECASE,
+)
+
+
+def _phrase_key(phrase: str) -> str:
+    return re.sub(r"[\s\-]+", " ", phrase.casefold().replace("’", "'")).strip()
+
+
+def _gazetteer(phrases: dict[str, str], plurals: bool = False) -> tuple[re.Pattern, dict[str, str]]:
+    """Compile `phrase -> canonical value` into one longest-match-first alternation."""
+    lookup = {_phrase_key(phrase): value for phrase, value in phrases.items()}
+    alternatives = sorted(lookup, key=len, reverse=True)
+    body = "|".join(
+        r"[\s\-]+".join(re.escape(word).replace("'", "['’]") for word in key.split(" ")) for key in alternatives
+    )
+    suffix = r"(?:e?s)?" if plurals else ""
+    return re.compile(rf"(?<![^\W_])(?P<phrase>{body}){suffix}(?![^\W_])", re.IGNORECASE), lookup
+
+
+_NAME_PATTERN, _ = _gazetteer({name: name for name in FRAGRANCE_NAMES})
+_CATEGORIES = (
+    # Order matters: earlier categories consume their spans first ("Woody Accords" is a note, not a type).
+    ("hasLongevity", *_gazetteer({p: value for value, ps in LONGEVITY.items() for p in ps})),
+    ("hasSillage", *_gazetteer({p: value for value, ps in SILLAGE.items() for p in ps})),
+    ("brandName", *_gazetteer({brand: brand for brand in BRANDS})),
+    ("notes", *_gazetteer({note: note for note in NOTES}, plurals=True)),
+    ("types", *_gazetteer({p: value for value, ps in TYPES.items() for p in ps})),
+)
+
+
+@dataclass
+class Extraction:
+    request: FragranceRecommendationInput
+    confidence: float
+
+
+def extract_recommendation_request(text: str) -> Optional[Extraction]:
+    """
+    Map a free-text request onto `FragranceRecommendationInput` with the gazetteers above.
+
+    Returns None when the text mentions no known preference, names a specific fragrance, mentions
+    more than one brand or asks for something the tool cannot express. `confidence` is the share of
+    the request's meaningful words that were recognised.
+    """
+    if _NEEDS_MODEL.search(text) or _NAME_PATTERN.search(text):
+        return None
+
+    fields: dict[str, list[str]] = {}
+    remaining = text
+    matched_words = 0
+    for field, pattern, lookup in _CATEGORIES:
+        for match in pattern.finditer(remaining):
+            value = lookup[_phrase_key(match.group("phrase"))]
+            if value not in fields.setdefault(field, []):
+                fields[field].append(value)
+            matched_words += len(_WORD.findall(match.group(0)))
+        remaining = pattern.sub(" ", remaining)
+    if not any(fields.values()) or len(fields.get("brandName", [])) > 1:
+        return None
+
+    count = 3
+    if match := _COUNT.search(remaining):
+        number = match.group(1) or match.group(2)
+        count = int(_NUMBER_WORDS.get(number.casefold(), number))
+        remaining = remaining[:match.start()] + " " + remaining[match.end():]
+
+    unmatched = [word for word in _WORD.findall(remaining.casefold()) if word not in _FILLER]
+    brand = fields.pop("brandName", [None])[0]
+    request = FragranceRecommendationInput(**fields, brandName=brand, count=count)
+    return Extraction(request, matched_words / (matched_words + len(unmatched)))
+
+
+async def fast_path(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Answer structured requests without the tool-selection LLM call: when the user's message maps
+    onto `recommend_fragrances_func` with enough confidence, emit that tool call directly, so the
+    only LLM call left is the one phrasing the answer.
+    """
+    if not settings.FAST_PATH_ENABLED:
+        return {}
+    extraction = extract_recommendation_request(get_last_user_message_content(state))
+    if extraction is None:
+        FAST_PATH_DECISIONS.labels("no_match").inc()
+        return {}
+    if extraction.confidence < settings.FAST_PATH_MIN_CONFIDENCE:
+        FAST_PATH_DECISIONS.labels("low_confidence").inc()
+        return {}
+
+    FAST_PATH_DECISIONS.labels("hit").inc()
+    tool_call = {
+        "name": "recommend_fragrances_func",
+        "args": extraction.request.model_dump(exclude_defaults=True) | {"count": extraction.request.count},
+        "id": f"call_fast_{uuid4().hex[:20]}",
+        "type": "tool_call",
+    }
+    logger.debug(f"Fast path tool call (confidence {extraction.confidence:.2f}): {tool_call['args']}")
+    message = AIMessage(content="", tool_calls=[tool_call], response_metadata={"fast_path": True})
+    return {"messages": [message], "tool_calls": [tool_call]}
+
+
+def fast_path_route(state: AgentState) -> Literal["tools", "model"]:
+    last_message = state["messages"][-1]
+    if isinstance(last_message, AIMessage) and last_message.tool_calls:
+        return "tools"
+    return "model"
@@ -8,8 +8,11 @@ import json
 from pydantic import BaseModel, Field
 from agents.utils import ToolResponse, ToolAsset, get_agent_request_value
 from core import settings
+from core.cache import ResultCache
+from core.catalog import get_catalog_replica
 from core.recommendation_client import get_recommendation_client
 from langchain_core.runnables import RunnableConfig
+from schema.clients import FragranceResponseModel
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +39,75 @@ class FragranceRecommendationInput(BaseModel):
     fragranceName: Optional[str] = Field(description="A specific fragrance name to match against (e.g. 'Baccarat Rouge 540').", default=None)
     count: Optional[int] = Field(description="Maximum number of recommendations to return.", default=3)
 
-def recommend_fragrances_func(
+# Requested counts are rounded up to these sizes, so e.g. count=3 and count=4 share one backend response.
+COUNT_BUCKETS = (3, 5, 10, 20, 50)
+
+recommendation_cache = ResultCache(
+    name="recommendations",
+    maxsize=settings.RECOMMENDATION_CACHE_MAXSIZE,
+    ttl=settings.RECOMMENDATION_CACHE_TTL,
+)
+
+def _normalize_values(values: Optional[List[str]]) -> List[str]:
+    return sorted({v.strip() for v in values or [] if v and v.strip()})
+
+def _normalize_name(value: Optional[str]) -> Optional[str]:
+    return value.strip().casefold() if value and value.strip() else None
+
+def _bucket_count(count: Optional[int]) -> Optional[int]:
+    if count is None or count <= 0:
+        return None
+    return next((bucket for bucket in COUNT_BUCKETS if count <= bucket), count)
+
+def normalize_recommendation_input(request: FragranceRecommendationInput) -> FragranceRecommendationInput:
+    """
+    Canonical form of a recommendation request, used both as the cache key and as the upstream payload.
+    List values are de-duplicated and sorted but keep their case, since the backend matches them case-sensitively;
+    brand and fragrance names are case-folded as the backend compares them case-insensitively.
+    """
+    return FragranceRecommendationInput(
+        types=_normalize_values(request.types),
+        notes=_normalize_values(request.notes),
+        hasLongevity=_normalize_values(request.hasLongevity),
+        hasSillage=_normalize_values(request.hasSillage),
+        brandName=_normalize_name(request.brandName),
+        fragranceName=_normalize_name(request.fragranceName),
+        count=_bucket_count(request.count),
+    )
+
+def recommendation_cache_key(request: FragranceRecommendationInput) -> tuple:
+    return (
+        tuple(request.types),
+        tuple(request.notes),
+        tuple(request.hasLongevity),
+        tuple(request.hasSillage),
+        request.brandName,
+        request.fragranceName,
+        request.count,
+    )
+
+async def fetch_recommendations(
+    request: FragranceRecommendationInput, count: Optional[int]
+) -> Optional[List[FragranceResponseModel]]:
+    """
+    Answer a normalized request from the local catalog replica when one is loaded, otherwise from
+    the backend (through the result cache). None means nothing matched, as with the backend.
+    """
+    catalog_replica = get_catalog_replica()
+    if catalog_replica is not None:
+        fragrances = catalog_replica.recommend(**request.model_dump(exclude={"count"}), count=count)
+        if fragrances is not None:
+            return fragrances or None
+
+    client = get_recommendation_client()
+    if settings.RECOMMENDATION_CACHE_ENABLED:
+        return await recommendation_cache.aget_or_load(
+            recommendation_cache_key(request),
+            lambda: client.recommend_fragrances(**request.model_dump()),
+        )
+    return await client.recommend_fragrances(**request.model_dump())
+
+async def recommend_fragrances_func(
     config: RunnableConfig,
     types: Optional[List[str]] = [],
     notes: Optional[List[str]] = [],
@@ -77,16 +148,24 @@ def recommend_fragrances_func(
     Returns:
         List[Fragrance]: A curated list of recommended fragrances matching the input preferences.
     """
-    print("=================recommend_fragrances_func")
     user_id = get_agent_request_value(config, "user_id")
     logger.info(f"Recommending fragrances for user with ID: {user_id}")
 
-    client = get_recommendation_client()
-    fragrances_info = client.recommend_fragrances(types, notes, hasLongevity, hasSillage, brandName, fragranceName, count)
+    request = normalize_recommendation_input(FragranceRecommendationInput(
+        types=types,
+        notes=notes,
+        hasLongevity=hasLongevity,
+        hasSillage=hasSillage,
+        brandName=brandName,
+        fragranceName=fragranceName,
+        count=count,
+    ))
+    fragrances_info = await fetch_recommendations(request, count if count and count > 0 else None)
+    if fragrances_info is not None and count and count > 0:
+        fragrances_info = fragrances_info[:count]
     logger.info(f"Fetched fragrance recommendations for user with ID: {user_id}")
 
-    print("Fragrance recommendations")
-    print(fragrances_info)
+    logger.debug(f"Fragrance recommendations: {fragrances_info}")
 
     if fragrances_info is None:
         return ToolResponse(message="No fragrances are detected from our system", assets=[]).model_dump_json()
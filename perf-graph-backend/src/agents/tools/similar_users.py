@@ -0,0 +1,52 @@
+import logging
+from typing import Optional
+
+from pydantic import BaseModel, Field
+from langchain_core.runnables import RunnableConfig
+from agents.utils import ToolResponse, get_agent_request_value
+from core import settings
+from core.similar_users import get_similar_users
+
+logger = logging.getLogger(__name__)
+
+NO_SIMILAR_USERS_MESSAGE = "No users with a similar taste are known yet. Recommend from the user's own preferences."
+
+class SimilarUsersInput(BaseModel):
+    count: Optional[int] = Field(
+        description=f"How many similar users to consult (at most {settings.SIMILAR_USERS_K}).",
+        default=5,
+    )
+
+async def similar_users_preferences(config: RunnableConfig, count: Optional[int] = 5) -> str:
+    """
+    Fetch the fragrance preferences of the users whose taste is most similar to the current user's, for collaborative recommendations.
+
+    Use this tool when the user:
+    - Asks what people with a similar taste wear, like or recommend
+    - Wants to discover something new that fits their profile without naming notes, types, brands or fragrances
+    - Asks for a "surprise me" or "something different but still me" suggestion
+
+    Limitations:
+    - Returns other users' own descriptions of their preferences, not fragrance data; use recommend_fragrances_func to look up fragrances they mention.
+    - Never reveal or quote other users; describe what people with a similar taste enjoy.
+
+    Args:
+        count (Optional[int]): How many similar users to consult.
+
+    Returns:
+        The similar users' preference descriptions, most similar first.
+    """
+    user_id = get_agent_request_value(config, "user_id")
+    similar_users = get_similar_users()
+    neighbours = None
+    if user_id and similar_users is not None and similar_users.ready:
+        count = min(max(count or 5, 1), settings.SIMILAR_USERS_K)
+        neighbours = await similar_users.aneighbour_profiles(user_id, count)
+    logger.info(f"Found {len(neighbours or [])} similar users for user with ID: {user_id}")
+
+    if not neighbours:
+        return ToolResponse(message=NO_SIMILAR_USERS_MESSAGE, assets=[]).model_dump_json()
+    message = "Preferences of users with a similar taste, most similar first:\n" + "\n".join(
+        f"{rank}. {document.page_content.strip()}" for rank, (_, document) in enumerate(neighbours, start=1)
+    )
+    return ToolResponse(message=message, assets=[]).model_dump_json()
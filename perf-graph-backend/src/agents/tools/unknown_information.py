@@ -1,18 +1,11 @@
 import logging
-from io import BytesIO
-from typing import List
-import base64
-import mimetypes
-from langchain_openai import ChatOpenAI
-from PIL import ImageFont, Image, ImageDraw
-import json
-from core import get_model, settings
 from pydantic import BaseModel, Field
 from langchain_core.runnables import RunnableConfig
-from agents.utils import ToolResponse, ToolAsset, get_agent_request_value
-from core import settings
 from langchain_core.messages import SystemMessage, HumanMessage
+from agents.utils import CustomData, ToolResponse, get_agent_request_value
+from core import get_model, settings
 from core.persistence.db_factory import get_vector_db_client
+from core.metrics import record_token_usage
 
 logger = logging.getLogger(__name__)
 
@@ -26,11 +19,14 @@ SYSTEM_PROMPT = (
 """
 )
 
+# Tag of the expert model's runs: its tokens reach the client as `expert_token` custom messages,
+# not as answer tokens of the agent.
+EXPERT_LLM_TAG = "expert_llm"
+
 class UnknownInformationInput(BaseModel):
     user_question: str = Field(..., description="The question the user is asking about the fragrance.")
-    config: RunnableConfig
 
-def provide_answer_for_missing_information(user_question: str, config: RunnableConfig) -> str:
+async def provide_answer_for_missing_information(user_question: str, config: RunnableConfig) -> str:
     """
     Solve the problem of incomplete context about fragrances by fetching expert AI insight when the provided user information lacks the details needed to answer a user's query.
 
@@ -41,29 +37,31 @@ def provide_answer_for_missing_information(user_question: str, config: RunnableC
 
     Use this tool only when the assistant cannot answer directly from the available text and must retrieve missing recommendation about the fragrance.
     """
-    print("=================provide_answer_for_missing_information")
     user_id = get_agent_request_value(config, "user_id")
 
-    user_preferences = get_vector_db_client().get_document(user_id).page_content.strip()
+    document = await get_vector_db_client().aget_document(user_id) if user_id else None
+    user_preferences = document.page_content.strip() if document else ""
 
     if not user_preferences or user_preferences == "":
         user_preferences = "No user preferences found. Provide information according to the user question."
 
-    print("user_preferences")
-    print(user_preferences)
+    logger.debug(f"User preferences: {user_preferences}")
 
     logger.info(f"Getting fragrancess")
-    ai_msg = ask_llm(user_question, user_preferences)
-    print("ai_msg")
-    print(ai_msg)
+    ai_msg = await ask_llm(user_question, user_preferences, config)
+    logger.debug(f"Expert answer: {ai_msg}")
     response = ToolResponse(
         message=ai_msg,
         assets=[]
     )
     return response.model_dump_json()
 
-def ask_llm(question: str, user_preferences: str) -> str:
-    llm = get_model(settings.DEFAULT_MODEL, temperature=0.5)
+async def ask_llm(question: str, user_preferences: str, config: RunnableConfig) -> str:
+    """
+    Stream the expert model's answer, forwarding every token to the client as it arrives,
+    so the user reads the expert answer while it is generated instead of after it.
+    """
+    llm = get_model(settings.DEFAULT_MODEL, temperature=0.5).with_config(tags=[EXPERT_LLM_TAG])
     messages = [
         SystemMessage(
             content=SYSTEM_PROMPT
@@ -71,5 +69,14 @@ def ask_llm(question: str, user_preferences: str) -> str:
         HumanMessage(content=question + "My preferences are: " + user_preferences),
     ]
 
-    response = llm.invoke(messages)
-    return response.content 
\ No newline at end of file
+    tool_call_id = config.get("metadata", {}).get("tool_call_id")
+    response = None
+    async for chunk in llm.astream(messages, config):
+        response = chunk if response is None else response + chunk
+        if chunk.content:
+            token = {"type": "expert_token", "tool_call_id": tool_call_id, "content": chunk.content}
+            await CustomData(data=token).adispatch(config)
+    if response is None:
+        return ""
+    record_token_usage(settings.DEFAULT_MODEL, response)
+    return response.content
@@ -1,8 +1,12 @@
-from typing import List, Optional
+from typing import Any, List, Optional
 
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.documents import Document
 from langchain_core.messages import ToolCall, HumanMessage
+from langchain_core.messages import ChatMessage as LangchainChatMessage
 from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from langgraph.constants import CONFIG_KEY_STREAM_WRITER
 from langgraph.graph import MessagesState
 from pydantic import BaseModel
 
@@ -14,6 +18,14 @@ class AgentState(MessagesState, total=False):
     """Agent state containing conversation history."""
     tool_calls: list[ToolCall]
     assets: list[dict]
+    # Rolling summary of the turns compaction removed from `messages`.
+    summary: str
+    # User profile loaded once per thread by the retriever, and the user and version (content hash)
+    # it belongs to. `profile_checked_at` is when the vector DB was last consulted for it.
+    profile: str
+    profile_user_id: str
+    profile_version: str
+    profile_checked_at: float
 
 
 class ToolAsset(BaseModel):
@@ -30,6 +42,28 @@ class ToolResponse(BaseModel):
     assets: List[ToolAsset]
 
 
+class CustomData(BaseModel):
+    """Custom data sent to the client while the graph is still running."""
+    data: dict[str, Any]
+
+    def to_langchain(self) -> LangchainChatMessage:
+        return LangchainChatMessage(content=[self.data], role="custom")
+
+    async def adispatch(self, config: Optional[RunnableConfig] = None) -> None:
+        """Emit the data as a custom event, which `stream_message_generator` forwards as a "custom" message."""
+        # Under `astream(stream_mode=[..., "custom"])` the graph provides a stream writer; otherwise the
+        # data goes out as a callback event, which `astream_events` reports.
+        writer = (config or {}).get("configurable", {}).get(CONFIG_KEY_STREAM_WRITER)
+        if writer is not None:
+            writer(self.to_langchain())
+            return
+        await adispatch_custom_event(
+            name="custom_data_dispatch",
+            data=self.to_langchain(),
+            config=merge_configs(config, RunnableConfig(tags=["custom_data_dispatch"])),
+        )
+
+
 def document_to_string(index: int, doc: Document, omit_full_document_description: bool) -> str:
     """
     Format a Document object as a string to be more RAG-friendly
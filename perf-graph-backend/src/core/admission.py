@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from typing import Any, Optional
+
+from cachetools import TTLCache
+
+from core import settings
+from core.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest run in the moving average of run durations used to estimate queue waits.
+_SERVICE_TIME_SMOOTHING = 0.2
+_MAX_TRACKED_USERS = 100_000
+
+
+class AdmissionRejected(Exception):
+    """The request was shed; the client may retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Request rejected by admission control ({reason}).")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token; returns 0 on success, otherwise the seconds until a token is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionTicket:
+    """A granted run slot. `release` is idempotent, so every exit path of a request may call it."""
+
+    def __init__(self, controller: "AdmissionController", model: str):
+        self._controller = controller
+        self.model = model
+        self.started_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._controller._release(self)
+
+
+class _Waiter:
+    def __init__(self, model: str):
+        self.model = model
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class AdmissionController:
+    """
+    Scheduler in front of the agent routes.
+
+    At most `max_concurrency` graph runs execute at once, and at most `model_concurrency[model]` of
+    them on one model. Requests beyond that wait in a FIFO queue of `max_queue` entries; a waiter
+    whose model is at its limit does not hold back waiters for other models. A request is shed
+    (`AdmissionRejected`, answered with 429 + Retry-After) when the queue is full, when its
+    estimated wait already exceeds `max_wait`, or when it has waited `max_wait` seconds.
+
+    Each caller also has a token bucket refilled at `user_rate` runs per second up to `user_burst`,
+    so one heavy caller cannot fill the queue for everyone else. Buckets idle long enough to be full
+    again are forgotten.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        model_concurrency: dict[str, int],
+        max_queue: int,
+        max_wait: float,
+        user_rate: float,
+        user_burst: int,
+    ):
+        self.max_concurrency = max_concurrency
+        self.model_concurrency = model_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.running = 0
+        self.running_by_model: Counter[str] = Counter()
+        self.service_seconds: Optional[float] = None
+        self.admitted = 0
+        self.rejected: Counter[str] = Counter()
+        self._queue: deque[_Waiter] = deque()
+        self._buckets: Optional[TTLCache] = None
+        if user_rate > 0:
+            self._buckets = TTLCache(maxsize=_MAX_TRACKED_USERS, ttl=max(user_burst / user_rate, 1.0))
+
+    def _has_capacity(self, model: str) -> bool:
+        model_limit = self.model_concurrency.get(model)
+        return self.running < self.max_concurrency and (
+            model_limit is None or self.running_by_model[model] < model_limit
+        )
+
+    def _start(self, model: str) -> AdmissionTicket:
+        self.running += 1
+        self.running_by_model[model] += 1
+        self.admitted += 1
+        return AdmissionTicket(self, model)
+
+    def _estimated_wait(self, position: int) -> float:
+        if self.service_seconds is None:
+            return 0.0
+        return position * self.service_seconds / self.max_concurrency
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTIONS.labels(reason).inc()
+        return AdmissionRejected(reason, max(retry_after, 1.0))
+
+    def _take_user_token(self, caller: str):
+        if self._buckets is None:
+            return
+        bucket = self._buckets.get(caller)
+        if bucket is None:
+            bucket = self._buckets[caller] = _TokenBucket(self.user_rate, self.user_burst)
+        else:
+            # Re-insert to restart the idle TTL.
+            self._buckets[caller] = bucket
+        wait = bucket.take()
+        if wait:
+            raise self._reject("user_rate", wait)
+
+    async def acquire(self, model: str, caller: str) -> AdmissionTicket:
+        """Wait for a run slot for `model`; raises `AdmissionRejected` when the request is shed."""
+        self._take_user_token(caller)
+        if not self._queue and self._has_capacity(model):
+            ADMISSION_WAIT_SECONDS.observe(0)
+            return self._start(model)
+
+        position = len(self._queue) + 1
+        if position > self.max_queue:
+            raise self._reject("queue_full", self._estimated_wait(position))
+        estimate = self._estimated_wait(position)
+        if estimate > self.max_wait:
+            raise self._reject("deadline", estimate)
+
+        waiter = _Waiter(model)
+        self._queue.append(waiter)
+        ADMISSION_QUEUE_DEPTH.inc()
+        enqueued_at = time.monotonic()
+        # Waiters ahead may all be blocked on their own model's limit while this model has room.
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._remove(waiter)
+                raise self._reject("timeout", self._estimated_wait(len(self._queue) + 1)) from None
+            # Granted just as the wait ran out: keep the slot.
+        except asyncio.CancelledError:
+            # The client went away while queued; hand back a slot granted in the meantime.
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()
+            else:
+                waiter.future.cancel()
+                self._remove(waiter)
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - enqueued_at)
+        return waiter.future.result()
+
+    def _remove(self, waiter: _Waiter):
+        try:
+            self._queue.remove(waiter)
+            ADMISSION_QUEUE_DEPTH.dec()
+        except ValueError:
+            pass
+
+    def _release(self, ticket: AdmissionTicket):
+        self.running -= 1
+        self.running_by_model[ticket.model] -= 1
+        elapsed = time.monotonic() - ticket.started_at
+        if self.service_seconds is None:
+            self.service_seconds = elapsed
+        else:
+            self.service_seconds += _SERVICE_TIME_SMOOTHING * (elapsed - self.service_seconds)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to waiters in arrival order, skipping those whose model is at its limit."""
+        for waiter in list(self._queue):
+            if self.running >= self.max_concurrency:
+                break
+            if waiter.future.done():
+                self._remove(waiter)
+            elif self._has_capacity(waiter.model):
+                self._remove(waiter)
+                waiter.future.set_result(self._start(waiter.model))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "running_by_model": {model: count for model, count in self.running_by_model.items() if count},
+            "queued": len(self._queue),
+            "max_concurrency": self.max_concurrency,
+            "model_concurrency": self.model_concurrency,
+            "max_queue": self.max_queue,
+            "max_wait": self.max_wait,
+            "avg_run_seconds": self.service_seconds,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "tracked_callers": len(self._buckets) if self._buckets is not None else 0,
+        }
+
+
+def retry_after_header(rejection: AdmissionRejected) -> dict[str, str]:
+    return {"Retry-After": str(math.ceil(rejection.retry_after))}
+
+
+admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """The process-wide admission controller, or None when ADMISSION_CONTROL_ENABLED is off."""
+    global admission_controller
+    if admission_controller is None and settings.ADMISSION_CONTROL_ENABLED:
+        admission_controller = AdmissionController(
+            max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+            model_concurrency=settings.ADMISSION_MODEL_CONCURRENCY,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            max_wait=settings.ADMISSION_MAX_WAIT,
+            user_rate=settings.ADMISSION_USER_RATE,
+            user_burst=settings.ADMISSION_USER_BURST,
+        )
+    return admission_controller
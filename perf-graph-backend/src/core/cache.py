@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_caches: dict[str, Any] = {}
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that reports how many entries were dropped by size (LRU) or TTL eviction."""
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Callable[[int], None]):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_evict(1)
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self._on_evict(len(expired))
+        return expired
+
+
+class ResultCache:
+    """
+    Bounded, per-process TTL/LRU cache with hit/miss/eviction counters.
+
+    `aget_or_load` is single-flight: concurrent callers asking for the same missing key share one
+    loader call instead of each hitting the backend. `None` results are never cached.
+    Every cache registers itself by name so it can be inspected and flushed through the admin API.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._store = self._new_store()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        # Bumped on every invalidation so loads that started before a write never store stale values.
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.loads = 0
+        self.load_seconds_total = 0.0
+        self.load_seconds_max = 0.0
+        register_cache(name, self)
+
+    def _new_store(self) -> _CountingTTLCache:
+        return _CountingTTLCache(maxsize=self.maxsize, ttl=self.ttl, on_evict=self._count_evictions)
+
+    def _count_evictions(self, count: int):
+        self.evictions += count
+
+    def _record_load(self, elapsed: float):
+        self.loads += 1
+        self.load_seconds_total += elapsed
+        self.load_seconds_max = max(self.load_seconds_max, elapsed)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._store.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        if value is None:
+            return
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._store[key] = value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._generation += 1
+            self._store.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def clear(self) -> int:
+        """Drop every entry and return how many were removed."""
+        with self._lock:
+            self._generation += 1
+            flushed = len(self._store)
+            self._store = self._new_store()
+        self._inflight.clear()
+        logger.info(f"Cache '{self.name}' flushed ({flushed} entries).")
+        return flushed
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Read-through lookup for synchronous callers."""
+        generation = self._generation
+        value = self.get(key)
+        if value is None:
+            start = time.perf_counter()
+            value = loader()
+            self._record_load(time.perf_counter() - start)
+            self.set(key, value, generation)
+        return value
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Read-through lookup with single-flight loading for asyncio callers."""
+        with self._lock:
+            value = self._store.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(key, done))
+        else:
+            self.coalesced += 1
+        # Shield the shared load so one cancelled caller does not cancel it for the others.
+        return await asyncio.shield(task)
+
+    def _forget_inflight(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generation
+        start = time.perf_counter()
+        value = await loader()
+        self._record_load(time.perf_counter() - start)
+        self.set(key, value, generation)
+        return value
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "size": len(self._store),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "loads": self.loads,
+            "avg_load_ms": 1000 * self.load_seconds_total / self.loads if self.loads else 0.0,
+            "max_load_ms": 1000 * self.load_seconds_max,
+        }
+
+
+def register_cache(name: str, cache: Any):
+    """Expose a cache through the admin API. It must provide `stats()` and `clear()`."""
+    _caches[name] = cache
+
+
+def get_cache(name: str) -> Optional[ResultCache]:
+    return _caches.get(name)
+
+
+def get_all_caches() -> list[ResultCache]:
+    return list(_caches.values())
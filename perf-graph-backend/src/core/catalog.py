@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from typing import Any, Optional
+
+from core import settings
+from core.metrics import CATALOG_CONSISTENCY_CHECKS, CATALOG_LOOKUPS
+from core.recommendation_client import get_recommendation_client
+from schema.clients import FragranceResponseModel
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_rows(bits: int) -> Iterator[int]:
+    """Row numbers set in `bits`, lowest first."""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def _union(bitsets: Iterable[int]) -> int:
+    result = 0
+    for bits in bitsets:
+        result |= bits
+    return result
+
+
+def _bit_sliced_sum(bitsets: list[int]) -> list[int]:
+    """
+    Per-row count of the bitsets containing each row, as bit slices: bit `row` of slice `k` is bit `k`
+    of that row's count. Adding a bitset is a ripple-carry add over whole integers, so scoring costs
+    O(len(bitsets) * log(len(bitsets))) big-int operations whatever the catalog size.
+    """
+    slices: list[int] = []
+    for carry in bitsets:
+        for k in range(len(slices)):
+            if not carry:
+                break
+            slices[k], carry = slices[k] ^ carry, slices[k] & carry
+        if carry:
+            slices.append(carry)
+    return slices
+
+
+class CatalogIndex:
+    """
+    Immutable inverted index over one catalog snapshot: every note, type, longevity, sillage, brand
+    and name maps to a bitset (a Python int) of the rows carrying it.
+
+    `query` applies perf-agent-backend's filter semantics (all requested types, any requested note,
+    any requested longevity / sillage, case-insensitive brand and name), then ranks the matches by
+    how many of the requested notes they contain, ties keeping catalog order.
+    """
+
+    def __init__(self, fragrances: list[FragranceResponseModel]):
+        self.fragrances = fragrances
+        self.all = (1 << len(fragrances)) - 1
+        self._notes: dict[str, int] = defaultdict(int)
+        self._types: dict[str, int] = defaultdict(int)
+        self._longevity: dict[str, int] = defaultdict(int)
+        self._sillage: dict[str, int] = defaultdict(int)
+        self._brands: dict[str, int] = defaultdict(int)
+        self._names: dict[str, int] = defaultdict(int)
+        for row, fragrance in enumerate(fragrances):
+            bit = 1 << row
+            for note in {*fragrance.top_notes, *fragrance.middle_notes, *fragrance.base_notes}:
+                self._notes[note] |= bit
+            for fragrance_type in fragrance.types:
+                self._types[fragrance_type] |= bit
+            self._longevity[fragrance.longevity] |= bit
+            self._sillage[fragrance.sillage] |= bit
+            self._brands[fragrance.brand.casefold()] |= bit
+            self._names[fragrance.name.casefold()] |= bit
+        for index in (self._notes, self._types, self._longevity, self._sillage, self._brands, self._names):
+            index.default_factory = None
+
+    def __len__(self):
+        return len(self.fragrances)
+
+    def match(
+        self,
+        types: list[str],
+        notes: list[str],
+        hasLongevity: list[str],
+        hasSillage: list[str],
+        brandName: Optional[str] = None,
+        fragranceName: Optional[str] = None,
+    ) -> tuple[int, list[int]]:
+        """Bitset of the matching rows, plus the bitsets of the requested notes for scoring."""
+        mask = self.all
+        if brandName is not None:
+            mask &= self._brands.get(brandName.casefold(), 0)
+        if fragranceName is not None:
+            mask &= self._names.get(fragranceName.casefold(), 0)
+        for fragrance_type in types:
+            mask &= self._types.get(fragrance_type, 0)
+        if hasLongevity:
+            mask &= _union(self._longevity.get(value, 0) for value in hasLongevity)
+        if hasSillage:
+            mask &= _union(self._sillage.get(value, 0) for value in hasSillage)
+        note_bits = [self._notes.get(note, 0) for note in dict.fromkeys(notes)]
+        if note_bits:
+            mask &= _union(note_bits)
+        return mask, note_bits
+
+    def query(self, count: Optional[int] = None, **filters: Any) -> list[FragranceResponseModel]:
+        mask, note_bits = self.match(**filters)
+        if not mask:
+            return []
+        if len(note_bits) < 2:
+            rows = _iter_rows(mask)
+            if count is not None:
+                rows = (row for _, row in zip(range(count), rows))
+            return [self.fragrances[row] for row in rows]
+
+        # Walk score levels from the best down; each level's rows are selected with whole-bitset
+        # operations on the slices, so only the returned rows are ever visited one by one.
+        slices = _bit_sliced_sum(note_bits)
+        limit = len(self.fragrances) if count is None else count
+        result = []
+        for score in range(len(note_bits), 0, -1):
+            level = mask
+            for k, bits in enumerate(slices):
+                level &= bits if score >> k & 1 else ~bits
+            for row in _iter_rows(level):
+                if len(result) == limit:
+                    return result
+                result.append(self.fragrances[row])
+        return result
+
+
+class CatalogReplica:
+    """
+    Local replica of perf-agent-backend's fragrance catalog, answering recommendation lookups in-process.
+
+    The catalog is re-fetched every `refresh_interval` seconds (or on demand through the admin API)
+    and swapped in atomically. Until a first snapshot is loaded `recommend` returns None and callers
+    use the remote backend. A `consistency_sample_rate` share of local answers is re-checked against
+    the backend in the background; a mismatch triggers a refresh.
+    """
+
+    def __init__(self, refresh_interval: float, consistency_sample_rate: float):
+        self.refresh_interval = refresh_interval
+        self.consistency_sample_rate = consistency_sample_rate
+        self.index: Optional[CatalogIndex] = None
+        self.loaded_at: Optional[float] = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.consistency_checks = 0
+        self.mismatches = 0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._background: set[asyncio.Task] = set()
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def refresh(self) -> bool:
+        """Fetch the catalog and swap it in. Concurrent calls share one fetch."""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        if self._refresh_lock.locked():
+            async with self._refresh_lock:
+                return self.ready
+        async with self._refresh_lock:
+            fragrances = await get_recommendation_client().fetch_catalog()
+            if not fragrances:
+                self.refresh_failures += 1
+                logger.warning("Fragrance catalog refresh failed; keeping the previous snapshot.")
+                return False
+            self.index = CatalogIndex(fragrances)
+            self.loaded_at = time.time()
+            self.refreshes += 1
+            logger.info(f"Fragrance catalog replica loaded ({len(fragrances)} fragrances).")
+            return True
+
+    async def _refresh_periodically(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.error(f"Fragrance catalog refresh failed: {e}", exc_info=True)
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._background):
+            task.cancel()
+
+    def recommend(self, count: Optional[int] = None, **filters: Any) -> Optional[list[FragranceResponseModel]]:
+        """Matching fragrances from the replica, or None when no snapshot is loaded yet."""
+        index = self.index
+        if index is None:
+            CATALOG_LOOKUPS.labels("remote").inc()
+            return None
+        CATALOG_LOOKUPS.labels("local").inc()
+        if self.consistency_sample_rate and random.random() < self.consistency_sample_rate:
+            task = asyncio.create_task(self._check_consistency(index, filters))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return index.query(count=count, **filters)
+
+    async def _check_consistency(self, index: CatalogIndex, filters: dict[str, Any]):
+        """Compare the full local match set (ranking aside) with what the backend returns."""
+        remote = await get_recommendation_client().recommend_fragrances(**filters, count=None)
+        if remote is None:
+            # The backend answers "no fragrances" and transport errors alike; only compare real answers.
+            return
+        local_ids = {fragrance.fragrance_id for fragrance in index.query(**filters)}
+        remote_ids = {fragrance.fragrance_id for fragrance in remote}
+        self.consistency_checks += 1
+        if local_ids == remote_ids:
+            CATALOG_CONSISTENCY_CHECKS.labels("match").inc()
+            return
+        self.mismatches += 1
+        CATALOG_CONSISTENCY_CHECKS.labels("mismatch").inc()
+        logger.warning(
+            f"Fragrance catalog replica is out of sync for {filters}: "
+            f"{len(local_ids - remote_ids)} extra, {len(remote_ids - local_ids)} missing. Refreshing."
+        )
+        await self.refresh()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "fragrances": len(self.index) if self.index is not None else 0,
+            "loaded_at": self.loaded_at,
+            "refresh_interval": self.refresh_interval,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "consistency_checks": self.consistency_checks,
+            "mismatches": self.mismatches,
+        }
+
+
+catalog_replica: Optional[CatalogReplica] = None
+
+
+def get_catalog_replica() -> Optional[CatalogReplica]:
+    """The process-wide catalog replica, or None when CATALOG_REPLICA_ENABLED is off."""
+    global catalog_replica
+    if catalog_replica is None and settings.CATALOG_REPLICA_ENABLED:
+        catalog_replica = CatalogReplica(
+            refresh_interval=settings.CATALOG_REFRESH_INTERVAL,
+            consistency_sample_rate=settings.CATALOG_CONSISTENCY_SAMPLE_RATE,
+        )
+    return catalog_replica
@@ -1,11 +1,14 @@
 from functools import cache
-from typing import TypeAlias
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, TypeAlias
 
 from schema.models import (
     AllModelEnum,
     OpenAIModelName,
 )
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 _MODEL_TABLE = {
     OpenAIModelName.GPT_4O_MINI: "gpt-4o-mini",
     OpenAIModelName.GPT_4O: "gpt-4o",
@@ -13,7 +16,7 @@ _MODEL_TABLE = {
 
 
 ModelT: TypeAlias = (
-    ChatOpenAI
+    "ChatOpenAI"
 )
 
 @cache
@@ -22,4 +25,8 @@ def get_model(model_name: AllModelEnum, temperature: float = 0.0) -> ModelT:
     if not api_model_name:
         raise ValueError(f"Unsupported model: {model_name}")
 
-    return ChatOpenAI(model=api_model_name, temperature=temperature, streaming=True)
+    # Imported on first use: langchain_openai and the openai SDK are about half of the app's import time.
+    from langchain_openai import ChatOpenAI
+
+    # stream_usage makes streamed responses carry token counts, which feed the token metrics.
+    return ChatOpenAI(model=api_model_name, temperature=temperature, streaming=True, stream_usage=True)
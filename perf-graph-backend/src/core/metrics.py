@@ -0,0 +1,167 @@
+import functools
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.messages import BaseMessage
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# LLM-bound latencies span milliseconds (cache hits) to tens of seconds (long generations).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+GRAPH_NODE_SECONDS = Histogram(
+    "agent_graph_node_duration_seconds", "Time spent in each agent graph node.",
+    ["node"], buckets=LATENCY_BUCKETS,
+)
+TOOL_SECONDS = Histogram(
+    "agent_tool_duration_seconds", "Time spent executing each agent tool.",
+    ["tool", "status"], buckets=LATENCY_BUCKETS,
+)
+VECTOR_DB_SECONDS = Histogram(
+    "vector_db_operation_duration_seconds", "Latency of vector DB operations.",
+    ["operation", "status"],
+)
+BACKEND_SECONDS = Histogram(
+    "recommendation_backend_request_duration_seconds", "Latency of perf-agent-backend calls.",
+    ["endpoint", "status"],
+)
+AGENT_REQUEST_SECONDS = Histogram(
+    "agent_request_duration_seconds", "End-to-end latency of agent requests.",
+    ["endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+AGENT_REQUESTS_IN_FLIGHT = Gauge(
+    "agent_requests_in_flight", "Agent requests currently being processed.",
+    ["endpoint"], multiprocess_mode="livesum",
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "LLM tokens consumed, by model and token type.",
+    ["model", "type"],
+)
+SSE_TIME_TO_FIRST_TOKEN = Histogram(
+    "sse_time_to_first_token_seconds", "Time from request start to the first streamed LLM token.",
+    buckets=LATENCY_BUCKETS,
+)
+SSE_EVENTS = Counter(
+    "sse_events_total", "Server-sent events emitted, by event type.",
+    ["type"],
+)
+FAST_PATH_DECISIONS = Counter(
+    "agent_fast_path_total", "Fast-path router decisions: hit, low_confidence or no_match.",
+    ["result"],
+)
+CATALOG_LOOKUPS = Counter(
+    "fragrance_catalog_lookups_total", "Recommendation lookups, by whether the local catalog replica or the backend answered.",
+    ["source"],
+)
+CATALOG_CONSISTENCY_CHECKS = Counter(
+    "fragrance_catalog_consistency_checks_total", "Sampled comparisons of local catalog answers with the backend.",
+    ["result"],
+)
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    "semantic_cache_lookups_total", "Semantic response cache lookups, by cache and result.",
+    ["cache", "result"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "agent_admission_queue_depth", "Agent requests waiting for a run slot.",
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "agent_admission_wait_seconds", "Time agent requests waited for a run slot.",
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_REJECTIONS = Counter(
+    "agent_admission_rejections_total", "Agent requests shed with 429: user_rate, queue_full, deadline or timeout.",
+    ["reason"],
+)
+STREAM_ENGINE_EVENTS = Counter(
+    "agent_stream_engine_events_total", "Graph stream events consumed by /stream, by streaming engine.",
+    ["engine"],
+)
+SIMILAR_USERS_SECONDS = Histogram(
+    "similar_users_update_duration_seconds", "Time to rebuild the similar-users graph or update changed profiles.",
+    ["operation"], buckets=LATENCY_BUCKETS,
+)
+
+# Label children resolved once, so the per-token streaming path is a single lock-protected add.
+SSE_TOKEN_EVENTS = SSE_EVENTS.labels("token")
+SSE_MESSAGE_EVENTS = SSE_EVENTS.labels("message")
+SSE_ERROR_EVENTS = SSE_EVENTS.labels("error")
+
+
+def _cached_prompt_tokens(message: BaseMessage, usage: dict) -> int:
+    """Prompt tokens served from the provider's prefix cache, if the response reports them."""
+    cached = (usage.get("input_token_details") or {}).get("cache_read")
+    if cached is None:
+        token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+        cached = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    return cached or 0
+
+
+def record_token_usage(model: str, message: BaseMessage):
+    """
+    Count prompt/completion tokens reported in an LLM response's `usage_metadata`. Prompt tokens read
+    from the provider's prefix cache are also counted as "cached_prompt", so
+    `cached_prompt / prompt` is the prefix-cache hit rate.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    LLM_TOKENS.labels(model, "prompt").inc(usage.get("input_tokens", 0))
+    LLM_TOKENS.labels(model, "cached_prompt").inc(_cached_prompt_tokens(message, usage))
+    LLM_TOKENS.labels(model, "completion").inc(usage.get("output_tokens", 0))
+
+
+def timed_node(name: str, node: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Wrap an async graph node so its duration is recorded under `name`."""
+    histogram = GRAPH_NODE_SECONDS.labels(name)
+
+    @functools.wraps(node)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await node(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def timed_operation(histogram: Histogram, operation: str):
+    """Decorator recording a synchronous call's duration and outcome under `operation`."""
+    def decorator(func):
+        ok, error = histogram.labels(operation, "ok"), histogram.labels(operation, "error")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            child = error
+            try:
+                result = func(*args, **kwargs)
+                child = ok
+                return result
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return wrapper
+    return decorator
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Exposition payload and content type. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR so every
+    worker's samples are aggregated into one scrape.
+    """
+    registry: Optional[CollectorRegistry] = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import Any, Optional
+
+from langchain_core.documents import Document
+
+from core.persistence.vector_db import BaseVectorDBClient
+
+logger = logging.getLogger(__name__)
+
+# OpenAI embeddings accept at most this many inputs per request.
+EMBEDDING_MAX_INPUTS = 2048
+
+_DONE = object()
+
+
+class _Row:
+    __slots__ = ("line", "user_id", "description", "error")
+
+    def __init__(self, line: int, user_id: Optional[str] = None, description: Optional[str] = None,
+                 error: Optional[str] = None):
+        self.line = line
+        self.user_id = user_id
+        self.description = description
+        self.error = error
+
+    def status(self, status: str, detail: Optional[str] = None) -> dict[str, Any]:
+        result = {"line": self.line, "user_id": self.user_id, "status": status}
+        if detail:
+            result["detail"] = detail
+        return result
+
+
+def _parse_row(line_no: int, line: bytes) -> _Row:
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return _Row(line_no, error=f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        return _Row(line_no, error="Each line must be a JSON object.")
+
+    user_id, description = record.get("user_id"), record.get("description")
+    if not isinstance(user_id, str) or not user_id:
+        return _Row(line_no, error="user_id is required.")
+    if not isinstance(description, str) or not description:
+        return _Row(line_no, user_id=user_id, error="description is required.")
+    return _Row(line_no, user_id=user_id, description=description)
+
+
+async def _read_batches(chunks: AsyncIterator[bytes], batch_size: int) -> AsyncGenerator[list[_Row], None]:
+    """Split a streamed NDJSON body into row batches without buffering more than one batch."""
+    buffer = b""
+    line_no = 0
+    batch: list[_Row] = []
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                batch.append(_parse_row(line_no, line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if buffer.strip():
+        batch.append(_parse_row(line_no + 1, buffer))
+    if batch:
+        yield batch
+
+
+async def _insert_batch(client: BaseVectorDBClient, batch: list[_Row]) -> list[dict[str, Any]]:
+    statuses = [row.status("error", row.error) for row in batch if row.error]
+
+    # The same user may appear twice in one batch; the last occurrence wins.
+    latest: dict[str, _Row] = {}
+    for row in batch:
+        if not row.error:
+            if row.user_id in latest:
+                statuses.append(latest[row.user_id].status("skipped", "Superseded by a later row."))
+            latest[row.user_id] = row
+
+    rows = list(latest.values())
+    if rows:
+        try:
+            await client.aadd_documents(
+                [row.user_id for row in rows],
+                [Document(page_content=row.description) for row in rows],
+            )
+            statuses.extend(row.status("ok") for row in rows)
+        except Exception as e:
+            logger.error(f"Bulk insert of {len(rows)} rows failed: {e}", exc_info=True)
+            statuses.extend(row.status("error", str(e)) for row in rows)
+    return statuses
+
+
+async def ingest_ndjson(
+    chunks: AsyncIterator[bytes],
+    client: BaseVectorDBClient,
+    batch_size: int,
+    concurrency: int,
+) -> AsyncGenerator[dict[str, Any], None]:
+    """
+    Ingest a streamed NDJSON body of `{"user_id": ..., "description": ...}` rows.
+
+    Rows are grouped into batches (one embedding request and one vector DB insert each) and up to
+    `concurrency` batches are in flight at once. Both queues are bounded, so the request body is only
+    read as fast as batches are written, and memory stays flat regardless of upload size.
+    Yields one status per input row (in completion order), followed by a summary.
+    """
+    batch_size = max(1, min(batch_size, EMBEDDING_MAX_INPUTS))
+    batches: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce():
+        async for batch in _read_batches(chunks, batch_size):
+            await batches.put(batch)
+        # Only after a complete read: on a failure or cancellation the task group cancels the
+        # consumers, and waiting for room in their queue would never return.
+        for _ in range(concurrency):
+            await batches.put(None)
+
+    async def consume():
+        while (batch := await batches.get()) is not None:
+            await results.put(await _insert_batch(client, batch))
+
+    async def run():
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(produce())
+                for _ in range(concurrency):
+                    group.create_task(consume())
+        except* Exception as e:
+            # e.g. the client disconnecting mid-upload; rows already written keep their status.
+            failure.append(e.exceptions[0])
+        await results.put(_DONE)
+
+    failure: list[BaseException] = []
+    runner = asyncio.create_task(run())
+    counts = {"ok": 0, "skipped": 0, "error": 0}
+    try:
+        while (statuses := await results.get()) is not _DONE:
+            for status in statuses:
+                counts[status["status"]] += 1
+                yield status
+        if failure:
+            logger.error(f"Bulk ingestion aborted: {failure[0]!r}")
+            yield {"status": "aborted", "detail": str(failure[0]), **counts}
+        else:
+            yield {"status": "done", **counts}
+    finally:
+        runner.cancel()
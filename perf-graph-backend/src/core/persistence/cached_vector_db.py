@@ -0,0 +1,93 @@
+import logging
+from typing import Iterator, Optional
+
+from langchain_core.documents import Document
+
+from core.cache import ResultCache
+from core.persistence.vector_db import BaseVectorDBClient, GenericMetadataFilter
+
+logger = logging.getLogger(__name__)
+
+
+class CachedVectorDBClient(BaseVectorDBClient):
+    """
+    Read-through user-profile cache in front of a vector DB client.
+
+    `get_document` is served from a bounded TTL cache, so the profile read by the retriever and
+    again by the tools within one agent turn costs a single vector DB round trip.
+    Writes made through this client invalidate the cached profile; writes made by other processes
+    become visible once the TTL expires.
+    The cache's `loads` / `avg_load_ms` statistics are the vector DB lookup latency,
+    and `hits` is the number of round trips saved.
+    """
+
+    def __init__(self, client: BaseVectorDBClient, maxsize: int, ttl: float):
+        self.client = client
+        self.profiles = ResultCache(name="profiles", maxsize=maxsize, ttl=ttl)
+
+    @property
+    def primary_field(self) -> str:
+        return self.client.primary_field
+
+    @property
+    def vector_field(self) -> str:
+        return self.client.vector_field
+
+    def add_document(self, doc_id: str, document: Document):
+        try:
+            return self.client.add_document(doc_id, document)
+        finally:
+            self.profiles.invalidate(doc_id)
+
+    def add_documents(self, doc_ids: list[str], documents: list[Document]):
+        try:
+            return self.client.add_documents(doc_ids, documents)
+        finally:
+            for doc_id in doc_ids:
+                self.profiles.invalidate(doc_id)
+
+    def delete_document(self, doc_id: str):
+        try:
+            return self.client.delete_document(doc_id)
+        finally:
+            self.profiles.invalidate(doc_id)
+
+    def update_document(self, doc_id: str, document: Document):
+        try:
+            return self.client.update_document(doc_id, document)
+        finally:
+            self.profiles.invalidate(doc_id)
+
+    def get_document(self, doc_id: str) -> Optional[Document]:
+        return self.profiles.get_or_load(doc_id, lambda: self.client.get_document(doc_id))
+
+    async def aget_document(self, doc_id: str) -> Optional[Document]:
+        # Single-flight: concurrent turns for the same user share one vector DB lookup.
+        return await self.profiles.aget_or_load(doc_id, lambda: self.client.aget_document(doc_id))
+
+    def search_documents(self, query: str, k: int = 3, filters: GenericMetadataFilter = None):
+        return self.client.search_documents(query, k=k, filters=filters)
+
+    def search_documents_batch(self, queries: list[str], k: int = 3, filters: GenericMetadataFilter = None):
+        return self.client.search_documents_batch(queries, k=k, filters=filters)
+
+    def search_vectors_batch(self, vectors: list[list[float]], k: int = 3, filters: GenericMetadataFilter = None):
+        return self.client.search_vectors_batch(vectors, k=k, filters=filters)
+
+    async def asearch_documents_batch(self, queries: list[str], k: int = 3, filters: GenericMetadataFilter = None):
+        return await self.client.asearch_documents_batch(queries, k=k, filters=filters)
+
+    def get_database(self):
+        return self.client.get_database()
+
+    def get_all_documents(self):
+        return self.client.get_all_documents()
+
+    def iter_documents(
+        self,
+        batch_size: int = 1000,
+        include_vectors: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[dict]:
+        return self.client.iter_documents(batch_size, include_vectors=include_vectors, after=after, limit=limit)
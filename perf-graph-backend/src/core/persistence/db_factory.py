@@ -1,39 +1,69 @@
+import threading
+
 from core import settings
 from core.persistence.schema_db import BaseDBClient
 from core.persistence.schema_db import MongoDBClient
 from core.persistence.vector_db import MilvusClientWrapper
 from core.persistence.vector_db import BaseVectorDBClient
+from core.persistence.local_vector_db import LocalVectorDBClient
+from core.persistence.cached_vector_db import CachedVectorDBClient
 
 _schema_db_client: BaseDBClient | None = None
 _vector_db_client: BaseVectorDBClient | None = None
+_init_lock = threading.Lock()
 
 def init_db_clients():
     """
     Initialize and cache database clients to be used as singletons.
-    Call this once during FastAPI app startup.
+    The startup warm-up calls this off the event loop (connecting to Milvus blocks); otherwise the
+    first get_*_db_client call does.
     """
     global _schema_db_client, _vector_db_client
 
-    if _schema_db_client is None:
-        schema_db_type = settings.SCHEMA_DB_TYPE
-        if schema_db_type == "mongo":
-            _schema_db_client = MongoDBClient()
-        else:
-            raise ValueError(f"Invalid SCHEMA_DB_TYPE: {schema_db_type}. Supported: 'mongo'.")
+    with _init_lock:
+        if _schema_db_client is None:
+            schema_db_type = settings.SCHEMA_DB_TYPE
+            if schema_db_type == "mongo":
+                _schema_db_client = MongoDBClient()
+            else:
+                raise ValueError(f"Invalid SCHEMA_DB_TYPE: {schema_db_type}. Supported: 'mongo'.")
 
-    if _vector_db_client is None:
-        vector_db_type = settings.VECTOR_DB_TYPE
-        if vector_db_type == "milvus":
-            _vector_db_client = MilvusClientWrapper()
-        else:
-            raise ValueError(f"Invalid VECTOR_DB_TYPE: {vector_db_type}. Supported: 'milvus'.")
+        if _vector_db_client is None:
+            vector_db_type = settings.VECTOR_DB_TYPE
+            if vector_db_type == "milvus":
+                vector_db_client = MilvusClientWrapper()
+            elif vector_db_type == "local":
+                vector_db_client = LocalVectorDBClient(
+                    settings.LOCAL_VECTOR_DB_PATH,
+                    compaction_threshold=settings.LOCAL_VECTOR_DB_COMPACTION_THRESHOLD,
+                )
+            else:
+                raise ValueError(f"Invalid VECTOR_DB_TYPE: {vector_db_type}. Supported: 'milvus', 'local'.")
+
+            if settings.PROFILE_CACHE_ENABLED:
+                vector_db_client = CachedVectorDBClient(
+                    vector_db_client,
+                    maxsize=settings.PROFILE_CACHE_MAXSIZE,
+                    ttl=settings.PROFILE_CACHE_TTL,
+                )
+            _vector_db_client = vector_db_client
+
+def reset_db_clients():
+    """
+    Forget the clients (and the MongoDB connection) inherited from a parent process, so a forked
+    worker's init_db_clients opens its own.
+    """
+    global _schema_db_client, _vector_db_client
+    _schema_db_client = None
+    _vector_db_client = None
+    MongoDBClient.reset()
 
 def get_schema_db_client() -> BaseDBClient:
     if _schema_db_client is None:
-        raise RuntimeError("Schema DB client not initialized. Call init_db_clients() first.")
+        init_db_clients()
     return _schema_db_client
 
 def get_vector_db_client() -> BaseVectorDBClient:
     if _vector_db_client is None:
-        raise RuntimeError("Vector DB client not initialized. Call init_db_clients() first.")
+        init_db_clients()
     return _vector_db_client
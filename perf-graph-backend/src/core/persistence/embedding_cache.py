@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Iterable
+
+from langchain_core.embeddings import Embeddings
+
+from core.cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement.
+_SQLITE_CHUNK = 500
+# Hits whose `last_access` bump waits for the next write; further hits until then are not recorded.
+_MAX_PENDING_TOUCHES = 10_000
+
+
+class SQLiteEmbeddingStore:
+    """
+    On-disk embedding store with LRU eviction.
+    Vectors are stored as float32 blobs (the precision Milvus keeps anyway); `last_access` drives eviction.
+    WAL mode lets several worker processes share one file. Reads never write: hits are remembered in
+    memory and their `last_access` is bumped by the next `mset`, just before it evicts.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._touched: dict[str, float] = {}
+        self.reconnect()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings(last_access)")
+
+    def reconnect(self):
+        """Open a fresh connection. A forked worker calls this: SQLite connections must not cross fork()."""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    @staticmethod
+    def _chunks(keys: list[str]) -> Iterable[list[str]]:
+        for i in range(0, len(keys), _SQLITE_CHUNK):
+            yield keys[i:i + _SQLITE_CHUNK]
+
+    def mget(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for chunk in self._chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            now = time.time()
+            for key in found:
+                if key in self._touched or len(self._touched) < _MAX_PENDING_TOUCHES:
+                    self._touched[key] = now
+        return found
+
+    def mset(self, items: dict[str, list[float]]):
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = MAX(last_access, ?) WHERE key = ?",
+                    [(accessed, key) for key, accessed in touched.items()],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evict()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count <= self.max_entries:
+            return
+        # Evict down to 90% of the limit so eviction is not triggered again by the next insert.
+        excess = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        logger.info(f"Evicted {excess} least recently used embeddings from {self.path}.")
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed embedding cache keyed by (model, sha256(text)).
+
+    Lookups go through an in-memory hot tier, then the on-disk store; only the remaining misses
+    (de-duplicated) are sent upstream in one batched call.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, store: SQLiteEmbeddingStore, hot_size: int, hot_ttl: float):
+        self.underlying = underlying
+        self.model = model
+        self.store = store
+        self.hot = ResultCache(name="embeddings", maxsize=hot_size, ttl=hot_ttl)
+        self.disk_hits = 0
+        self.upstream_texts = 0
+
+    def _key(self, text: str) -> str:
+        return f"{self.model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _lookup_hot(self, keys: list[str]) -> tuple[dict[str, list[float]], list[str]]:
+        found, cold = {}, []
+        for key in dict.fromkeys(keys):
+            vector = self.hot.get(key)
+            if vector is None:
+                cold.append(key)
+            else:
+                found[key] = vector
+        return found, cold
+
+    def _lookup_disk(self, keys: list[str]) -> dict[str, list[float]]:
+        try:
+            found = self.store.mget(keys)
+        except sqlite3.Error as e:
+            # A locked or damaged cache only costs the upstream call it would have saved.
+            logger.warning(f"Failed to read cached embeddings: {e}")
+            return {}
+        for key, vector in found.items():
+            self.hot.set(key, vector)
+        self.disk_hits += len(found)
+        return found
+
+    def _remember(self, vectors: dict[str, list[float]]):
+        for key, vector in vectors.items():
+            self.hot.set(key, vector)
+        try:
+            self.store.mset(vectors)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist embeddings: {e}")
+
+    @staticmethod
+    def _as_float32(keys: Iterable[str], vectors: list[list[float]]) -> dict[str, list[float]]:
+        # Round fresh vectors the same way stored ones are, so hits and misses return identical values.
+        return {key: array("f", vector).tolist() for key, vector in zip(keys, vectors)}
+
+    def _missing(self, keys: list[str], texts: list[str], found: dict) -> dict[str, str]:
+        return {key: text for key, text in zip(keys, texts) if key not in found}
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(t) for t in texts]
+        found, cold = self._lookup_hot(keys)
+        if cold:
+            found.update(self._lookup_disk(cold))
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            self.upstream_texts += len(missing)
+            vectors = self._as_float32(missing.keys(), self.underlying.embed_documents(list(missing.values())))
+            self._remember(vectors)
+            found.update(vectors)
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(t) for t in texts]
+        found, cold = self._lookup_hot(keys)
+        if cold:
+            found.update(await asyncio.to_thread(self._lookup_disk, cold))
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            self.upstream_texts += len(missing)
+            vectors = self._as_float32(missing.keys(), await self.underlying.aembed_documents(list(missing.values())))
+            await asyncio.to_thread(self._remember, vectors)
+            found.update(vectors)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
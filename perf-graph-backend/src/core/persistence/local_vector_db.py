@@ -0,0 +1,376 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Hashable, Iterator, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.persistence.vector_db import BaseVectorDBClient, GenericMetadataFilter, get_embeddings
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST = "manifest.json"
+_MIN_CAPACITY = 1024
+
+
+class LocalVectorDBClient(BaseVectorDBClient):
+    """
+    In-process vector store for single-node deployments, CI and benchmarks.
+
+    Vectors are L2-normalized and kept in a memory-mapped float32 matrix, so cosine similarity is a
+    single matrix-vector product. Texts and metadata live in memory, keyed by id, and are persisted to
+    an append-only JSONL log (`add` / `delete` records) that is replayed on startup. Replaced and
+    deleted rows are left in place until the dead fraction exceeds `compaction_threshold`; compaction
+    then writes a new generation of both files and switches to it atomically via the manifest.
+
+    The store is owned by one process: run a single worker (or Milvus) when several processes must
+    see each other's writes.
+    """
+
+    # Field names of the records and search results, the same as langchain_milvus' defaults.
+    primary_field = "pk"
+    vector_field = "vector"
+
+    def __init__(
+        self,
+        path: str,
+        embedding: Optional[Embeddings] = None,
+        compaction_threshold: float = 0.3,
+    ):
+        self.path = path
+        self.embedding = embedding or get_embeddings()
+        self.compaction_threshold = compaction_threshold
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._log = None
+        self._load()
+
+    # --- persistence ---
+
+    def _file(self, kind: str, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        suffix = "f32" if kind == "vectors" else "jsonl"
+        return os.path.join(self.path, f"{kind}-{generation}.{suffix}")
+
+    def _write_manifest(self):
+        manifest = os.path.join(self.path, _MANIFEST)
+        with open(manifest + ".tmp", "w") as f:
+            json.dump({"generation": self._generation, "dimension": self._dimension}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(manifest + ".tmp", manifest)
+
+    def _load(self):
+        manifest = os.path.join(self.path, _MANIFEST)
+        state = {"generation": 0, "dimension": None}
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                state = json.load(f)
+        self._generation = state["generation"]
+        self._dimension = state["dimension"]
+
+        self._ids: dict[str, int] = {}
+        self._records: dict[str, tuple[str, dict]] = {}
+        self._row_ids: list[Optional[str]] = []
+        self._postings: dict[str, dict[Hashable, set[int]]] = {}
+        self._dead = 0
+        self._matrix: Optional[np.memmap] = None
+        self._alive = np.zeros(0, dtype=bool)
+
+        log_path = self._file("log")
+        if os.path.exists(log_path):
+            with open(log_path, "rb") as f:
+                for line_no, line in enumerate(f, start=1):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn trailing line from a crash mid-append; everything before it is intact.
+                        logger.warning(f"Ignoring unreadable line {line_no} in {log_path}.")
+                        continue
+                    if entry["op"] == "add":
+                        self._apply_add(entry["id"], entry["row"], entry["text"], entry["metadata"])
+                    elif entry["op"] == "delete":
+                        self._apply_delete(entry["id"])
+
+        self._count = len(self._row_ids)
+        if self._dimension is not None:
+            self._open_matrix(max(self._count, _MIN_CAPACITY))
+            self._alive[:self._count] = [row_id is not None for row_id in self._row_ids]
+
+        if self._log is not None:
+            self._log.close()
+        self._log = open(log_path, "a", encoding="utf-8")
+        logger.info(f"Loaded {len(self._ids)} vectors ({self._dead} dead rows) from {self.path}.")
+
+    def _open_matrix(self, capacity: int):
+        path = self._file("vectors")
+        size = capacity * self._dimension * 4
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self._dimension))
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+
+    def _ensure_capacity(self, rows: int):
+        capacity = len(self._matrix)
+        if rows > capacity:
+            while capacity < rows:
+                capacity *= 2
+            self._open_matrix(capacity)
+
+    def compact(self):
+        """Rewrite the matrix and log without dead rows, then switch to the new generation."""
+        with self._lock:
+            if self._matrix is None:
+                return
+            live_rows = np.flatnonzero(self._alive[:self._count])
+            generation = self._generation + 1
+            capacity = max(len(live_rows), _MIN_CAPACITY)
+
+            vectors_path = self._file("vectors", generation)
+            with open(vectors_path, "wb") as f:
+                f.truncate(capacity * self._dimension * 4)
+            matrix = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dimension))
+            matrix[:len(live_rows)] = self._matrix[live_rows]
+            matrix.flush()
+            del matrix
+
+            with open(self._file("log", generation), "w", encoding="utf-8") as f:
+                for new_row, old_row in enumerate(live_rows):
+                    doc_id = self._row_ids[old_row]
+                    text, metadata = self._records[doc_id]
+                    f.write(self._add_entry(doc_id, new_row, text, metadata))
+                f.flush()
+                os.fsync(f.fileno())
+
+            previous = self._generation
+            self._generation = generation
+            self._write_manifest()
+            self._log.close()
+            self._log = None
+            self._matrix = None
+            for kind in ("vectors", "log"):
+                os.remove(self._file(kind, previous))
+            self._load()
+
+    # --- in-memory index ---
+
+    @staticmethod
+    def _add_entry(doc_id: str, row: int, text: str, metadata: dict) -> str:
+        return json.dumps({"op": "add", "id": doc_id, "row": row, "text": text, "metadata": metadata}) + "\n"
+
+    def _apply_add(self, doc_id: str, row: int, text: str, metadata: dict):
+        self._apply_delete(doc_id)
+        while len(self._row_ids) <= row:
+            self._row_ids.append(None)
+        self._row_ids[row] = doc_id
+        self._ids[doc_id] = row
+        self._records[doc_id] = (text, metadata)
+        for key, value in metadata.items():
+            if isinstance(value, Hashable):
+                self._postings.setdefault(key, {}).setdefault(value, set()).add(row)
+
+    def _apply_delete(self, doc_id: str) -> bool:
+        row = self._ids.pop(doc_id, None)
+        if row is None:
+            return False
+        _, metadata = self._records.pop(doc_id)
+        for key, value in metadata.items():
+            if isinstance(value, Hashable):
+                self._postings.get(key, {}).get(value, set()).discard(row)
+        self._row_ids[row] = None
+        if row < len(self._alive):
+            self._alive[row] = False
+        self._dead += 1
+        return True
+
+    def _maybe_compact(self):
+        if self._count >= _MIN_CAPACITY and self._dead > self.compaction_threshold * self._count:
+            logger.info(f"Compacting {self.path}: {self._dead} of {self._count} rows are dead.")
+            self.compact()
+
+    @staticmethod
+    def _normalize(vectors: list[list[float]]) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def _insert(self, doc_ids: list[str], documents: list[Document], vectors: list[list[float]]):
+        if not doc_ids:
+            return
+        matrix = self._normalize(vectors)
+        with self._lock:
+            if self._dimension is None:
+                self._dimension = matrix.shape[1]
+                self._write_manifest()
+                self._open_matrix(_MIN_CAPACITY)
+            elif matrix.shape[1] != self._dimension:
+                raise ValueError(f"Expected vectors of dimension {self._dimension}, got {matrix.shape[1]}.")
+
+            start = self._count
+            self._ensure_capacity(start + len(doc_ids))
+            # Vectors are on disk before the log references them, so a replayed log never points at garbage.
+            self._matrix[start:start + len(doc_ids)] = matrix
+            self._matrix.flush()
+
+            entries = []
+            for row, (doc_id, document) in enumerate(zip(doc_ids, documents), start=start):
+                metadata = dict(document.metadata)
+                self._apply_add(doc_id, row, document.page_content, metadata)
+                entries.append(self._add_entry(doc_id, row, document.page_content, metadata))
+            self._count = start + len(doc_ids)
+            self._alive[start:self._count] = [self._row_ids[row] is not None for row in range(start, self._count)]
+            self._log.write("".join(entries))
+            self._log.flush()
+            self._maybe_compact()
+
+    def _filter_mask(self, filters: Optional[GenericMetadataFilter]) -> np.ndarray:
+        mask = self._alive[:self._count].copy()
+        if not filters or filters.is_empty():
+            return mask
+        for key, value in filters.items():
+            if value is None or value == "" or (isinstance(value, list) and len(value) == 0):
+                continue  # skip empty values, as the Milvus client does
+            values = value if isinstance(value, list) else [value]
+            if key == self.primary_field:
+                rows = [self._ids[v] for v in values if v in self._ids]
+            else:
+                postings = self._postings.get(key, {})
+                rows = [row for v in values if isinstance(v, Hashable) for row in postings.get(v, ())]
+            matched = np.zeros(self._count, dtype=bool)
+            matched[rows] = True
+            mask &= matched
+        return mask
+
+    def _search_vector(self, vector: list[float], k: int, filters: Optional[GenericMetadataFilter]) -> list[Document]:
+        query = self._normalize([vector])[0]
+        with self._lock:
+            if self._matrix is None or k <= 0:
+                return []
+            mask = self._filter_mask(filters)
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                return []
+            if len(rows) < self._count // 2:
+                # Selective filter: only score the candidate rows.
+                scores = self._matrix[rows] @ query
+            else:
+                scores = self._matrix[:self._count] @ query
+                scores = scores[rows]
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results = []
+            for i in top:
+                doc_id = self._row_ids[rows[i]]
+                text, metadata = self._records[doc_id]
+                results.append(Document(page_content=text, metadata={**metadata, self.primary_field: doc_id}))
+            return results
+
+    # --- BaseVectorDBClient ---
+
+    def add_document(self, doc_id: str, document: Document):
+        self.add_documents([doc_id], [document])
+
+    def add_documents(self, doc_ids: list[str], documents: list[Document]):
+        vectors = self.embedding.embed_documents([document.page_content for document in documents])
+        self._insert(doc_ids, documents, vectors)
+
+    async def aadd_documents(self, doc_ids: list[str], documents: list[Document]):
+        vectors = await self.embedding.aembed_documents([document.page_content for document in documents])
+        await self._run_blocking(self._insert, doc_ids, documents, vectors)
+
+    async def aadd_document(self, doc_id: str, document: Document):
+        await self.aadd_documents([doc_id], [document])
+
+    def delete_document(self, doc_id: str):
+        with self._lock:
+            if self._apply_delete(doc_id):
+                self._log.write(json.dumps({"op": "delete", "id": doc_id}) + "\n")
+                self._log.flush()
+                self._maybe_compact()
+
+    async def adelete_document(self, doc_id: str):
+        # A delete can trigger compaction, which rewrites the whole store.
+        await self._run_blocking(self.delete_document, doc_id)
+
+    def update_document(self, doc_id: str, document: Document):
+        # Adding an existing id replaces it.
+        self.add_document(doc_id, document)
+
+    async def aupdate_document(self, doc_id: str, document: Document):
+        await self.aadd_document(doc_id, document)
+
+    def get_document(self, doc_id: str) -> Optional[Document]:
+        record = self._records.get(doc_id)
+        if record is None:
+            return None
+        text, metadata = record
+        return Document(page_content=text, metadata=dict(metadata))
+
+    async def aget_document(self, doc_id: str) -> Optional[Document]:
+        # A dict lookup: not worth a thread hop.
+        return self.get_document(doc_id)
+
+    def search_documents(self, query: str, k: int = 3, filters: GenericMetadataFilter = None):
+        return self._search_vector(self.embedding.embed_query(query), k, filters)
+
+    async def asearch_documents(self, query: str, k: int = 3, filters: GenericMetadataFilter = None):
+        vector = await self.embedding.aembed_query(query)
+        return await self._run_blocking(self._search_vector, vector, k, filters)
+
+    def search_vectors_batch(
+        self, vectors: list[list[float]], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        return [self._search_vector(vector, k, filters) for vector in vectors]
+
+    def search_documents_batch(
+        self, queries: list[str], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        if not queries:
+            return []
+        return self.search_vectors_batch(self.embedding.embed_documents(queries), k, filters)
+
+    async def asearch_documents_batch(
+        self, queries: list[str], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        if not queries:
+            return []
+        vectors = await self.embedding.aembed_documents(queries)
+        return await self._run_blocking(self.search_vectors_batch, vectors, k, filters)
+
+    def get_database(self) -> "LocalVectorDBClient":
+        return self
+
+    def get_all_documents(self):
+        return list(self.iter_documents(limit=1000))
+
+    def iter_documents(
+        self,
+        batch_size: int = 1000,
+        include_vectors: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            doc_ids = sorted(doc_id for doc_id in self._ids if after is None or doc_id > after)
+        if limit is not None:
+            doc_ids = doc_ids[:limit]
+        for doc_id in doc_ids:
+            with self._lock:
+                row = self._ids.get(doc_id)
+                if row is None:
+                    continue
+                text, metadata = self._records[doc_id]
+                record = {self.primary_field: doc_id, "text": text, **metadata}
+                if include_vectors:
+                    # Stored vectors are L2-normalized (a no-op for OpenAI embeddings, which already are).
+                    record[self.vector_field] = self._matrix[row].tolist()
+            yield record
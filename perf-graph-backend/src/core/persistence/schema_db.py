@@ -43,6 +43,11 @@ class MongoDBClient(BaseDBClient):
             cls._instance._db = cls._instance._client["Agent"]
         return cls._instance
 
+    @classmethod
+    def reset(cls):
+        """Drop the shared instance; the next one opens a new MongoClient (which is not fork-safe)."""
+        cls._instance = None
+
     def get_collection(self, name: str):
         """Get a specific MongoDB collection by name."""
         return self._db[name]
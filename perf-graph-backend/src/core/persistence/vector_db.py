@@ -1,23 +1,54 @@
+import asyncio
 import json
 import os
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Union, Dict, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Union, Dict, Any, Callable, Iterator, Optional
 
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
-from langchain_milvus import Milvus
-from pymilvus import Collection, FieldSchema, CollectionSchema, DataType, utility, connections, db, MilvusException
+from langchain_core.embeddings import Embeddings
 
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-ada-002",
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-)
+from core import settings
+from core.metrics import VECTOR_DB_SECONDS, timed_operation
+from core.persistence.embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore
+
+if TYPE_CHECKING:
+    from langchain_milvus import Milvus
+
+embeddings_model = "text-embedding-ada-002"
 embeddings_dimension = 1536
+# Built by get_embeddings on first use; benchmarks may assign a replacement before that.
+embeddings: Optional[Embeddings] = None
+_embeddings_lock = threading.Lock()
 
 logger = logging.getLogger(__name__)
 
 
+def get_embeddings() -> Embeddings:
+    """The process-wide embedding model, behind the embedding cache when EMBEDDING_CACHE_ENABLED is on."""
+    global embeddings
+    with _embeddings_lock:
+        if embeddings is None:
+            # Imported here: the openai SDK is one of the app's largest imports.
+            from langchain_openai import OpenAIEmbeddings
+
+            model = OpenAIEmbeddings(model=embeddings_model, openai_api_key=os.getenv("OPENAI_API_KEY"))
+            if settings.EMBEDDING_CACHE_ENABLED:
+                model = CachedEmbeddings(
+                    model,
+                    model=embeddings_model,
+                    store=SQLiteEmbeddingStore(settings.EMBEDDING_CACHE_PATH,
+                                               max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES),
+                    hot_size=settings.EMBEDDING_CACHE_HOT_SIZE,
+                    hot_ttl=settings.EMBEDDING_CACHE_HOT_TTL,
+                )
+            embeddings = model
+        return embeddings
+
+
 class GenericMetadataFilter:
     """
     Abstract filter structure for vector DBs, supporting dynamic fields and values.
@@ -40,13 +71,129 @@ class GenericMetadataFilter:
         return f"GenericMetadataFilter({self.filters})"
 
 
+@lru_cache(maxsize=256)
+def _filter_template(fields: tuple[tuple[str, bool], ...]) -> str:
+    """Milvus filter template over `(field, is_list)` pairs; each value is bound to a placeholder named after its field."""
+    for field, _ in fields:
+        if not field.isidentifier():
+            raise ValueError(f"Invalid filter field: {field!r}")
+    return " && ".join(f"{field} in {{{field}}}" if is_list else f"{field} == {{{field}}}" for field, is_list in fields)
+
+
+def milvus_filter(filters: Optional[GenericMetadataFilter]) -> tuple[Optional[str], dict[str, Any]]:
+    """
+    Filter expression and its `expr_params` for a Milvus search or query. Values are sent as template
+    parameters, never spliced into the expression: quoting is not our concern and Milvus parses each
+    distinct template once.
+    """
+    if not filters or filters.is_empty():
+        return None, {}
+    params = {
+        key: value for key, value in filters.items()
+        if not (value is None or value == "" or (isinstance(value, list) and len(value) == 0))  # skip empty values
+    }
+    if not params:
+        return None, {}
+    return _filter_template(tuple((key, isinstance(value, list)) for key, value in params.items())), params
+
+
+def milvus_index_params() -> dict[str, Any]:
+    """Index created with a new collection, from the MILVUS_INDEX_* settings."""
+    index_type = settings.MILVUS_INDEX_TYPE.upper()
+    if index_type == "HNSW":
+        params = {"M": settings.MILVUS_HNSW_M, "efConstruction": settings.MILVUS_HNSW_EF_CONSTRUCTION}
+    elif index_type in ("IVF_FLAT", "IVF_SQ8"):
+        params = {"nlist": settings.MILVUS_IVF_NLIST}
+    elif index_type in ("FLAT", "AUTOINDEX"):
+        params = {}
+    else:
+        raise ValueError(
+            f"Invalid MILVUS_INDEX_TYPE: {settings.MILVUS_INDEX_TYPE}. "
+            f"Supported: 'HNSW', 'IVF_FLAT', 'IVF_SQ8', 'FLAT', 'AUTOINDEX'."
+        )
+    return {"index_type": index_type, "metric_type": settings.MILVUS_METRIC_TYPE, "params": params}
+
+
+def milvus_search_params(index_type: str, metric_type: str, k: int) -> dict[str, Any]:
+    """Search params for an index of `index_type`, from the MILVUS_SEARCH_* settings."""
+    index_type = index_type.upper()
+    if index_type == "HNSW":
+        # HNSW returns at most ef results.
+        params = {"ef": max(settings.MILVUS_SEARCH_EF, k)}
+    elif index_type.startswith("IVF"):
+        params = {"nprobe": settings.MILVUS_SEARCH_NPROBE}
+    else:
+        params = {}
+    return {"metric_type": metric_type, "params": params}
+
+
+# Dedicated pool for blocking vector DB calls, so they neither stall the event loop nor compete
+# with everything else that uses the default executor.
+_executor = ThreadPoolExecutor(max_workers=settings.VECTOR_DB_MAX_WORKERS, thread_name_prefix="vector-db")
+
+
+def reset_after_fork():
+    """Give a forked worker its own executor threads and embedding-store connection."""
+    global _executor
+    _executor = ThreadPoolExecutor(max_workers=settings.VECTOR_DB_MAX_WORKERS, thread_name_prefix="vector-db")
+    if isinstance(embeddings, CachedEmbeddings):
+        embeddings.store.reconnect()
+
+
 class BaseVectorDBClient(ABC):
-    """Abstract base class for vector databases."""
+    """
+    Abstract base class for vector databases.
+    The `a*` coroutines are what request handlers and graph nodes should use. By default they run the
+    blocking implementation on a bounded executor; clients with a native async driver override them.
+    """
+
+    async def _run_blocking(self, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+    async def aadd_document(self, doc_id: str, document: Document):
+        return await self._run_blocking(self.add_document, doc_id, document)
+
+    async def aadd_documents(self, doc_ids: list[str], documents: list[Document]):
+        return await self._run_blocking(self.add_documents, doc_ids, documents)
+
+    async def adelete_document(self, doc_id: str):
+        return await self._run_blocking(self.delete_document, doc_id)
+
+    async def aupdate_document(self, doc_id: str, document: Document):
+        return await self._run_blocking(self.update_document, doc_id, document)
+
+    async def aget_document(self, doc_id: str) -> Optional[Document]:
+        return await self._run_blocking(self.get_document, doc_id)
+
+    async def asearch_documents(self, query: str, k: int = 3, filters: GenericMetadataFilter = None):
+        return await self._run_blocking(self.search_documents, query, k=k, filters=filters)
+
+    async def asearch_documents_batch(
+        self, queries: list[str], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        return await self._run_blocking(self.search_documents_batch, queries, k=k, filters=filters)
+
+    @property
+    @abstractmethod
+    def primary_field(self) -> str:
+        """Name of the document id in `iter_documents` records and in search results' metadata."""
+        pass
+
+    @property
+    @abstractmethod
+    def vector_field(self) -> str:
+        """Name of the embedding in `iter_documents` records when `include_vectors` is set."""
+        pass
 
     @abstractmethod
     def add_document(self, doc_id: str, document: Document):
         pass
 
+    @abstractmethod
+    def add_documents(self, doc_ids: list[str], documents: list[Document]):
+        pass
+
     @abstractmethod
     def delete_document(self, doc_id: str):
         pass
@@ -55,6 +202,23 @@ class BaseVectorDBClient(ABC):
     def search_documents(self, query: str, k: int = 3, filters: GenericMetadataFilter = None):
         pass
 
+    def search_documents_batch(
+        self, queries: list[str], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        """The `k` nearest documents for each query, in query order. Clients override this to batch the round trip."""
+        return [self.search_documents(query, k=k, filters=filters) for query in queries]
+
+    @abstractmethod
+    def search_vectors_batch(
+        self, vectors: list[list[float]], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        """The `k` nearest documents for each embedding vector, in order, in one round trip."""
+        pass
+
+    @abstractmethod
+    def get_document(self, doc_id: str) -> Optional[Document]:
+        pass
+
     @abstractmethod
     def get_database(self):
         pass
@@ -63,6 +227,20 @@ class BaseVectorDBClient(ABC):
     def get_all_documents(self):
         pass
 
+    @abstractmethod
+    def iter_documents(
+        self,
+        batch_size: int = 1000,
+        include_vectors: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """
+        Iterate over stored records in primary-key order, fetching `batch_size` records per round trip.
+        `after` is an exclusive primary-key cursor; vectors are only returned when `include_vectors` is set.
+        """
+        pass
+
     @abstractmethod
     def update_document(self, doc_id: str, document: Document):
         pass
@@ -71,6 +249,10 @@ class MilvusClientWrapper(BaseVectorDBClient):
     """Milvus client using LangChain integration."""
 
     def __init__(self):
+        # pymilvus (with pandas) and langchain_milvus are only imported when Milvus is the configured store.
+        from langchain_milvus import Milvus
+        from pymilvus import MilvusException, connections, db
+
         milvus_host = os.getenv("VECTOR_DB_HOST", "localhost")
         milvus_port = os.getenv("VECTOR_DB_PORT", "19530")
 
@@ -81,7 +263,7 @@ class MilvusClientWrapper(BaseVectorDBClient):
         connections.connect(host=milvus_host, port=milvus_port, token=f"{milvus_user}:{milvus_password}")
                         
         self.db_name = "users"
-        self.collection_name = "fragrances"
+        self.collection_name = settings.MILVUS_COLLECTION
 
         try:
             existing_databases = db.list_database()
@@ -92,52 +274,155 @@ class MilvusClientWrapper(BaseVectorDBClient):
                 database = db.create_database(self.db_name)
                 logger.info(f"Database '{self.db_name}' created successfully.")
         except MilvusException as e:
-            print(f"An error occurred: {e}")
+            logger.error(f"An error occurred: {e}")
 
-        # Initialize the vector store
+        # Initialize the vector store; the collection, with this index and partition key, is created on the first insert.
         self.vectorstore = Milvus(
-            embeddings,
+            get_embeddings(),
             collection_name=self.collection_name,
             connection_args={
                 "uri": f"http://{milvus_host}:{milvus_port}",
                 "token": f"{milvus_user}:{milvus_password}",
                 "db_name": f"{self.db_name}",
             },
-            enable_dynamic_field=True,            
+            index_params=milvus_index_params(),
+            partition_key_field=settings.MILVUS_PARTITION_KEY or None,
+            enable_dynamic_field=True,
         )
+        self._index: Optional[tuple[str, str]] = None
+        if self.vectorstore.col is not None:
+            partition_key = next((f.name for f in self.vectorstore.col.schema.fields if f.is_partition_key), None)
+            if partition_key != (settings.MILVUS_PARTITION_KEY or None):
+                logger.warning(
+                    f"Collection '{self.collection_name}' is partitioned by {partition_key!r}, not by "
+                    f"MILVUS_PARTITION_KEY={settings.MILVUS_PARTITION_KEY!r}; the layout only applies to new "
+                    f"collections. Export and bulk-ingest into a new MILVUS_COLLECTION to migrate."
+                )
+                partition_key = None
+        else:
+            partition_key = settings.MILVUS_PARTITION_KEY or None
+        # Set to the document id on insert; lookups by id then only scan that id's partition.
+        self.partition_key: Optional[str] = partition_key
+
+    @property
+    def primary_field(self) -> str:
+        return self.vectorstore._primary_field
+
+    @property
+    def vector_field(self) -> str:
+        return self.vectorstore._vector_field
+
+    def _metadatas(self, doc_ids: list[str], documents: list[Document]) -> list[dict]:
+        if not self.partition_key:
+            return [document.metadata for document in documents]
+        return [{self.partition_key: doc_id, **document.metadata} for doc_id, document in zip(doc_ids, documents)]
 
+    def _search_params(self, k: int) -> Optional[dict]:
+        """Search params for the collection's own index, which may predate the MILVUS_INDEX_* settings."""
+        if self._index is None:
+            if self.vectorstore.col is None:
+                return None
+            index = self.vectorstore.col.indexes[0].params
+            self._index = (index.get("index_type", "AUTOINDEX"), index.get("metric_type", settings.MILVUS_METRIC_TYPE))
+        return milvus_search_params(*self._index, k=k)
+
+    def _delete_ids(self, doc_ids: list[str]):
+        if self.vectorstore.col is None or not doc_ids:
+            return
+        expr = f"{self.vectorstore._primary_field} in {{doc_ids}}"
+        if self.partition_key:
+            expr += f" && {self.partition_key} in {{doc_ids}}"
+        self.vectorstore.col.delete(expr=expr, expr_params={"doc_ids": doc_ids}, timeout=self.vectorstore.timeout)
+
+    def _upsert(self, doc_ids: list[str], documents: list[Document]):
+        # Embed first: if that fails, nothing has been written. Milvus' upsert then replaces rows by primary key
+        # (a plain insert would add duplicates); the first write goes through langchain, which creates the collection.
+        texts = [document.page_content for document in documents]
+        vectors = self.vectorstore.embedding_func.embed_documents(texts)
+        metadatas = self._metadatas(doc_ids, documents)
+        if self.vectorstore.col is None:
+            self.vectorstore.add_embeddings(
+                texts=texts, embeddings=vectors, metadatas=metadatas, ids=doc_ids, batch_size=len(doc_ids)
+            )
+            return
+        rows = [
+            {
+                **metadata,
+                self.vectorstore._primary_field: doc_id,
+                self.vectorstore._text_field: text,
+                self.vectorstore._vector_field: vector,
+            }
+            for doc_id, text, vector, metadata in zip(doc_ids, texts, vectors, metadatas)
+        ]
+        self.vectorstore.col.upsert(rows, timeout=self.vectorstore.timeout)
+
+    @timed_operation(VECTOR_DB_SECONDS, "add_document")
     def add_document(self, doc_id: str, document: Document):
-        """Insert a document into Milvus."""
-        self.vectorstore.add_texts(ids=[doc_id], texts=[document.page_content], metadatas=[document.metadata])
+        """Insert a document into Milvus, replacing any stored under the same id."""
+        self._upsert([doc_id], [document])
 
+    @timed_operation(VECTOR_DB_SECONDS, "add_documents")
+    def add_documents(self, doc_ids: list[str], documents: list[Document]):
+        """Upsert many documents with one batched embedding call and one Milvus upsert."""
+        self._upsert(doc_ids, documents)
+
+    @timed_operation(VECTOR_DB_SECONDS, "delete_document")
     def delete_document(self, doc_id: str):
         """Delete a document from Milvus."""
-        if self.vectorstore.col is not None:
-            self.vectorstore.delete(ids=[doc_id])
+        self._delete_ids([doc_id])
 
+    @timed_operation(VECTOR_DB_SECONDS, "search_documents")
     def search_documents(self, query: str, k: int = 3, filters: GenericMetadataFilter = None):
-        milvus_filter = None
-        if filters and not filters.is_empty():
-            conditions = []
-            for key, value in filters.items():
-                if value is None or value == "" or (isinstance(value, list) and len(value) == 0):
-                    continue  # skip empty values
-                if isinstance(value, list):
-                    value_list = ', '.join(f'"{v}"' if isinstance(v, str) else str(v) for v in value)
-                    conditions.append(f'{key} in [{value_list}]')
-                else:
-                    value_str = f'"{value}"' if isinstance(value, str) else str(value)
-                    conditions.append(f'{key} == {value_str}')
-            milvus_filter = ' && '.join(conditions)
-        return self.vectorstore.similarity_search(query, k=k, expr=milvus_filter)
+        expr, expr_params = milvus_filter(filters)
+        return self.vectorstore.similarity_search(
+            query, k=k, param=self._search_params(k), expr=expr, expr_params=expr_params
+        )
+
+    @timed_operation(VECTOR_DB_SECONDS, "search_documents_batch")
+    def search_documents_batch(
+        self, queries: list[str], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        """One embedding request and one Milvus search for all `queries`."""
+        if not queries or self.vectorstore.col is None:
+            return [[] for _ in queries]
+        return self.search_vectors_batch(self.vectorstore.embedding_func.embed_documents(queries), k=k, filters=filters)
+
+    @timed_operation(VECTOR_DB_SECONDS, "search_vectors_batch")
+    def search_vectors_batch(
+        self, vectors: list[list[float]], k: int = 3, filters: GenericMetadataFilter = None
+    ) -> list[list[Document]]:
+        if not vectors or self.vectorstore.col is None:
+            return [[] for _ in vectors]
+        expr, expr_params = milvus_filter(filters)
+        results = self.vectorstore.col.search(
+            data=vectors,
+            anns_field=self.vectorstore._vector_field,
+            param=self._search_params(k),
+            limit=k,
+            expr=expr,
+            expr_params=expr_params,
+            output_fields=["*"],
+            timeout=self.vectorstore.timeout,
+        )
+        return [
+            [self.vectorstore._parse_document({field: hit.entity.get(field) for field in hit.entity.fields}) for hit in hits]
+            for hits in results
+        ]
 
+    @timed_operation(VECTOR_DB_SECONDS, "get_document")
     def get_document(self, doc_id: str) -> Optional[Document]:
         """
         Fetch a single document from Milvus by its primary key.
         Returns None if not found.
         """
+        if self.vectorstore.col is None:
+            return None
+        expr = f"{self.vectorstore._primary_field} == {{doc_id}}"
+        if self.partition_key:
+            expr += f" && {self.partition_key} == {{doc_id}}"
         results = self.vectorstore.col.query(
-            expr=f'{self.vectorstore._primary_field} == "{doc_id}"',
+            expr=expr,
+            expr_params={"doc_id": doc_id},
             output_fields=[self.vectorstore._text_field],  # adjust if you have metadata fields
             limit=1,
         )
@@ -155,12 +440,61 @@ class MilvusClientWrapper(BaseVectorDBClient):
         return Document(page_content=text, metadata=metadata)
 
     def update_document(self, doc_id: str, document: Document):
-        self.delete_document(doc_id)
+        # Adding an existing id replaces it.
         self.add_document(doc_id, document)
 
-    def get_database(self) -> Milvus:
+    def get_database(self) -> "Milvus":
         """Return Milvus vectorstore."""
         return self.vectorstore
 
     def get_all_documents(self):
-        return self.vectorstore.col.query(expr="", output_fields=["*"], limit=1000)
\ No newline at end of file
+        return list(self.iter_documents(limit=1000))
+
+    def _output_fields(self, include_vectors: bool) -> list[str]:
+        """Server-side projection: every scalar field (plus dynamic fields), vectors only on request."""
+        from pymilvus import DataType
+
+        vector_types = {
+            DataType.FLOAT_VECTOR,
+            DataType.BINARY_VECTOR,
+            DataType.FLOAT16_VECTOR,
+            DataType.BFLOAT16_VECTOR,
+            DataType.SPARSE_FLOAT_VECTOR,
+        }
+        schema = self.vectorstore.col.schema
+        fields = [
+            field.name for field in schema.fields
+            if include_vectors or field.dtype not in vector_types
+        ]
+        if schema.enable_dynamic_field:
+            fields.append("$meta")
+        return fields
+
+    def iter_documents(
+        self,
+        batch_size: int = 1000,
+        include_vectors: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[dict]:
+        if self.vectorstore.col is None:
+            return
+
+        query_kwargs = {}
+        expr = None
+        if after:
+            expr = f"{self.vectorstore._primary_field} > {{after}}"
+            query_kwargs["expr_params"] = {"after": after}
+
+        iterator = self.vectorstore.col.query_iterator(
+            batch_size=batch_size,
+            limit=limit if limit is not None else -1,
+            expr=expr,
+            output_fields=self._output_fields(include_vectors),
+            **query_kwargs,
+        )
+        try:
+            while batch := iterator.next():
+                yield from batch
+        finally:
+            iterator.close()
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from core import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmUpStep:
+    """One dependency warmed up after startup; `run` is synchronous and called off the event loop."""
+
+    name: str
+    run: Callable[[], Any]
+    status: str = "pending"
+    seconds: Optional[float] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+    def report(self) -> dict[str, Any]:
+        return {"status": self.status, "seconds": self.seconds, "attempts": self.attempts, "error": self.error}
+
+
+class Readiness:
+    """
+    Warms the app's dependencies (clients, compiled graphs, encodings) in the background so the lifespan
+    returns, and the server listens, at once. Steps run in order; a failing step is retried every
+    `retry_interval` seconds and holds back the ones after it. `/health` only says the process is up,
+    `/ready` says it is `ready`: every step has completed. Requests that need the warmed dependencies
+    `wait` for them instead of building them on the event loop.
+    """
+
+    def __init__(self, retry_interval: float):
+        self.retry_interval = retry_interval
+        self.steps: list[WarmUpStep] = []
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready_event: Optional[asyncio.Event] = None
+
+    @property
+    def started(self) -> bool:
+        return self.started_at is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the warm-up; whether it has finished."""
+        if not self.ready and self._ready_event is not None:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._ready_event.wait(), timeout)
+        return self.ready
+
+    async def _run_step(self, step: WarmUpStep):
+        while True:
+            step.status = "running"
+            step.attempts += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(step.run)
+            except Exception as e:
+                step.status = "failed"
+                step.error = str(e)
+                logger.error(
+                    f"Warm-up step '{step.name}' failed (attempt {step.attempts}), retrying in "
+                    f"{self.retry_interval}s: {e}",
+                    exc_info=True,
+                )
+                await asyncio.sleep(self.retry_interval)
+                continue
+            step.status = "ready"
+            step.seconds = time.perf_counter() - start
+            step.error = None
+            logger.debug(f"Warm-up step '{step.name}' took {step.seconds * 1000:.0f} ms.")
+            return
+
+    async def _warm_up(self):
+        for step in self.steps:
+            await self._run_step(step)
+        self.ready_at = time.perf_counter()
+        self._ready_event.set()
+        logger.info(f"Ready in {self.ready_at - self.started_at:.2f}s.")
+
+    def start(self, steps: list[tuple[str, Callable[[], Any]]]):
+        if self._task is None:
+            self.steps = [WarmUpStep(name, run) for name, run in steps]
+            self.started_at = time.perf_counter()
+            self._ready_event = asyncio.Event()
+            self._task = asyncio.create_task(self._warm_up())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "seconds": self.ready_at - self.started_at if self.ready else None,
+            "steps": {step.name: step.report() for step in self.steps},
+        }
+
+
+readiness: Optional[Readiness] = None
+
+
+def get_readiness() -> Readiness:
+    """The process-wide readiness tracker."""
+    global readiness
+    if readiness is None:
+        readiness = Readiness(retry_interval=settings.WARM_UP_RETRY_INTERVAL)
+    return readiness
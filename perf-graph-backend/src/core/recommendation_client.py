@@ -1,22 +1,54 @@
 import logging
+import time
 from typing import Optional, List
 
-import requests
+import httpx
+from core.metrics import BACKEND_SECONDS
 from core.settings import settings
-from schema.clients import FragranceRecommendationResponse
+from schema.clients import FragranceRecommendationResponse, FragranceResponseModel
 from pydantic import ValidationError
 
 logger = logging.getLogger(__name__)
 
 
 class RecommendationClient:
-    def __init__(self, base_url: str):
+    """
+    Asyncio-native client for perf-agent-backend.
+    A single pooled `httpx.AsyncClient` is shared by every tool call, so connections are kept alive
+    and a slow backend is bounded by the configured timeouts instead of pinning executor threads.
+    """
+
+    def __init__(self, base_url: str, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.base_url = base_url.rstrip("/")
         self.headers = {
             "Content-Type": "application/json"
         }
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the client binds to the running event loop (and to the worker process after fork).
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=settings.RECOMMENDATION_HTTP2,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=settings.RECOMMENDATION_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.RECOMMENDATION_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.RECOMMENDATION_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    connect=settings.RECOMMENDATION_CONNECT_TIMEOUT,
+                    read=settings.RECOMMENDATION_READ_TIMEOUT,
+                    write=settings.RECOMMENDATION_WRITE_TIMEOUT,
+                    pool=settings.RECOMMENDATION_POOL_TIMEOUT,
+                ),
+            )
+        return self._client
 
-    def recommend_fragrances(
+    async def recommend_fragrances(
         self,
         types: List[str],
         notes: List[str],
@@ -25,8 +57,7 @@ class RecommendationClient:
         brandName: Optional[str] = None,
         fragranceName: Optional[str] = None,
         count: Optional[int] = None
-    ) -> Optional[FragranceRecommendationResponse]:
-        url = f"{self.base_url}/api/agent/recommend"
+    ) -> Optional[List[FragranceResponseModel]]:
         payload = {
             "types": types,
             "notes": notes,
@@ -36,25 +67,58 @@ class RecommendationClient:
             "fragranceName": fragranceName,
             "count": count
         }
+        logger.debug(f"Recommendation payload: {payload}")
 
-        print("Payload")
-        print(payload)
-
+        start = time.perf_counter()
+        status = "error"
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = await self._get_client().post("/api/agent/recommend", json=payload)
+            status = str(response.status_code)
             response.raise_for_status()
-            print("Response")
-            print(response.json())
             try:
                 validated = FragranceRecommendationResponse.model_validate(response.json())
                 return validated.root
-            except ValidationError as ve:
+            except (ValidationError, ValueError) as ve:
                 logger.error(f"Failed to validate response: {ve}")
-        except requests.RequestException as e:
-            logger.error(f"Failed to recommend fragrances: {e}")
-        
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to recommend fragrances: {e!r}")
+        finally:
+            BACKEND_SECONDS.labels("recommend", status).observe(time.perf_counter() - start)
+
         return None
 
+    async def fetch_catalog(self) -> Optional[List[FragranceResponseModel]]:
+        """
+        Every fragrance the backend knows. A request without filters matches every ontology individual,
+        so entries that are not fragrances (notes, note families, performance levels) are skipped.
+        """
+        payload = {"types": [], "notes": [], "hasLongevity": [], "hasSillage": [],
+                   "brandName": None, "fragranceName": None, "count": None}
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._get_client().post("/api/agent/recommend", json=payload)
+            status = str(response.status_code)
+            response.raise_for_status()
+            fragrances = []
+            for item in response.json():
+                try:
+                    fragrances.append(FragranceResponseModel.model_validate(item))
+                except ValidationError:
+                    continue
+            return fragrances
+        except (httpx.HTTPError, ValueError, TypeError) as e:
+            logger.error(f"Failed to fetch the fragrance catalog: {e!r}")
+        finally:
+            BACKEND_SECONDS.labels("catalog", status).observe(time.perf_counter() - start)
+
+        return None
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 recommendation_client: Optional[RecommendationClient] = None
 
 def get_recommendation_client() -> RecommendationClient:
@@ -62,3 +126,13 @@ def get_recommendation_client() -> RecommendationClient:
     if recommendation_client is None:
         recommendation_client = RecommendationClient(base_url=settings.API_URL)
     return recommendation_client
+
+def reset_recommendation_client():
+    """Forget a client inherited from a parent process; a forked worker builds its own connection pool."""
+    global recommendation_client
+    recommendation_client = None
+
+async def close_recommendation_client():
+    """Release pooled connections. Call this once during FastAPI app shutdown."""
+    if recommendation_client is not None:
+        await recommendation_client.aclose()
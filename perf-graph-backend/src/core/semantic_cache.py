@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core import settings
+from core.cache import register_cache
+from core.metrics import SEMANTIC_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    content: str
+    assets: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class SemanticHit:
+    response: CachedResponse
+    similarity: float
+
+
+class _Scope:
+    """Entries sharing one scope: a matrix of unit-length question vectors plus their answers."""
+
+    __slots__ = ("vectors", "responses", "created_at")
+
+    def __init__(self, dimension: int):
+        self.vectors = np.empty((0, dimension), dtype=np.float32)
+        self.responses: list[CachedResponse] = []
+        self.created_at: list[float] = []
+
+    def __len__(self):
+        return len(self.responses)
+
+    def drop_first(self, count: int):
+        self.vectors = self.vectors[count:]
+        del self.responses[:count]
+        del self.created_at[:count]
+
+
+def profile_fingerprint(profile: Optional[Document]) -> str:
+    """Stable hash of a user profile: a changed profile gets a fresh cache scope."""
+    if profile is None:
+        return "none"
+    payload = json.dumps([profile.page_content, profile.metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticResponseCache:
+    """
+    Cache of final agent answers, looked up by cosine similarity of the question embedding.
+
+    Entries are partitioned into scopes (e.g. agent, model and profile hash), so a hit can only come
+    from a question asked against the same profile with the same model. Each scope keeps at most
+    `max_per_scope` entries (oldest dropped first), the whole cache at most `maxsize` entries
+    (least recently used scope dropped first), and entries older than `ttl` seconds never match.
+    """
+
+    def __init__(self, name: str, embedding: Embeddings, threshold: float, maxsize: int, ttl: float,
+                 max_per_scope: int):
+        self.name = name
+        self.embedding = embedding
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_per_scope = max_per_scope
+        self._lock = threading.Lock()
+        self._scopes: OrderedDict[Hashable, _Scope] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit = SEMANTIC_CACHE_LOOKUPS.labels(name, "hit")
+        self._miss = SEMANTIC_CACHE_LOOKUPS.labels(name, "miss")
+        register_cache(name, self)
+
+    @staticmethod
+    def _normalize(vector: list[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    async def aembed(self, question: str) -> np.ndarray:
+        return self._normalize(await self.embedding.aembed_query(question))
+
+    def _expire(self, scope_key: Hashable, scope: _Scope, now: float):
+        if not self.ttl:
+            return
+        expired = next((i for i, created in enumerate(scope.created_at) if now - created < self.ttl), len(scope))
+        if expired:
+            scope.drop_first(expired)
+            self._size -= expired
+            self.evictions += expired
+            if not len(scope):
+                del self._scopes[scope_key]
+
+    def lookup(self, scope_key: Hashable, vector: np.ndarray) -> Optional[SemanticHit]:
+        with self._lock:
+            scope = self._scopes.get(scope_key)
+            if scope is not None:
+                self._expire(scope_key, scope, time.monotonic())
+            if scope is not None and len(scope):
+                similarities = scope.vectors @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._scopes.move_to_end(scope_key)
+                    self.hits += 1
+                    self._hit.inc()
+                    return SemanticHit(scope.responses[best], float(similarities[best]))
+        self.misses += 1
+        self._miss.inc()
+        return None
+
+    def store(self, scope_key: Hashable, vector: np.ndarray, response: CachedResponse):
+        with self._lock:
+            scope = self._scopes.get(scope_key)
+            if scope is None:
+                scope = self._scopes[scope_key] = _Scope(len(vector))
+            scope.vectors = np.vstack([scope.vectors, vector[np.newaxis, :]])
+            scope.responses.append(response)
+            scope.created_at.append(time.monotonic())
+            self._size += 1
+            self._scopes.move_to_end(scope_key)
+
+            if len(scope) > self.max_per_scope:
+                scope.drop_first(1)
+                self._size -= 1
+                self.evictions += 1
+            while self._size > self.maxsize:
+                _, evicted = self._scopes.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += len(evicted)
+
+    def clear(self) -> int:
+        with self._lock:
+            flushed = self._size
+            self._scopes.clear()
+            self._size = 0
+        logger.info(f"Cache '{self.name}' flushed ({flushed} entries).")
+        return flushed
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": self._size,
+            "scopes": len(self._scopes),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+semantic_cache: Optional[SemanticResponseCache] = None
+
+
+def get_semantic_cache() -> Optional[SemanticResponseCache]:
+    """The process-wide semantic response cache, or None when SEMANTIC_CACHE_ENABLED is off."""
+    global semantic_cache
+    if semantic_cache is None and settings.SEMANTIC_CACHE_ENABLED:
+        from core.persistence.vector_db import get_embeddings
+
+        semantic_cache = SemanticResponseCache(
+            name="semantic_responses",
+            embedding=get_embeddings(),
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            maxsize=settings.SEMANTIC_CACHE_MAXSIZE,
+            ttl=settings.SEMANTIC_CACHE_TTL,
+            max_per_scope=settings.SEMANTIC_CACHE_MAX_PER_SCOPE,
+        )
+    return semantic_cache
@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Annotated, Any
 
 from dotenv import find_dotenv
@@ -18,6 +19,10 @@ from schema.models import (
 )
 
 
+# Default location of the local caches: src/ (/app in the image), independent of the working directory.
+_CACHE_DIR = Path(__file__).resolve().parents[1] / ".cache"
+
+
 def check_str_is_http(x: str) -> str:
     http_url_adapter = TypeAdapter(HttpUrl)
     return str(http_url_adapter.validate_python(x))
@@ -49,6 +54,144 @@ class Settings(BaseSettings):
 
     SCHEMA_DB_TYPE: str = "mongo"
     VECTOR_DB_TYPE: str = "milvus"
+    VECTOR_DB_MAX_WORKERS: int = 16
+    # VECTOR_DB_TYPE="local": in-process store persisted under this directory
+    LOCAL_VECTOR_DB_PATH: str = str(_CACHE_DIR / "vector_db")
+    # Fraction of dead (replaced or deleted) rows that triggers compaction
+    LOCAL_VECTOR_DB_COMPACTION_THRESHOLD: float = 0.3
+    # VECTOR_DB_TYPE="milvus": collection layout and ANN index. MILVUS_INDEX_TYPE is "HNSW" (M, efConstruction),
+    # "IVF_FLAT" / "IVF_SQ8" (nlist), "FLAT" or "AUTOINDEX". The index, metric and partition key are fixed when
+    # the collection is created; an existing collection keeps its own, and only the search-time ef (HNSW,
+    # at least k) or nprobe (IVF) below apply to it. Rows are spread over Milvus' partition-key partitions
+    # by MILVUS_PARTITION_KEY, filled with the user id; "" disables it.
+    MILVUS_COLLECTION: str = "fragrances"
+    MILVUS_INDEX_TYPE: str = "HNSW"
+    MILVUS_METRIC_TYPE: str = "COSINE"
+    MILVUS_HNSW_M: int = 16
+    MILVUS_HNSW_EF_CONSTRUCTION: int = 200
+    MILVUS_IVF_NLIST: int = 1024
+    MILVUS_SEARCH_EF: int = 64
+    MILVUS_SEARCH_NPROBE: int = 16
+    MILVUS_PARTITION_KEY: str = "user_id"
+
+    # perf-agent-backend HTTP client (timeouts are in seconds)
+    RECOMMENDATION_CONNECT_TIMEOUT: float = 2.0
+    RECOMMENDATION_READ_TIMEOUT: float = 15.0
+    RECOMMENDATION_WRITE_TIMEOUT: float = 5.0
+    RECOMMENDATION_POOL_TIMEOUT: float = 2.0
+    RECOMMENDATION_MAX_CONNECTIONS: int = 100
+    RECOMMENDATION_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    RECOMMENDATION_KEEPALIVE_EXPIRY: float = 30.0
+    RECOMMENDATION_HTTP2: bool = False
+
+    RECOMMENDATION_CACHE_ENABLED: bool = True
+    RECOMMENDATION_CACHE_MAXSIZE: int = 1024
+    RECOMMENDATION_CACHE_TTL: float = 300.0
+
+    # Local replica of the backend's fragrance catalog (opt-in): recommendations are answered in-process
+    # once a snapshot is loaded, and CATALOG_CONSISTENCY_SAMPLE_RATE of them are re-checked remotely.
+    CATALOG_REPLICA_ENABLED: bool = False
+    CATALOG_REFRESH_INTERVAL: float = 600.0
+    CATALOG_CONSISTENCY_SAMPLE_RATE: float = 0.01
+
+    # "Similar users" kNN graph (opt-in): each profile's SIMILAR_USERS_K nearest profiles, precomputed so
+    # GET /user/{user_id}/similar and the similar_users_preferences tool never run an ANN query. Changed
+    # profiles get new neighbours in the background, SIMILAR_USERS_UPDATE_DELAY seconds after a change so a
+    # burst shares one batched search. Every SIMILAR_USERS_REBUILD_INTERVAL seconds (0: only at startup) the
+    # whole graph is rebuilt from the stored vectors, which also brings in other workers' writes and the
+    # lists a changed profile has entered or left. Searches are sent SIMILAR_USERS_BATCH_SIZE profiles at a time.
+    SIMILAR_USERS_ENABLED: bool = False
+    SIMILAR_USERS_K: int = 10
+    SIMILAR_USERS_UPDATE_DELAY: float = 1.0
+    SIMILAR_USERS_REBUILD_INTERVAL: float = 3600.0
+    SIMILAR_USERS_BATCH_SIZE: int = 256
+
+    PROFILE_CACHE_ENABLED: bool = True
+    PROFILE_CACHE_MAXSIZE: int = 10000
+    PROFILE_CACHE_TTL: float = 60.0
+    # A continued thread re-reads the user profile at most this often (seconds); a changed profile
+    # (new content hash) replaces the one kept in the thread state.
+    PROFILE_RECHECK_INTERVAL: float = 60.0
+
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = str(_CACHE_DIR / "embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    EMBEDDING_CACHE_HOT_SIZE: int = 2048
+    EMBEDDING_CACHE_HOT_TTL: float = 3600.0
+
+    # Semantic cache of final agent answers (opt-in): a question whose embedding is at least
+    # SEMANTIC_CACHE_THRESHOLD cosine-similar to an earlier one, for the same profile and model,
+    # replays the earlier answer instead of running the graph.
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_MAXSIZE: int = 5000
+    SEMANTIC_CACHE_TTL: float = 3600.0
+    SEMANTIC_CACHE_MAX_PER_SCOPE: int = 32
+
+    # Rows per embedding request / Milvus insert, capped at the provider's input limit.
+    BULK_INGEST_BATCH_SIZE: int = 500
+    BULK_INGEST_CONCURRENCY: int = 4
+
+    # Fast path: requests the gazetteer maps onto recommend_fragrances_func with at least this share of
+    # recognised words call the tool directly instead of asking the LLM to pick it.
+    FAST_PATH_ENABLED: bool = True
+    FAST_PATH_MIN_CONFIDENCE: float = 0.75
+
+    # Conversation compaction: once a thread's messages exceed the model's token budget, older turns
+    # are folded into a rolling summary, keeping about COMPACTION_KEEP_RATIO of the budget verbatim.
+    COMPACTION_TOKEN_BUDGETS: dict[str, int] = {"gpt-4o-mini": 6000, "gpt-4o": 6000}
+    COMPACTION_DEFAULT_TOKEN_BUDGET: int = 6000
+    COMPACTION_KEEP_RATIO: float = 0.5
+
+    # Admission control for /invoke and /stream: at most ADMISSION_MAX_CONCURRENCY graph runs (and
+    # ADMISSION_MODEL_CONCURRENCY[model] per model) execute at once. Up to ADMISSION_MAX_QUEUE requests wait
+    # for at most ADMISSION_MAX_WAIT seconds, then are shed with 429 + Retry-After. Each caller may start
+    # ADMISSION_USER_RATE runs per second on average, in bursts of ADMISSION_USER_BURST; 0 (the default) disables
+    # the limit. Callers without a user_id are told apart by client address, which behind a proxy is the proxy's.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 64
+    ADMISSION_MODEL_CONCURRENCY: dict[str, int] = {}
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_MAX_WAIT: float = 10.0
+    ADMISSION_USER_RATE: float = 0.0
+    ADMISSION_USER_BURST: int = 10
+
+    # How /stream reads the graph: "astream" (stream modes, only the events the SSE protocol needs)
+    # or "events" (astream_events v2, every runnable's events, filtered by tags).
+    STREAM_ENGINE: str = "astream"
+
+    # Production server (gunicorn -c gunicorn_conf.py main:app): WEB_CONCURRENCY uvicorn workers, 0 for one
+    # per CPU. A worker is recycled after WORKER_MAX_REQUESTS requests (plus a random 0..WORKER_MAX_REQUESTS_JITTER,
+    # so workers do not restart together) or once its RSS exceeds WORKER_MAX_RSS_MB, checked every
+    # WORKER_RSS_CHECK_INTERVAL seconds; 0 disables either limit. A stopping worker gives in-flight requests,
+    # SSE streams included, WORKER_GRACEFUL_TIMEOUT seconds to finish.
+    WEB_CONCURRENCY: int = 0
+    PRELOAD_APP: bool = True
+    WORKER_MAX_REQUESTS: int = 5000
+    WORKER_MAX_REQUESTS_JITTER: int = 500
+    WORKER_MAX_RSS_MB: int = 1024
+    WORKER_RSS_CHECK_INTERVAL: float = 10.0
+    WORKER_GRACEFUL_TIMEOUT: int = 120
+    WORKER_TIMEOUT: int = 300
+    WORKER_KEEPALIVE: int = 120
+
+    # Dependencies are warmed up in the background after startup; /ready reports 503 until they are.
+    # A failed warm-up step is retried after WARM_UP_RETRY_INTERVAL seconds. Agent and user requests arriving
+    # earlier wait up to WARM_UP_REQUEST_WAIT seconds for the warm-up, then are answered 503.
+    WARM_UP_RETRY_INTERVAL: float = 5.0
+    WARM_UP_REQUEST_WAIT: float = 10.0
+
+    # LangGraph checkpointer: "memory", "sqlite" or "mongo"
+    CHECKPOINTER_TYPE: str = "memory"
+    CHECKPOINT_SQLITE_PATH: str = str(_CACHE_DIR / "checkpoints.sqlite3")
+    # Threads idle for longer than this (seconds) are dropped; 0 disables the TTL.
+    CHECKPOINT_TTL: float = 86400.0
+    CHECKPOINT_MAX_THREADS: int = 10000
+    CHECKPOINT_KEEP_PER_THREAD: int = 2
+    CHECKPOINT_PRUNE_INTERVAL: float = 60.0
+    # Serialized checkpoints at least this large (bytes) are zlib-compressed; 0 disables compression.
+    CHECKPOINT_COMPRESSION_THRESHOLD: int = 1024
+
     def model_post_init(self, __context: Any) -> None:
         api_keys = {
             Provider.OPENAI: self.OPENAI_API_KEY,
@@ -0,0 +1,219 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Iterable, Optional
+
+from langchain_core.documents import Document
+
+from core import settings
+from core.metrics import SIMILAR_USERS_SECONDS
+from core.persistence.db_factory import get_vector_db_client
+
+logger = logging.getLogger(__name__)
+
+# Once more than this share of the graph has changed, one full rebuild is cheaper than per-profile updates.
+_REBUILD_FRACTION = 0.1
+# Seconds before a failed rebuild or update is retried.
+_RETRY_DELAY = 30.0
+
+
+class SimilarUsersIndex:
+    """
+    Precomputed kNN graph over the user profiles in the vector DB: user id -> the ids of its `k` nearest
+    profiles, closest first.
+
+    A background task builds the graph from the stored vectors (one batched search per `batch_size`
+    profiles, no embedding calls) and rebuilds it every `rebuild_interval` seconds. Profiles reported
+    through `mark_changed` get fresh neighbours `update_delay` seconds later: the changed profiles are
+    embedded (an embedding-cache hit right after the write) and searched in one batch. Other users'
+    lists only gain or lose a changed profile at the next rebuild.
+
+    Reads are dict lookups; neighbour profiles are read from the vector DB client (through the profile
+    cache) at request time, so they are never staler than the profiles themselves.
+    """
+
+    def __init__(self, k: int, update_delay: float, rebuild_interval: float, batch_size: int):
+        self.k = k
+        self.update_delay = update_delay
+        self.rebuild_interval = rebuild_interval
+        self.batch_size = batch_size
+        self.neighbours: dict[str, tuple[str, ...]] = {}
+        self.built_at: Optional[float] = None
+        self.rebuilds = 0
+        self.updates = 0
+        self.failures = 0
+        self._changed: set[str] = set()
+        self._rebuild_requested = False
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def mark_changed(self, *user_ids: str):
+        """Schedule new neighbours for profiles that were written (or deleted)."""
+        self._changed.update(user_ids)
+        if self._wake is not None:
+            self._wake.set()
+
+    def request_rebuild(self):
+        self._rebuild_requested = True
+        if self._wake is not None:
+            self._wake.set()
+
+    async def aneighbour_profiles(self, user_id: str, k: int) -> Optional[list[tuple[str, Document]]]:
+        """Up to `k` nearest profiles of `user_id`, or None when none are computed for it yet."""
+        neighbours = self.neighbours.get(user_id)
+        if neighbours is None:
+            # Possibly written by another worker since the last rebuild: compute it now.
+            self.mark_changed(user_id)
+            return None
+        client = get_vector_db_client()
+        documents = await asyncio.gather(*(client.aget_document(neighbour) for neighbour in neighbours[:k]))
+        # A neighbour deleted since its list was computed is skipped.
+        return [(neighbour, document) for neighbour, document in zip(neighbours, documents) if document is not None]
+
+    # --- computation, off the event loop ---
+
+    def _neighbour_ids(self, user_ids: Iterable[str], results: list[list[Document]]) -> dict[str, tuple[str, ...]]:
+        # Searches ask for k + 1 results, as a profile finds itself first.
+        primary_field = get_vector_db_client().primary_field
+        neighbours = {}
+        for user_id, documents in zip(user_ids, results):
+            ids = [doc.metadata[primary_field] for doc in documents]
+            neighbours[user_id] = tuple(neighbour for neighbour in ids if neighbour != user_id)[:self.k]
+        return neighbours
+
+    def _search_records(self, records: list[dict]) -> dict[str, tuple[str, ...]]:
+        client = get_vector_db_client()
+        results = client.search_vectors_batch([record[client.vector_field] for record in records], k=self.k + 1)
+        return self._neighbour_ids([record[client.primary_field] for record in records], results)
+
+    def _build(self) -> dict[str, tuple[str, ...]]:
+        graph: dict[str, tuple[str, ...]] = {}
+        records: list[dict] = []
+        for record in get_vector_db_client().iter_documents(batch_size=self.batch_size, include_vectors=True):
+            records.append(record)
+            if len(records) == self.batch_size:
+                graph.update(self._search_records(records))
+                records = []
+        if records:
+            graph.update(self._search_records(records))
+        return graph
+
+    def _recompute(self, user_ids: list[str]) -> dict[str, Optional[tuple[str, ...]]]:
+        """Fresh neighbours for `user_ids`; None for those without a profile."""
+        client = get_vector_db_client()
+        updated: dict[str, Optional[tuple[str, ...]]] = dict.fromkeys(user_ids)
+        for start in range(0, len(user_ids), self.batch_size):
+            profiles = {user_id: client.get_document(user_id) for user_id in user_ids[start:start + self.batch_size]}
+            present = [user_id for user_id, profile in profiles.items() if profile is not None]
+            if present:
+                results = client.search_documents_batch([profiles[u].page_content for u in present], k=self.k + 1)
+                updated.update(self._neighbour_ids(present, results))
+        return updated
+
+    # --- background maintenance ---
+
+    async def rebuild(self):
+        # Changes made so far are read by the rebuild; later ones are applied after it.
+        self._changed.clear()
+        self._rebuild_requested = False
+        start = time.perf_counter()
+        self.neighbours = await asyncio.to_thread(self._build)
+        SIMILAR_USERS_SECONDS.labels("rebuild").observe(time.perf_counter() - start)
+        self.built_at = time.time()
+        self.rebuilds += 1
+        logger.info(f"Similar users graph built for {len(self.neighbours)} profiles in {time.perf_counter() - start:.1f}s.")
+
+    async def update(self):
+        user_ids, self._changed = list(self._changed), set()
+        start = time.perf_counter()
+        try:
+            updated = await asyncio.to_thread(self._recompute, user_ids)
+        except BaseException:
+            self._changed.update(user_ids)
+            raise
+        for user_id, neighbours in updated.items():
+            if neighbours is None:
+                self.neighbours.pop(user_id, None)
+            else:
+                self.neighbours[user_id] = neighbours
+        SIMILAR_USERS_SECONDS.labels("update").observe(time.perf_counter() - start)
+        self.updates += 1
+        logger.debug(f"Updated the neighbours of {len(user_ids)} profiles.")
+
+    def _seconds_to_rebuild(self) -> Optional[float]:
+        if self.built_at is None or self._rebuild_requested:
+            return 0.0
+        if len(self._changed) > _REBUILD_FRACTION * max(len(self.neighbours), 1):
+            return 0.0
+        if not self.rebuild_interval:
+            return None
+        return max(self.built_at + self.rebuild_interval - time.time(), 0.0)
+
+    async def _maintain(self):
+        while True:
+            self._wake.clear()
+            try:
+                if self._seconds_to_rebuild() == 0.0:
+                    await self.rebuild()
+                elif self._changed:
+                    await asyncio.sleep(self.update_delay)
+                    await self.update()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Similar users graph maintenance failed: {e}", exc_info=True)
+                await asyncio.sleep(_RETRY_DELAY)
+                continue
+            if not self._changed:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), self._seconds_to_rebuild())
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "profiles": len(self.neighbours),
+            "k": self.k,
+            "built_at": self.built_at,
+            "rebuild_interval": self.rebuild_interval,
+            "rebuilds": self.rebuilds,
+            "updates": self.updates,
+            "pending_changes": len(self._changed),
+            "failures": self.failures,
+        }
+
+
+similar_users: Optional[SimilarUsersIndex] = None
+
+
+def get_similar_users() -> Optional[SimilarUsersIndex]:
+    """The process-wide similar-users graph, or None when SIMILAR_USERS_ENABLED is off."""
+    global similar_users
+    if similar_users is None and settings.SIMILAR_USERS_ENABLED:
+        similar_users = SimilarUsersIndex(
+            k=settings.SIMILAR_USERS_K,
+            update_delay=settings.SIMILAR_USERS_UPDATE_DELAY,
+            rebuild_interval=settings.SIMILAR_USERS_REBUILD_INTERVAL,
+            batch_size=settings.SIMILAR_USERS_BATCH_SIZE,
+        )
+    return similar_users
+
+
+def profiles_changed(*user_ids: str):
+    """Tell the similar-users graph, if enabled, that these profiles were written."""
+    index = get_similar_users()
+    if index is not None:
+        index.mark_changed(*user_ids)
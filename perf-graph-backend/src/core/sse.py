@@ -0,0 +1,65 @@
+import time
+from typing import Any, Optional
+
+import orjson
+from pydantic import BaseModel
+
+# Server-sent event frames of the agent stream, pre-split around their only variable part so a
+# frame is one orjson call plus a bytes concatenation.
+_TOKEN_PREFIX = b'data: {"type":"token","content":'
+_MESSAGE_PREFIX = b'data: {"type":"message","content":'
+_ERROR_PREFIX = b'data: {"type":"error","content":'
+_FRAME_SUFFIX = b"}\n\n"
+DONE_FRAME = b"data: [DONE]\n\n"
+
+
+def token_frame(content: str) -> bytes:
+    return _TOKEN_PREFIX + orjson.dumps(content) + _FRAME_SUFFIX
+
+
+def message_frame(message: BaseModel) -> bytes:
+    return _MESSAGE_PREFIX + message.model_dump_json().encode() + _FRAME_SUFFIX
+
+
+def error_frame(content: Any) -> bytes:
+    return _ERROR_PREFIX + orjson.dumps(content) + _FRAME_SUFFIX
+
+
+class TokenCoalescer:
+    """
+    Buffers streamed tokens into fewer, larger token frames.
+
+    A frame is emitted once the buffer holds `max_bytes` bytes (UTF-8) or its oldest token is
+    `max_delay` seconds old; a zero disables that trigger, both zero disables coalescing. The age is
+    only checked when a token arrives, so callers `flush` before any other frame and at the end.
+    """
+
+    def __init__(self, max_delay: float = 0.0, max_bytes: int = 0):
+        self.max_delay = max_delay
+        self.max_bytes = max_bytes
+        self.enabled = max_delay > 0 or max_bytes > 0
+        self._parts: list[str] = []
+        self._size = 0
+        self._started_at = 0.0
+
+    def add(self, content: str) -> Optional[bytes]:
+        """Buffer `content`; returns a frame when a trigger fired."""
+        if not self.enabled:
+            return token_frame(content)
+        if not self._parts:
+            self._started_at = time.perf_counter()
+        self._parts.append(content)
+        self._size += len(content.encode())
+        if (self.max_bytes and self._size >= self.max_bytes) or (
+            self.max_delay and time.perf_counter() - self._started_at >= self.max_delay
+        ):
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        if not self._parts:
+            return None
+        content = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        return token_frame(content)
@@ -0,0 +1,68 @@
+import logging
+import os
+import signal
+from typing import Optional
+
+from uvicorn.workers import UvicornWorker as _UvicornWorker
+
+from core import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds of gunicorn's graceful_timeout kept for the app's shutdown hooks once in-flight requests are cut off.
+_SHUTDOWN_MARGIN = 5
+
+
+def resident_memory() -> Optional[int]:
+    """Resident set size of this process in bytes, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class UvicornWorker(_UvicornWorker):
+    """
+    Gunicorn worker serving the app with uvicorn.
+
+    On shutdown or recycle it stops accepting connections and lets in-flight requests, SSE streams
+    included, run for gunicorn's `graceful_timeout` (minus a margin for the lifespan shutdown) before
+    cancelling them. It also recycles itself, the same graceful way, once its RSS exceeds
+    WORKER_MAX_RSS_MB; gunicorn then forks a replacement.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - _SHUTDOWN_MARGIN, 1)
+        self.max_rss = settings.WORKER_MAX_RSS_MB * 1024 * 1024
+        self.startup_checked = False
+        self.recycling = False
+        if self.max_rss:
+            # uvicorn calls callback_notify every timeout_notify seconds; the heartbeat may run more often.
+            self.config.timeout_notify = min(self.config.timeout_notify, settings.WORKER_RSS_CHECK_INTERVAL)
+
+    async def callback_notify(self):
+        self.notify()
+        if not self.max_rss or self.recycling:
+            return
+        rss = resident_memory()
+        if rss is None:
+            return
+        if not self.startup_checked:
+            self.startup_checked = True
+            if rss > self.max_rss:
+                # Recycling could never help: every replacement would restart at once.
+                logger.error(
+                    f"WORKER_MAX_RSS_MB ({settings.WORKER_MAX_RSS_MB} MB) is below a fresh worker's RSS "
+                    f"({rss / 2**20:.0f} MB); RSS recycling is disabled."
+                )
+                self.max_rss = 0
+                return
+        if rss > self.max_rss:
+            self.recycling = True
+            logger.warning(
+                f"Worker {self.pid} RSS is {rss / 2**20:.0f} MB (limit {settings.WORKER_MAX_RSS_MB} MB); recycling."
+            )
+            # uvicorn's SIGTERM handler starts the graceful shutdown.
+            os.kill(self.pid, signal.SIGTERM)
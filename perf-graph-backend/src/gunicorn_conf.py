@@ -0,0 +1,86 @@
+"""
+Production launcher: `gunicorn -c gunicorn_conf.py main:app` (from src/).
+
+Runs WEB_CONCURRENCY uvicorn workers (`core.worker.UvicornWorker`). With PRELOAD_APP the master imports
+the app once (graphs compiled, token encodings loaded), freezes those objects out of the garbage
+collector and forks workers that share the pages copy-on-write. Anything holding sockets, threads or
+SQLite handles is re-created in each worker after fork. Workers are recycled by request count (with
+jitter) and RSS, and drain in-flight requests and SSE streams before exiting.
+
+Several workers need a checkpointer they share (CHECKPOINTER_TYPE "sqlite" or "mongo"): a continued thread
+goes to whichever worker accepts it. The launcher refuses to start several workers with "memory".
+
+Prometheus metrics are aggregated across workers through PROMETHEUS_MULTIPROC_DIR, which defaults to
+a directory under the system temp dir and is emptied when the master starts.
+"""
+import gc
+import glob
+import os
+import tempfile
+
+# Must be set before prometheus_client is imported, in the master and thereby in every worker.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "perf-graph-prometheus"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from core import settings  # noqa: E402
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WEB_CONCURRENCY or os.cpu_count() or 1
+worker_class = "core.worker.UvicornWorker"
+preload_app = settings.PRELOAD_APP
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT
+timeout = settings.WORKER_TIMEOUT
+keepalive = settings.WORKER_KEEPALIVE
+
+
+def on_starting(server):
+    """Start from empty metric files: samples of a previous run's workers would otherwise be summed in."""
+    if server.cfg.workers > 1 and settings.CHECKPOINTER_TYPE == "memory":
+        # gunicorn reports a RuntimeError from here and exits with status 1.
+        raise RuntimeError(
+            f"CHECKPOINTER_TYPE=memory keeps threads per worker, so a continued thread would only find its "
+            f"history on the worker that started it. Use CHECKPOINTER_TYPE=sqlite or mongo with "
+            f"{server.cfg.workers} workers, or run a single worker."
+        )
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from agents import build_agents
+    from agents.compaction import preload_token_counters
+
+    # Imports stay lazy in the app; compile and load what the workers would otherwise each build on their own.
+    build_agents()
+    preload_token_counters(settings.AVAILABLE_MODELS)
+    # Objects created so far live for the whole process. Moving them out of the collector's generations
+    # keeps collections in the workers from writing to (and so un-sharing) their pages.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    from agents import reset_checkpointers
+    from core import get_model
+    from core.persistence.db_factory import reset_db_clients
+    from core.persistence.vector_db import reset_after_fork
+    from core.recommendation_client import reset_recommendation_client
+
+    # The master has loaded the app; drop every client it may hold so the worker opens its own.
+    get_model.cache_clear()
+    reset_recommendation_client()
+    reset_db_clients()
+    reset_after_fork()
+    reset_checkpointers()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
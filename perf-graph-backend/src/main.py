@@ -9,6 +9,7 @@ setup_logging()
 
 app = create_app()
 
+# Single-process development server; production runs `gunicorn -c gunicorn_conf.py main:app`.
 if __name__ == "__main__":
     uvicorn.run(app=app,
                 host=settings.HOST,
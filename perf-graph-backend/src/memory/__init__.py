@@ -1,14 +1,36 @@
 from langgraph.checkpoint.base import BaseCheckpointSaver
-from langgraph.checkpoint.memory import MemorySaver
+
+from core import settings
+from memory.serde import CompressedSerializer
 
 
 def initialize_database() -> BaseCheckpointSaver:
     """
     Initialize the appropriate database checkpointer based on configuration.
-    Returns an initialized AsyncCheckpointer instance.
-    Currently, only InMemorySaver is supported.
+    Every checkpointer bounds its storage (per-thread history, idle TTL, thread count)
+    and stores compressed checkpoints.
+    Supported CHECKPOINTER_TYPE values: 'memory', 'sqlite', 'mongo'.
     """
-    return MemorySaver()
+    options = dict(
+        ttl=settings.CHECKPOINT_TTL,
+        max_threads=settings.CHECKPOINT_MAX_THREADS,
+        keep_per_thread=settings.CHECKPOINT_KEEP_PER_THREAD,
+        prune_interval=settings.CHECKPOINT_PRUNE_INTERVAL,
+        serde=CompressedSerializer(threshold=settings.CHECKPOINT_COMPRESSION_THRESHOLD),
+    )
+
+    checkpointer_type = settings.CHECKPOINTER_TYPE
+    if checkpointer_type == "memory":
+        from memory.memory_saver import BoundedMemorySaver
+        return BoundedMemorySaver(**options)
+    if checkpointer_type == "sqlite":
+        from memory.sqlite_saver import SQLiteCheckpointSaver
+        return SQLiteCheckpointSaver(settings.CHECKPOINT_SQLITE_PATH, **options)
+    if checkpointer_type == "mongo":
+        from core.persistence.schema_db import MongoDBClient
+        from memory.mongo_saver import MongoCheckpointSaver
+        return MongoCheckpointSaver(MongoDBClient().get_database(), **options)
+    raise ValueError(f"Invalid CHECKPOINTER_TYPE: {checkpointer_type}. Supported: 'memory', 'sqlite', 'mongo'.")
 
 
 __all__ = ["initialize_database"]
@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from abc import abstractmethod
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, NamedTuple, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.types import TASKS
+
+logger = logging.getLogger(__name__)
+
+
+class StoredCheckpoint(NamedTuple):
+    thread_id: str
+    checkpoint_ns: str
+    checkpoint_id: str
+    parent_checkpoint_id: Optional[str]
+    checkpoint: tuple[str, bytes]
+    metadata: tuple[str, bytes]
+
+
+class StoredWrite(NamedTuple):
+    task_id: str
+    idx: int
+    channel: str
+    value: tuple[str, bytes]
+    task_path: str
+
+
+class EvictingCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Checkpoint saver that bounds its own storage.
+
+    Subclasses only implement the storage primitives below; checkpoint (de)serialization and the
+    LangGraph saver contract live here. Storage is bounded three ways:
+    - each thread keeps only its `keep_per_thread` most recent checkpoints (enforced on write),
+    - threads not updated for `ttl` seconds are dropped,
+    - only the `max_threads` most recently updated threads are kept.
+    The last two run every `prune_interval` seconds on a background thread, triggered by writes.
+    """
+
+    # Whether storage calls block on I/O and must be moved off the event loop.
+    blocking_io = True
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 0,
+        max_threads: int = 0,
+        keep_per_thread: int = 2,
+        prune_interval: float = 60.0,
+        serde: Optional[SerializerProtocol] = None,
+    ):
+        super().__init__(serde=serde)
+        self.ttl = ttl
+        self.max_threads = max_threads
+        # The parent checkpoint holds the pending sends of the latest one, so never keep fewer than two.
+        self.keep_per_thread = max(2, keep_per_thread)
+        self.prune_interval = prune_interval
+        self._last_prune = time.monotonic()
+        self._prune_lock = threading.Lock()
+
+    # --- storage primitives ---
+
+    @abstractmethod
+    def _put_checkpoint(self, stored: StoredCheckpoint, updated_at: float):
+        """Store a checkpoint, mark its thread as updated and drop checkpoints beyond `keep_per_thread`."""
+
+    @abstractmethod
+    def _get_checkpoint(self, thread_id: str, checkpoint_ns: str,
+                        checkpoint_id: Optional[str]) -> Optional[StoredCheckpoint]:
+        """Return the given checkpoint, or the latest one of the thread/namespace if `checkpoint_id` is None."""
+
+    @abstractmethod
+    def _list_checkpoints(self, thread_id: Optional[str], checkpoint_ns: Optional[str],
+                          before_id: Optional[str]) -> Iterator[StoredCheckpoint]:
+        """Yield checkpoints newest first; None arguments do not filter."""
+
+    @abstractmethod
+    def _put_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, writes: list[StoredWrite]):
+        """Store writes. Regular writes (idx >= 0) are never overwritten; special ones (idx < 0) are."""
+
+    @abstractmethod
+    def _get_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[StoredWrite]:
+        pass
+
+    @abstractmethod
+    def _delete_thread(self, thread_id: str):
+        pass
+
+    @abstractmethod
+    def _nth_latest_update(self, n: int) -> Optional[float]:
+        """`updated_at` of the n-th most recently updated thread, or None if there are fewer threads."""
+
+    @abstractmethod
+    def _delete_threads_updated_before(self, cutoff: float) -> int:
+        """Drop every thread last updated before `cutoff` and return how many were dropped."""
+
+    # --- eviction ---
+
+    def evict(self) -> int:
+        """Apply the TTL and thread-count bounds now. Returns the number of threads dropped."""
+        cutoffs = []
+        if self.ttl:
+            cutoffs.append(time.time() - self.ttl)
+        if self.max_threads:
+            overflow = self._nth_latest_update(self.max_threads)
+            if overflow is not None:
+                cutoffs.append(overflow)
+        if not cutoffs:
+            return 0
+
+        start = time.perf_counter()
+        dropped = self._delete_threads_updated_before(max(cutoffs))
+        if dropped:
+            logger.info(f"Evicted {dropped} checkpoint threads in {time.perf_counter() - start:.3f}s.")
+        return dropped
+
+    def _maybe_evict(self):
+        if time.monotonic() - self._last_prune < self.prune_interval:
+            return
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        self._last_prune = time.monotonic()
+        threading.Thread(target=self._run_eviction, name="checkpoint-eviction", daemon=True).start()
+
+    def _run_eviction(self):
+        try:
+            self.evict()
+        except Exception as e:
+            logger.warning(f"Checkpoint eviction failed: {e}")
+        finally:
+            self._prune_lock.release()
+
+    # --- BaseCheckpointSaver ---
+
+    def _to_tuple(self, stored: StoredCheckpoint) -> CheckpointTuple:
+        thread_id, checkpoint_ns = stored.thread_id, stored.checkpoint_ns
+        writes = self._get_writes(thread_id, checkpoint_ns, stored.checkpoint_id)
+        sends: list[StoredWrite] = []
+        parent_config = None
+        if stored.parent_checkpoint_id:
+            parent_config = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": stored.parent_checkpoint_id,
+                }
+            }
+            sends = sorted(
+                (w for w in self._get_writes(thread_id, checkpoint_ns, stored.parent_checkpoint_id)
+                 if w.channel == TASKS),
+                key=lambda w: (w.task_path, w.task_id, w.idx),
+            )
+
+        checkpoint: Checkpoint = self.serde.loads_typed(stored.checkpoint)
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": stored.checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "pending_sends": [self.serde.loads_typed(w.value) for w in sends]},
+            metadata=self.serde.loads_typed(stored.metadata),
+            parent_config=parent_config,
+            pending_writes=[(w.task_id, w.channel, self.serde.loads_typed(w.value)) for w in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stored = self._get_checkpoint(thread_id, checkpoint_ns, get_checkpoint_id(config))
+        return self._to_tuple(stored) if stored else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        configurable = config["configurable"] if config else {}
+        checkpoint_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+
+        for stored in self._list_checkpoints(
+            configurable.get("thread_id"), configurable.get("checkpoint_ns"), before_id
+        ):
+            if limit is not None and limit <= 0:
+                break
+            if checkpoint_id and stored.checkpoint_id != checkpoint_id:
+                continue
+            if filter:
+                metadata = self.serde.loads_typed(stored.metadata)
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._to_tuple(stored)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        # Pending sends are rebuilt from the parent's writes on read, as InMemorySaver does.
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        self._put_checkpoint(
+            StoredCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=config["configurable"].get("checkpoint_id"),
+                checkpoint=self.serde.dumps_typed(c),
+                metadata=self.serde.dumps_typed(metadata),
+            ),
+            updated_at=time.time(),
+        )
+        self._maybe_evict()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self._put_writes(
+            config["configurable"]["thread_id"],
+            config["configurable"].get("checkpoint_ns", ""),
+            config["configurable"]["checkpoint_id"],
+            [
+                StoredWrite(task_id, WRITES_IDX_MAP.get(channel, idx), channel, self.serde.dumps_typed(value), task_path)
+                for idx, (channel, value) in enumerate(writes)
+            ],
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: Any) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- async API ---
+
+    async def _offload(self, func, *args, **kwargs):
+        if self.blocking_io:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._offload(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await self._offload(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._offload(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._offload(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._offload(self.delete_thread, thread_id)
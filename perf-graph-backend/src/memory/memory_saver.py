@@ -0,0 +1,94 @@
+import threading
+from collections.abc import Iterator
+from typing import Optional
+
+from memory.base import EvictingCheckpointSaver, StoredCheckpoint, StoredWrite
+
+
+class BoundedMemorySaver(EvictingCheckpointSaver):
+    """In-process checkpointer with the same TTL / thread-count / history bounds as the persistent ones."""
+
+    blocking_io = False
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.RLock()
+        # thread_id -> last update time
+        self._threads: dict[str, float] = {}
+        # thread_id -> checkpoint_ns -> checkpoint_id -> checkpoint
+        self._checkpoints: dict[str, dict[str, dict[str, StoredCheckpoint]]] = {}
+        # (thread_id, checkpoint_ns, checkpoint_id) -> (task_id, idx) -> write
+        self._writes: dict[tuple[str, str, str], dict[tuple[str, int], StoredWrite]] = {}
+
+    def _put_checkpoint(self, stored: StoredCheckpoint, updated_at: float):
+        with self._lock:
+            self._threads[stored.thread_id] = updated_at
+            by_id = self._checkpoints.setdefault(stored.thread_id, {}).setdefault(stored.checkpoint_ns, {})
+            by_id[stored.checkpoint_id] = stored
+            if len(by_id) > self.keep_per_thread:
+                for checkpoint_id in sorted(by_id)[:-self.keep_per_thread]:
+                    del by_id[checkpoint_id]
+                    self._writes.pop((stored.thread_id, stored.checkpoint_ns, checkpoint_id), None)
+
+    def _get_checkpoint(self, thread_id: str, checkpoint_ns: str,
+                        checkpoint_id: Optional[str]) -> Optional[StoredCheckpoint]:
+        with self._lock:
+            by_id = self._checkpoints.get(thread_id, {}).get(checkpoint_ns)
+            if not by_id:
+                return None
+            if checkpoint_id is None:
+                checkpoint_id = max(by_id)
+            return by_id.get(checkpoint_id)
+
+    def _list_checkpoints(self, thread_id: Optional[str], checkpoint_ns: Optional[str],
+                          before_id: Optional[str]) -> Iterator[StoredCheckpoint]:
+        with self._lock:
+            threads = [thread_id] if thread_id is not None else list(self._checkpoints)
+            found = [
+                stored
+                for t in threads
+                for ns, by_id in self._checkpoints.get(t, {}).items()
+                if checkpoint_ns is None or ns == checkpoint_ns
+                for stored in by_id.values()
+                if before_id is None or stored.checkpoint_id < before_id
+            ]
+        found.sort(key=lambda stored: stored.checkpoint_id, reverse=True)
+        return iter(found)
+
+    def _put_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, writes: list[StoredWrite]):
+        with self._lock:
+            stored = self._writes.setdefault((thread_id, checkpoint_ns, checkpoint_id), {})
+            for write in writes:
+                key = (write.task_id, write.idx)
+                if write.idx >= 0 and key in stored:
+                    continue
+                stored[key] = write
+
+    def _get_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[StoredWrite]:
+        with self._lock:
+            return list(self._writes.get((thread_id, checkpoint_ns, checkpoint_id), {}).values())
+
+    def _delete_thread(self, thread_id: str):
+        with self._lock:
+            self._threads.pop(thread_id, None)
+            self._checkpoints.pop(thread_id, None)
+            for key in [key for key in self._writes if key[0] == thread_id]:
+                del self._writes[key]
+
+    def _nth_latest_update(self, n: int) -> Optional[float]:
+        with self._lock:
+            if len(self._threads) < n:
+                return None
+            return sorted(self._threads.values(), reverse=True)[n - 1]
+
+    def _delete_threads_updated_before(self, cutoff: float) -> int:
+        with self._lock:
+            victims = {thread_id for thread_id, updated_at in self._threads.items() if updated_at < cutoff}
+            if not victims:
+                return 0
+            for thread_id in victims:
+                self._threads.pop(thread_id, None)
+                self._checkpoints.pop(thread_id, None)
+            for key in [key for key in self._writes if key[0] in victims]:
+                del self._writes[key]
+            return len(victims)
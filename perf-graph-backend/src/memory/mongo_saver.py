@@ -0,0 +1,150 @@
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.database import Database
+
+from memory.base import EvictingCheckpointSaver, StoredCheckpoint, StoredWrite
+
+
+def _as_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _to_stored(doc: dict) -> StoredCheckpoint:
+    return StoredCheckpoint(
+        thread_id=doc["thread_id"],
+        checkpoint_ns=doc["checkpoint_ns"],
+        checkpoint_id=doc["checkpoint_id"],
+        parent_checkpoint_id=doc.get("parent_checkpoint_id"),
+        checkpoint=(doc["type"], doc["checkpoint"]),
+        metadata=(doc["metadata_type"], doc["metadata"]),
+    )
+
+
+class MongoCheckpointSaver(EvictingCheckpointSaver):
+    """
+    MongoDB-backed checkpointer. Every document carries an `updated_at` date; when a TTL is
+    configured, MongoDB's own TTL indexes expire idle threads, and the thread-count bound is
+    enforced by the periodic eviction pass.
+    """
+
+    def __init__(self, db: Database, collection_prefix: str = "checkpoint", **kwargs):
+        super().__init__(**kwargs)
+        self.checkpoints = db[f"{collection_prefix}s"]
+        self.writes = db[f"{collection_prefix}_writes"]
+        self.threads = db[f"{collection_prefix}_threads"]
+        self._indexes_ready = False
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        self.checkpoints.create_index(
+            [("thread_id", ASCENDING), ("checkpoint_ns", ASCENDING), ("checkpoint_id", DESCENDING)], unique=True
+        )
+        self.writes.create_index(
+            [("thread_id", ASCENDING), ("checkpoint_ns", ASCENDING), ("checkpoint_id", ASCENDING),
+             ("task_id", ASCENDING), ("idx", ASCENDING)],
+            unique=True,
+        )
+        if self.ttl:
+            for collection in (self.checkpoints, self.writes, self.threads):
+                collection.create_index("updated_at", expireAfterSeconds=int(self.ttl))
+        else:
+            self.threads.create_index("updated_at")
+        self._indexes_ready = True
+
+    def _put_checkpoint(self, stored: StoredCheckpoint, updated_at: float):
+        self._ensure_indexes()
+        now = _as_datetime(updated_at)
+        key = {"thread_id": stored.thread_id, "checkpoint_ns": stored.checkpoint_ns}
+        self.checkpoints.update_one(
+            {**key, "checkpoint_id": stored.checkpoint_id},
+            {"$set": {
+                "parent_checkpoint_id": stored.parent_checkpoint_id,
+                "type": stored.checkpoint[0],
+                "checkpoint": stored.checkpoint[1],
+                "metadata_type": stored.metadata[0],
+                "metadata": stored.metadata[1],
+                "updated_at": now,
+            }},
+            upsert=True,
+        )
+        self.threads.update_one({"_id": stored.thread_id}, {"$set": {"updated_at": now}}, upsert=True)
+
+        stale = [
+            doc["checkpoint_id"]
+            for doc in self.checkpoints.find(key, {"checkpoint_id": 1, "_id": 0})
+            .sort("checkpoint_id", DESCENDING)
+            .skip(self.keep_per_thread)
+        ]
+        if stale:
+            self.checkpoints.delete_many({**key, "checkpoint_id": {"$in": stale}})
+            self.writes.delete_many({**key, "checkpoint_id": {"$in": stale}})
+
+    def _get_checkpoint(self, thread_id: str, checkpoint_ns: str,
+                        checkpoint_id: Optional[str]) -> Optional[StoredCheckpoint]:
+        query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        if checkpoint_id:
+            query["checkpoint_id"] = checkpoint_id
+        doc = self.checkpoints.find_one(query, sort=[("checkpoint_id", DESCENDING)])
+        return _to_stored(doc) if doc else None
+
+    def _list_checkpoints(self, thread_id: Optional[str], checkpoint_ns: Optional[str],
+                          before_id: Optional[str]) -> Iterator[StoredCheckpoint]:
+        query = {}
+        if thread_id is not None:
+            query["thread_id"] = thread_id
+        if checkpoint_ns is not None:
+            query["checkpoint_ns"] = checkpoint_ns
+        if before_id is not None:
+            query["checkpoint_id"] = {"$lt": before_id}
+        return map(_to_stored, self.checkpoints.find(query).sort("checkpoint_id", DESCENDING))
+
+    def _put_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, writes: list[StoredWrite]):
+        if not writes:
+            return
+        self._ensure_indexes()
+        now = datetime.now(timezone.utc)
+        key = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}
+        operations = []
+        for w in writes:
+            fields = {"channel": w.channel, "type": w.value[0], "value": w.value[1], "task_path": w.task_path,
+                      "updated_at": now}
+            # Regular writes are never overwritten; special writes (errors, interrupts, ...) are.
+            update = {"$set": fields} if w.idx < 0 else {"$setOnInsert": fields}
+            operations.append(UpdateOne({**key, "task_id": w.task_id, "idx": w.idx}, update, upsert=True))
+        self.writes.bulk_write(operations, ordered=False)
+
+    def _get_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[StoredWrite]:
+        docs = self.writes.find(
+            {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}
+        ).sort([("task_id", ASCENDING), ("idx", ASCENDING)])
+        return [
+            StoredWrite(doc["task_id"], doc["idx"], doc["channel"], (doc["type"], doc["value"]), doc["task_path"])
+            for doc in docs
+        ]
+
+    def _delete_thread(self, thread_id: str):
+        self.checkpoints.delete_many({"thread_id": thread_id})
+        self.writes.delete_many({"thread_id": thread_id})
+        self.threads.delete_one({"_id": thread_id})
+
+    def _nth_latest_update(self, n: int) -> Optional[float]:
+        doc = next(self.threads.find({}, {"updated_at": 1}).sort("updated_at", DESCENDING).skip(n - 1).limit(1), None)
+        if doc is None:
+            return None
+        updated_at = doc["updated_at"]
+        # PyMongo returns naive UTC datetimes unless the client is tz-aware.
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return updated_at.timestamp()
+
+    def _delete_threads_updated_before(self, cutoff: float) -> int:
+        stale = [doc["_id"] for doc in self.threads.find({"updated_at": {"$lt": _as_datetime(cutoff)}}, {"_id": 1})]
+        if stale:
+            self.checkpoints.delete_many({"thread_id": {"$in": stale}})
+            self.writes.delete_many({"thread_id": {"$in": stale}})
+            self.threads.delete_many({"_id": {"$in": stale}})
+        return len(stale)
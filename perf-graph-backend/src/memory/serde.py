@@ -0,0 +1,38 @@
+import zlib
+from typing import Any
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+_COMPRESSED_SUFFIX = "+zlib"
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Compact checkpoint serialization: LangGraph's msgpack-based serializer, with payloads above
+    `threshold` bytes zlib-compressed. The type tag records whether a payload was compressed, so
+    compressed and uncompressed values can be read back interchangeably.
+    """
+
+    def __init__(self, threshold: int = 1024, level: int = 6, serde: SerializerProtocol | None = None):
+        self.threshold = threshold
+        self.level = level
+        self.serde = serde or JsonPlusSerializer()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if self.threshold and len(data) >= self.threshold:
+            return type_ + _COMPRESSED_SUFFIX, zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(_COMPRESSED_SUFFIX):
+            return self.serde.loads_typed((type_[:-len(_COMPRESSED_SUFFIX)], zlib.decompress(payload)))
+        return self.serde.loads_typed((type_, payload))
@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+from typing import Optional
+
+from memory.base import EvictingCheckpointSaver, StoredCheckpoint, StoredWrite
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS threads ("
+    "thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_threads_updated_at ON threads(updated_at)",
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+    "parent_checkpoint_id TEXT, type TEXT NOT NULL, checkpoint BLOB NOT NULL, "
+    "metadata_type TEXT NOT NULL, metadata BLOB NOT NULL, "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    "CREATE TABLE IF NOT EXISTS writes ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+    "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, "
+    "type TEXT NOT NULL, value BLOB NOT NULL, task_path TEXT NOT NULL, "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+)
+
+_CHECKPOINT_COLUMNS = (
+    "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+)
+
+
+def _to_stored(row: tuple) -> StoredCheckpoint:
+    thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+    return StoredCheckpoint(thread_id, checkpoint_ns, checkpoint_id, parent_id, (type_, checkpoint),
+                            (metadata_type, metadata))
+
+
+class SQLiteCheckpointSaver(EvictingCheckpointSaver):
+    """
+    File-backed checkpointer. WAL mode lets several worker processes share one file;
+    within a process, a single connection is shared behind a lock.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def _transaction(self, statements: list[tuple[str, tuple]]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _put_checkpoint(self, stored: StoredCheckpoint, updated_at: float):
+        key = (stored.thread_id, stored.checkpoint_ns)
+        self._transaction([
+            (
+                f"INSERT OR REPLACE INTO checkpoints ({_CHECKPOINT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, stored.checkpoint_id, stored.parent_checkpoint_id, *stored.checkpoint, *stored.metadata),
+            ),
+            (
+                "INSERT INTO threads (thread_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (stored.thread_id, updated_at),
+            ),
+            (
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT ?)",
+                (*key, *key, self.keep_per_thread),
+            ),
+            (
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                (*key, *key),
+            ),
+        ])
+
+    def _get_checkpoint(self, thread_id: str, checkpoint_ns: str,
+                        checkpoint_id: Optional[str]) -> Optional[StoredCheckpoint]:
+        if checkpoint_id:
+            sql = (f"SELECT {_CHECKPOINT_COLUMNS} FROM checkpoints "
+                   "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?")
+            params = (thread_id, checkpoint_ns, checkpoint_id)
+        else:
+            sql = (f"SELECT {_CHECKPOINT_COLUMNS} FROM checkpoints "
+                   "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1")
+            params = (thread_id, checkpoint_ns)
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return _to_stored(row) if row else None
+
+    def _list_checkpoints(self, thread_id: Optional[str], checkpoint_ns: Optional[str],
+                          before_id: Optional[str]) -> Iterator[StoredCheckpoint]:
+        clauses, params = [], []
+        for clause, value in (("thread_id = ?", thread_id), ("checkpoint_ns = ?", checkpoint_ns),
+                              ("checkpoint_id < ?", before_id)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_CHECKPOINT_COLUMNS} FROM checkpoints {where}ORDER BY checkpoint_id DESC", params
+            ).fetchall()
+        return map(_to_stored, rows)
+
+    def _put_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, writes: list[StoredWrite]):
+        key = (thread_id, checkpoint_ns, checkpoint_id)
+        self._transaction([
+            (
+                f"INSERT OR {'REPLACE' if w.idx < 0 else 'IGNORE'} INTO writes "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, w.task_id, w.idx, w.channel, *w.value, w.task_path),
+            )
+            for w in writes
+        ])
+
+    def _get_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[StoredWrite]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, idx, channel, type, value, task_path FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        return [StoredWrite(task_id, idx, channel, (type_, value), task_path)
+                for task_id, idx, channel, type_, value, task_path in rows]
+
+    def _delete_thread(self, thread_id: str):
+        self._transaction([
+            (f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            for table in ("checkpoints", "writes", "threads")
+        ])
+
+    def _nth_latest_update(self, n: int) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM threads ORDER BY updated_at DESC LIMIT 1 OFFSET ?", (n - 1,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _delete_threads_updated_before(self, cutoff: float) -> int:
+        stale = "SELECT thread_id FROM threads WHERE updated_at < ?"
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM ({stale})", (cutoff,)).fetchone()
+        if count:
+            self._transaction([
+                (f"DELETE FROM checkpoints WHERE thread_id IN ({stale})", (cutoff,)),
+                (f"DELETE FROM writes WHERE thread_id IN ({stale})", (cutoff,)),
+                ("DELETE FROM threads WHERE updated_at < ?", (cutoff,)),
+            ])
+        return count
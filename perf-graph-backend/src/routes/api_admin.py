@@ -0,0 +1,73 @@
+import logging
+
+from fastapi import APIRouter, HTTPException
+
+from core.admission import get_admission_controller
+from core.cache import get_all_caches, get_cache
+from core.catalog import get_catalog_replica
+from core.similar_users import get_similar_users
+
+router = APIRouter(prefix="/admin")
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/caches", summary="Get statistics for all in-process caches", tags=["Admin"])
+async def get_cache_stats():
+    return [cache.stats() for cache in get_all_caches()]
+
+
+@router.delete("/caches/{name}", summary="Flush an in-process cache, e.g. after a catalog change", tags=["Admin"])
+async def flush_cache(name: str):
+    cache = get_cache(name)
+    if cache is None:
+        raise HTTPException(status_code=404, detail=f"Cache '{name}' not found.")
+    flushed = cache.clear()
+    return {"message": f"Cache '{name}' flushed.", "flushed": flushed}
+
+
+def _catalog_replica():
+    catalog_replica = get_catalog_replica()
+    if catalog_replica is None:
+        raise HTTPException(status_code=404, detail="The fragrance catalog replica is disabled.")
+    return catalog_replica
+
+
+@router.get("/catalog", summary="Get the state of the local fragrance catalog replica", tags=["Admin"])
+async def get_catalog_stats():
+    return _catalog_replica().stats()
+
+
+@router.post("/catalog/refresh", summary="Re-fetch the fragrance catalog from the backend now", tags=["Admin"])
+async def refresh_catalog():
+    catalog_replica = _catalog_replica()
+    if not await catalog_replica.refresh():
+        raise HTTPException(status_code=502, detail="Could not fetch the fragrance catalog from the backend.")
+    return catalog_replica.stats()
+
+
+def _similar_users():
+    similar_users = get_similar_users()
+    if similar_users is None:
+        raise HTTPException(status_code=404, detail="The similar users graph is disabled.")
+    return similar_users
+
+
+@router.get("/similar-users", summary="Get the state of the similar-users graph", tags=["Admin"])
+async def get_similar_users_stats():
+    return _similar_users().stats()
+
+
+@router.post("/similar-users/rebuild", summary="Rebuild the similar-users graph in the background", tags=["Admin"])
+async def rebuild_similar_users():
+    similar_users = _similar_users()
+    similar_users.request_rebuild()
+    return similar_users.stats()
+
+
+@router.get("/admission", summary="Get the state of the agent admission controller", tags=["Admin"])
+async def get_admission_stats():
+    controller = get_admission_controller()
+    if controller is None:
+        raise HTTPException(status_code=404, detail="Admission control is disabled.")
+    return controller.stats()
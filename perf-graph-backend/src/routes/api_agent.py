@@ -1,17 +1,35 @@
 import json
 import logging
+import re
+import time
 from collections.abc import AsyncGenerator
-from typing import Any, List
+from typing import Any, List, Literal
 from uuid import UUID, uuid4
 from fastapi import Depends
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from langchain_core.messages import AnyMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command
 
 from agents import DEFAULT_AGENT, get_agent
+from agents.tools.unknown_information import EXPERT_LLM_TAG
+from core import settings
+from core.admission import AdmissionRejected, AdmissionTicket, get_admission_controller, retry_after_header
+from core.metrics import (
+    AGENT_REQUEST_SECONDS,
+    AGENT_REQUESTS_IN_FLIGHT,
+    SSE_ERROR_EVENTS,
+    SSE_MESSAGE_EVENTS,
+    SSE_TIME_TO_FIRST_TOKEN,
+    SSE_TOKEN_EVENTS,
+    STREAM_ENGINE_EVENTS,
+)
+from core.persistence.db_factory import get_vector_db_client
+from core.semantic_cache import CachedResponse, SemanticHit, get_semantic_cache, profile_fingerprint
+from core.sse import DONE_FRAME, TokenCoalescer, error_frame, message_frame, token_frame
 from schema import (
     ChatHistory,
     ChatHistoryInput,
@@ -24,11 +42,15 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Tags of LLM calls that work for the graph (guards, summaries, tool internals) and whose tokens are not
+# the answer. The expert tool forwards its own tokens as "expert_token" custom messages instead.
+_UNSTREAMED_MODEL_TAGS = {"llama_guard", "compaction", EXPERT_LLM_TAG}
+
 
 def _parse_input(user_input: UserInput) -> tuple[dict[str, Any], UUID]:
     run_id = uuid4()
-    thread_id = str(
-        uuid4())  # until tools are reintegrated for multi conversation, we consider all conversation as unique
+    # A new conversation gets a fresh thread; sending its thread_id back continues it.
+    thread_id = user_input.thread_id or str(uuid4())
 
     configurable = {"thread_id": thread_id, "model": user_input.model}
 
@@ -41,7 +63,8 @@ def _parse_input(user_input: UserInput) -> tuple[dict[str, Any], UUID]:
         configurable.update(user_input.agent_config)
 
     kwargs = {
-        "input": {"messages": [HumanMessage(content=user_input.message)]},
+        # Assets are per turn: reset what the previous turn of the thread collected.
+        "input": {"messages": [HumanMessage(content=user_input.message)], "assets": []},
         "config": RunnableConfig(
             configurable=configurable,
             run_id=run_id,
@@ -50,6 +73,110 @@ def _parse_input(user_input: UserInput) -> tuple[dict[str, Any], UUID]:
     return kwargs, run_id
 
 
+async def _admit(user_input: UserInput, request: Request) -> AdmissionTicket | None:
+    """
+    Wait for a run slot from the admission controller, or answer 429 with Retry-After.
+    Callers are told apart by their user_id, falling back to the client address.
+    """
+    controller = get_admission_controller()
+    if controller is None:
+        return None
+    user_id = (user_input.agent_config or {}).get("user_id")
+    caller = f"user:{user_id}" if user_id else f"ip:{request.client.host if request.client else ''}"
+    try:
+        return await controller.acquire(str(user_input.model or settings.DEFAULT_MODEL), caller)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers=retry_after_header(e))
+
+
+def _release(ticket: AdmissionTicket | None):
+    if ticket is not None:
+        ticket.release()
+
+
+async def _release_after(generator: AsyncGenerator[bytes, None], ticket: AdmissionTicket | None):
+    try:
+        async for chunk in generator:
+            yield chunk
+    finally:
+        _release(ticket)
+
+
+# Splits a cached answer back into word-sized tokens (each keeping its trailing whitespace) for SSE replay.
+_REPLAY_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+async def _semantic_cache_probe(
+        user_input: UserInput, agent_id: str
+) -> tuple[tuple, Any, SemanticHit | None] | None:
+    """
+    Look the question up in the semantic response cache.
+
+    Returns `(scope, vector, hit)`, where `hit` is None on a miss, or None when the cache does not apply:
+    it is disabled, the request continues a thread (the answer depends on history), or the lookup failed.
+    """
+    cache = get_semantic_cache()
+    if cache is None or user_input.thread_id:
+        return None
+    try:
+        agent_config = dict(user_input.agent_config or {})
+        user_id = agent_config.pop("user_id", "")
+        profile = await get_vector_db_client().aget_document(user_id) if user_id else None
+        scope = (
+            agent_id,
+            str(user_input.model or settings.DEFAULT_MODEL),
+            profile_fingerprint(profile),
+            json.dumps(agent_config, sort_keys=True, default=str),
+        )
+        vector = await cache.aembed(user_input.message)
+    except Exception as e:
+        logger.warning(f"Semantic cache bypassed: {e}")
+        return None
+    return scope, vector, cache.lookup(scope, vector)
+
+
+def _semantic_cache_store(probe: tuple[tuple, Any, SemanticHit | None] | None, values: dict[str, Any]):
+    """Remember the final answer of a graph run, unless it ended on anything but plain assistant text."""
+    if probe is None or not values.get("messages"):
+        return
+    message = values["messages"][-1]
+    if not isinstance(message, AIMessage) or message.tool_calls:
+        return
+    content = convert_message_content_to_string(message.content)
+    if content.strip():
+        scope, vector, _ = probe
+        get_semantic_cache().store(scope, vector, CachedResponse(content, values.get("assets") or []))
+
+
+async def _persist_cached_turn(agent: CompiledStateGraph, kwargs: dict[str, Any], hit: SemanticHit) -> bool:
+    """
+    Write the question and the replayed answer to the request's new thread, as if the model had answered,
+    so the client can continue the conversation. False if that failed and the graph should run instead.
+    """
+    answer = AIMessage(content=hit.response.content, response_metadata={"cached": True})
+    try:
+        await agent.aupdate_state(
+            kwargs["config"],
+            {"messages": [*kwargs["input"]["messages"], answer], "assets": hit.response.assets},
+            as_node="model",
+        )
+    except Exception as e:
+        logger.warning(f"Semantic cache hit not used, its thread could not be saved: {e}")
+        return False
+    return True
+
+
+def _cached_chat_message(hit: SemanticHit, run_id: UUID, thread_id: str) -> ChatMessage:
+    return ChatMessage(
+        type="assistant",
+        content=hit.response.content,
+        run_id=str(run_id),
+        thread_id=thread_id,
+        response_metadata={"cached": True, "similarity": hit.similarity},
+        assets=hit.response.assets,
+    )
+
+
 @router.post(
     "/{agent_id}/invoke",
     response_model=ChatMessage,
@@ -64,40 +191,79 @@ def _parse_input(user_input: UserInput) -> tuple[dict[str, Any], UUID]:
     summary="Invoke the agent",
     description="If no agent_id is provided, the default agent will be used."
 )
-async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> ChatMessage:
+async def invoke(user_input: UserInput, request: Request, agent_id: str = DEFAULT_AGENT) -> ChatMessage:
     """
     Invoke an agent with user input to retrieve a final response.
     """
     agent: CompiledStateGraph = get_agent(agent_id)
     kwargs, run_id = _parse_input(user_input)
+    ticket = await _admit(user_input, request)
+    in_flight = AGENT_REQUESTS_IN_FLIGHT.labels("invoke")
+    in_flight.inc()
+    start = time.perf_counter()
+    outcome = "error"
     try:
+        probe = await _semantic_cache_probe(user_input, agent_id)
+        if probe is not None and probe[2] is not None and await _persist_cached_turn(agent, kwargs, probe[2]):
+            outcome = "ok"
+            return _cached_chat_message(probe[2], run_id, kwargs["config"]["configurable"]["thread_id"])
+
         response = await agent.ainvoke(**kwargs)
-        print(response["messages"])
+        logger.debug(f"Agent response messages: {response['messages']}")
         output = langchain_to_chat_message(response["messages"][-1])
         output.assets = response["assets"] if "assets" in response else []
+        output.thread_id = kwargs["config"]["configurable"]["thread_id"]
+        _semantic_cache_store(probe, response)
+        outcome = "ok"
         return output
     except Exception as e:
         logger.error(f"An exception occurred: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Unexpected error: " + str(e))
+    finally:
+        _release(ticket)
+        in_flight.dec()
+        AGENT_REQUEST_SECONDS.labels("invoke", outcome).observe(time.perf_counter() - start)
 
 
-async def stream_message_generator(
-        user_input: StreamInput, agent_id: str = DEFAULT_AGENT
-) -> AsyncGenerator[str, None]:
-    """
-    Generate a stream of messages from the agent.
+# A graph stream normalized for the SSE protocol: ("messages", messages written by a node or sent as
+# custom data) and ("token", content of an answer-token chunk).
+GraphStreamItem = tuple[Literal["messages", "token"], Any]
 
-    This is the workhorse method for the /stream endpoint.
-    """
-    agent: CompiledStateGraph = get_agent(agent_id)
-    kwargs, run_id = _parse_input(user_input)
 
-    # Process streamed events from the graph and yield messages over the SSE stream.
+async def _astream_engine(
+        agent: CompiledStateGraph, kwargs: dict[str, Any], stream_tokens: bool
+) -> AsyncGenerator[GraphStreamItem, None]:
+    """
+    The graph's stream modes carry exactly what the SSE protocol needs: "updates" (node outputs),
+    "custom" (`CustomData.adispatch`) and, only if tokens are wanted, "messages" (LLM chunks).
+    """
+    events = STREAM_ENGINE_EVENTS.labels("astream")
+    stream_mode = ["updates", "custom", "messages"] if stream_tokens else ["updates", "custom"]
+    async for mode, chunk in agent.astream(**kwargs, stream_mode=stream_mode):
+        events.inc()
+        if mode == "messages":
+            message, metadata = chunk
+            # Complete messages are re-sent here once their node ends; "updates" already carries them.
+            if isinstance(message, AIMessageChunk) and _UNSTREAMED_MODEL_TAGS.isdisjoint(metadata.get("tags", [])):
+                yield "token", message.content
+        elif mode == "updates":
+            for update in chunk.values():
+                if isinstance(update, dict) and "messages" in update:
+                    yield "messages", update["messages"]
+        else:
+            yield "messages", [chunk]
+
+
+async def _astream_events_engine(
+        agent: CompiledStateGraph, kwargs: dict[str, Any], stream_tokens: bool
+) -> AsyncGenerator[GraphStreamItem, None]:
+    """The same items picked out of `astream_events`, which reports every runnable in the graph."""
+    events = STREAM_ENGINE_EVENTS.labels("events")
     async for event in agent.astream_events(**kwargs, version="v2"):
         if not event:
             continue
+        events.inc()
 
-        new_messages = []
         # Yield messages written to the graph state after node execution finishes.
         if (
                 event["event"] == "on_chain_end"
@@ -106,42 +272,126 @@ async def stream_message_generator(
                 and any(t.startswith("graph:step:") for t in event.get("tags", []))
         ):
             if isinstance(event["data"]["output"], Command):
-                new_messages = event["data"]["output"].update.get("messages", [])
+                yield "messages", event["data"]["output"].update.get("messages", [])
             elif "messages" in event["data"]["output"]:
-                new_messages = event["data"]["output"]["messages"]
+                yield "messages", event["data"]["output"]["messages"]
 
         # Also yield intermediate messages from agents.utils.CustomData.adispatch().
-        if event["event"] == "on_custom_event" and "custom_data_dispatch" in event.get("tags", []):
-            new_messages = [event["data"]]
-
-        for message in new_messages:
-            try:
-                chat_message = langchain_to_chat_message(message)
-                chat_message.run_id = str(run_id)
-            except Exception as e:
-                logger.error(f"Error parsing message: {e}")
-                yield f"data: {json.dumps({'type': 'error', 'content': 'Unexpected error'})}\n\n"
-                continue
-            # LangGraph re-sends the input message, which feels weird, so drop it
-            if chat_message.type == "human" and chat_message.content == user_input.message:
-                continue
-            yield f"data: {json.dumps({'type': 'message', 'content': chat_message.model_dump()})}\n\n"
+        elif event["event"] == "on_custom_event" and "custom_data_dispatch" in event.get("tags", []):
+            yield "messages", [event["data"]]
 
         # Yield tokens streamed from LLMs.
-        if (
+        elif (
                 event["event"] == "on_chat_model_stream"
-                and user_input.stream_tokens
-                and "llama_guard" not in event.get("tags", [])
+                and stream_tokens
+                and _UNSTREAMED_MODEL_TAGS.isdisjoint(event.get("tags", []))
         ):
-            content = remove_tool_calls(event["data"]["chunk"].content)
-            if content:
-                # Empty content in the context of OpenAI usually means
-                # that the model is asking for a tool to be invoked.
-                # So we only print non-empty content.
-                yield f"data: {json.dumps({'type': 'token', 'content': convert_message_content_to_string(content)})}\n\n"
-            continue
+            yield "token", event["data"]["chunk"].content
+
+
+async def stream_message_generator(
+        user_input: StreamInput, agent_id: str = DEFAULT_AGENT, started_at: float | None = None
+) -> AsyncGenerator[bytes, None]:
+    """
+    Generate a stream of messages from the agent.
+
+    This is the workhorse method for the /stream endpoint.
+    `started_at` (a `time.perf_counter()` value) is when the request arrived, for time-to-first-token.
+    """
+    started_at = started_at or time.perf_counter()
+    agent: CompiledStateGraph = get_agent(agent_id)
+    kwargs, run_id = _parse_input(user_input)
+    thread_id = kwargs["config"]["configurable"]["thread_id"]
+    first_token = True
+    coalescer = TokenCoalescer(user_input.coalesce_tokens_ms / 1000, user_input.coalesce_tokens_bytes)
+    in_flight = AGENT_REQUESTS_IN_FLIGHT.labels("stream")
+    in_flight.inc()
+    outcome = "error"
+    try:
+        probe = await _semantic_cache_probe(user_input, agent_id)
+        if probe is not None and probe[2] is not None and await _persist_cached_turn(agent, kwargs, probe[2]):
+            hit = probe[2]
+            if user_input.stream_tokens:
+                SSE_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started_at)
+                for token in _REPLAY_TOKEN.findall(hit.response.content):
+                    if frame := coalescer.add(token):
+                        SSE_TOKEN_EVENTS.inc()
+                        yield frame
+                if frame := coalescer.flush():
+                    SSE_TOKEN_EVENTS.inc()
+                    yield frame
+            SSE_MESSAGE_EVENTS.inc()
+            yield message_frame(_cached_chat_message(hit, run_id, thread_id))
+            yield DONE_FRAME
+            outcome = "ok"
+            return
+
+        # Process the graph's output and yield messages and tokens over the SSE stream.
+        engine = _astream_events_engine if settings.STREAM_ENGINE == "events" else _astream_engine
+        async for kind, payload in engine(agent, kwargs, user_input.stream_tokens):
+            if kind == "token":
+                if not user_input.stream_tokens:
+                    continue
+                content = remove_tool_calls(payload)
+                if content:
+                    # Empty content in the context of OpenAI usually means
+                    # that the model is asking for a tool to be invoked.
+                    # So we only print non-empty content.
+                    content = convert_message_content_to_string(content)
+                    if first_token:
+                        # The first token always goes out on its own: coalescing never delays TTFT.
+                        first_token = False
+                        SSE_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started_at)
+                        frame = token_frame(content)
+                    else:
+                        frame = coalescer.add(content)
+                    if frame:
+                        SSE_TOKEN_EVENTS.inc()
+                        yield frame
+                continue
 
-    yield "data: [DONE]\n\n"
+            if payload and (frame := coalescer.flush()):
+                # Buffered tokens precede the messages that follow them.
+                SSE_TOKEN_EVENTS.inc()
+                yield frame
+            for message in payload:
+                if isinstance(message, RemoveMessage):
+                    continue
+                try:
+                    chat_message = langchain_to_chat_message(message)
+                    chat_message.run_id = str(run_id)
+                    chat_message.thread_id = thread_id
+                except Exception as e:
+                    logger.error(f"Error parsing message: {e}")
+                    SSE_ERROR_EVENTS.inc()
+                    yield error_frame("Unexpected error")
+                    continue
+                # LangGraph re-sends the input message, which feels weird, so drop it
+                if chat_message.type == "human" and chat_message.content == user_input.message:
+                    continue
+                if chat_message.type == "custom" and chat_message.custom_data.get("type") == "expert_token":
+                    # Tokens of a tool's inner LLM: the first thing the user reads on that path.
+                    if not user_input.stream_tokens:
+                        continue
+                    if first_token:
+                        first_token = False
+                        SSE_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started_at)
+                    SSE_TOKEN_EVENTS.inc()
+                    yield message_frame(chat_message)
+                    continue
+                SSE_MESSAGE_EVENTS.inc()
+                yield message_frame(chat_message)
+
+        if probe is not None:
+            _semantic_cache_store(probe, (await agent.aget_state(kwargs["config"])).values)
+        if frame := coalescer.flush():
+            SSE_TOKEN_EVENTS.inc()
+            yield frame
+        yield DONE_FRAME
+        outcome = "ok"
+    finally:
+        in_flight.dec()
+        AGENT_REQUEST_SECONDS.labels("stream", outcome).observe(time.perf_counter() - started_at)
 
 
 def _sse_response_example() -> dict[int, Any]:
@@ -173,7 +423,7 @@ def _sse_response_example() -> dict[int, Any]:
              summary="Invoke the agent",
              description="Send a message to the default agent and retrieve a response.",
              )
-async def stream(user_input: StreamInput, agent_id: str = DEFAULT_AGENT) -> StreamingResponse:
+async def stream(user_input: StreamInput, request: Request, agent_id: str = DEFAULT_AGENT) -> StreamingResponse:
     """
     Stream an agent's response to a user input, including intermediate messages and tokens.
 
@@ -182,9 +432,14 @@ async def stream(user_input: StreamInput, agent_id: str = DEFAULT_AGENT) -> Stre
 
     Set `stream_tokens=false` to return intermediate messages but not token-by-token.
     """
+    started_at = time.perf_counter()
+    # Admitted before the response starts, so a shed request still gets a real 429 status.
+    ticket = await _admit(user_input, request)
     return StreamingResponse(
-        stream_message_generator(user_input, agent_id),
+        _release_after(stream_message_generator(user_input, agent_id, started_at=started_at), ticket),
         media_type="text/event-stream",
+        # Also releases the slot if the client disconnects before the body is ever iterated.
+        background=BackgroundTask(_release, ticket),
     )
 
 
@@ -217,8 +472,10 @@ def history(input: ChatHistoryInput) -> ChatHistory:
 
 from langchain_core.messages import (
     AIMessage,
+    AIMessageChunk,
     BaseMessage,
     HumanMessage,
+    RemoveMessage,
     ToolMessage, SystemMessage,
 )
 from langchain_core.messages import (
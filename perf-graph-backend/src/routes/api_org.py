@@ -1,47 +1,58 @@
+import json
 import logging
-import traceback
-import uuid
-import asyncio
-import os
-
+from typing import Optional
 
-import httpx
-from bson import ObjectId
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from langchain_core.documents import Document
 
-import json
-from fastapi import APIRouter, HTTPException, Header, Request, UploadFile, Depends, Body
-import re
-from agents.agents import DEFAULT_AGENT, RECOMMENDATION_AGENT
-from core.persistence.db_factory import get_schema_db_client, get_vector_db_client
-from typing import List, Optional, Annotated
-from schema.org import User, Project
 from core import settings
-from langchain_community.document_loaders.pdf import PyPDFLoader
-from datetime import datetime
-from langchain.text_splitter import TokenTextSplitter
-from langchain_core.documents import Document
+from core.persistence.bulk_ingest import ingest_ndjson
+from core.persistence.db_factory import get_vector_db_client
+from core.similar_users import get_similar_users, profiles_changed
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
-@router.get("/vectordb", summary="Get all vector db users", tags=["User"])
-async def get_all_vectors():
-    documents = get_vector_db_client().get_all_documents()
-    cleaned_docs = []
-    for doc in documents:
-        if "payload" in doc:
-            metadata = doc["payload"]
-        else:
-            metadata = doc
-
-        if "vector" in metadata:
-            metadata.pop("vector")
-
-        cleaned_docs.append(metadata)
-
-    return cleaned_docs
+@router.get(
+    "/vectordb",
+    summary="Get vector db users, one page at a time",
+    description="Returns up to `limit` records in primary-key order. Pass the `X-Next-Cursor` response header "
+                "back as `cursor` to fetch the next page; the header is absent on the last page.",
+    tags=["User"],
+)
+def get_all_vectors(
+    response: Response,
+    cursor: Optional[str] = Query(default=None, description="Primary key of the last record of the previous page."),
+    limit: int = Query(default=1000, ge=1, le=10000),
+    include_vectors: bool = Query(default=False, description="Also return the embedding vectors."),
+):
+    vector_db_client = get_vector_db_client()
+    documents = list(vector_db_client.iter_documents(
+        batch_size=limit, include_vectors=include_vectors, after=cursor, limit=limit,
+    ))
+    if len(documents) == limit:
+        response.headers["X-Next-Cursor"] = str(documents[-1][vector_db_client.primary_field])
+    return documents
+
+
+@router.get(
+    "/vectordb/export",
+    summary="Export the whole vector db as NDJSON",
+    description="Streams every record, one JSON object per line, with constant memory regardless of collection size.",
+    tags=["User"],
+)
+def export_vectors(
+    include_vectors: bool = Query(default=False, description="Also return the embedding vectors."),
+    batch_size: int = Query(default=1000, ge=1, le=10000),
+) -> StreamingResponse:
+    documents = get_vector_db_client().iter_documents(batch_size=batch_size, include_vectors=include_vectors)
+    # A sync generator, so Starlette drains it in the threadpool instead of blocking the event loop.
+    return StreamingResponse(
+        (json.dumps(document, default=str) + "\n" for document in documents),
+        media_type="application/x-ndjson",
+    )
 
 @router.post("/user/{user_id}", summary="Create user information in vector db", tags=["User"])
 async def create_user_record(
@@ -54,11 +65,36 @@ async def create_user_record(
     vector_db_client = get_vector_db_client()
 
     document = Document(page_content=description)
-    vector_db_client.add_document(doc_id=user_id, document=document)
+    await vector_db_client.aadd_document(doc_id=user_id, document=document)
+    profiles_changed(user_id)
 
     return {"message": "User information created successfully."}
 
 
+@router.post(
+    "/users/bulk",
+    summary="Bulk create or update user information in vector db",
+    description="Accepts a streamed NDJSON body with one `{\"user_id\": ..., \"description\": ...}` object per line "
+                "and streams back one NDJSON status per row, followed by a summary line.",
+    tags=["User"],
+)
+async def bulk_upsert_user_records(request: Request) -> StreamingResponse:
+    statuses = ingest_ndjson(
+        request.stream(),
+        get_vector_db_client(),
+        batch_size=settings.BULK_INGEST_BATCH_SIZE,
+        concurrency=settings.BULK_INGEST_CONCURRENCY,
+    )
+
+    async def lines():
+        async for status in statuses:
+            if status.get("status") == "ok":
+                profiles_changed(status["user_id"])
+            yield json.dumps(status) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.put("/user/{user_id}", summary="Update user information in vector db", tags=["User"])
 async def update_user_record(
     user_id: str, 
@@ -70,14 +106,15 @@ async def update_user_record(
     vector_db_client = get_vector_db_client()
 
     document = Document(page_content=description)
-    vector_db_client.add_document(doc_id=user_id, document=document)
+    await vector_db_client.aadd_document(doc_id=user_id, document=document)
+    profiles_changed(user_id)
 
     return {"message": "User information updated successfully."}
 
 @router.get("/user/{user_id}", summary="Get user information from vector db", tags=["User"])
 async def get_user_record(user_id: str):
     client = get_vector_db_client()
-    doc = client.get_document(user_id)
+    doc = await client.aget_document(user_id)
     if doc is None:
         raise HTTPException(status_code=404, detail="User not found.")
     return {
@@ -85,3 +122,26 @@ async def get_user_record(user_id: str):
         "description": doc.page_content,
         "metadata": doc.metadata,
     }
+
+
+@router.get(
+    "/user/{user_id}/similar",
+    summary="Get the users with the most similar fragrance profiles",
+    description="Reads the precomputed similar-users graph (SIMILAR_USERS_ENABLED); no vector search runs per request. "
+                "404 if no neighbours are computed for the user yet (they are scheduled), 503 while the graph is first built.",
+    tags=["User"],
+)
+async def get_similar_user_records(user_id: str, k: int = Query(default=5, ge=1, le=settings.SIMILAR_USERS_K)):
+    similar_users = get_similar_users()
+    if similar_users is None:
+        raise HTTPException(status_code=404, detail="The similar users graph is disabled.")
+    if not similar_users.ready:
+        raise HTTPException(status_code=503, detail="The similar users graph is still being built.")
+    neighbours = await similar_users.aneighbour_profiles(user_id, k)
+    if neighbours is None:
+        raise HTTPException(status_code=404, detail="No similar users computed for this user yet.")
+    return {
+        "user_id": user_id,
+        "similar_users": [{"user_id": neighbour, "description": doc.page_content} for neighbour, doc in neighbours],
+        "built_at": similar_users.built_at,
+    }
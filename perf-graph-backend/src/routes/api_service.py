@@ -1,8 +1,11 @@
-from fastapi import Request
+from fastapi import Request, Response
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
 from agents import get_all_agent_info, DEFAULT_AGENT
 from core import settings
+from core.metrics import render_metrics
+from core.readiness import get_readiness
 from schema import ServiceMetadata
 
 router = APIRouter()
@@ -16,6 +19,27 @@ async def health_check():
     return {"status": "ok"}
 
 
+@router.get("/ready",
+            tags=["Service"],
+            summary="Check if the service can serve requests",
+            description="200 once the vector DB client, agent graphs, LLM client and token counters are warm, "
+                        "503 with the per-step warm-up status until then.",
+            )
+async def ready_check() -> JSONResponse:
+    readiness = get_readiness()
+    return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
+
+@router.get("/metrics",
+            tags=["Service"],
+            summary="Prometheus metrics",
+            description="Node, tool, vector DB and backend latencies, token usage, in-flight requests and SSE timings.",
+            )
+def metrics() -> Response:
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 @router.get("/info",
             response_model=ServiceMetadata,
             tags=["Service"],
@@ -1,10 +1,19 @@
 import logging
+import math
 import warnings
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Any, Callable
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from agents import build_agents
+from core import get_model, settings
+from core.catalog import get_catalog_replica
 from core.persistence.db_factory import init_db_clients
+from core.readiness import get_readiness
+from core.recommendation_client import close_recommendation_client
+from core.similar_users import get_similar_users
 from langchain_core._api import LangChainBetaWarning
+from routes.api_admin import router as admin_router
 from routes.api_agent import router as agent_router
 from routes.api_org import router as org_router
 from routes.api_service import router as service_router
@@ -14,15 +23,52 @@ warnings.filterwarnings("ignore", category=LangChainBetaWarning)
 logger = logging.getLogger(__name__)
 
 
+def warm_up_steps() -> list[tuple[str, Callable[[], Any]]]:
+    """What /ready waits for, in order. Each step is idempotent: requests arriving earlier build the same objects lazily."""
+    from agents.compaction import preload_token_counters
+
+    return [
+        ("vector_db", init_db_clients),
+        ("agents", build_agents),
+        ("llm", lambda: get_model(settings.DEFAULT_MODEL)),
+        ("token_counters", lambda: preload_token_counters(settings.AVAILABLE_MODELS)),
+    ]
+
+
+async def require_ready():
+    """
+    Hold requests that need the vector DB or a compiled graph until the warm-up has built them; building
+    them on first use would block the event loop (or wait on the warm-up thread's lock) instead.
+    """
+    readiness = get_readiness()
+    if readiness.started and not await readiness.wait(settings.WARM_UP_REQUEST_WAIT):
+        raise HTTPException(
+            status_code=503,
+            detail="The service is starting up.",
+            headers={"Retry-After": str(math.ceil(settings.WARM_UP_RETRY_INTERVAL))},
+        )
+
+
 @asynccontextmanager
 async def lifespan(app_ctx: FastAPI):
     """Handles startup and shutdown operations."""
+    readiness = get_readiness()
+    readiness.start(warm_up_steps())
+    catalog_replica = get_catalog_replica()
+    if catalog_replica is not None:
+        catalog_replica.start()
+    similar_users = get_similar_users()
+    if similar_users is not None:
+        similar_users.start()
     try:
-        init_db_clients()
         yield
-    except Exception as e:
-        logger.error(f"Startup failure: {e}", exc_info=True)
-        raise
+    finally:
+        await readiness.stop()
+        if catalog_replica is not None:
+            await catalog_replica.stop()
+        if similar_users is not None:
+            await similar_users.stop()
+        await close_recommendation_client()
 
 
 openapi_tags_metadata = [
@@ -30,6 +76,10 @@ openapi_tags_metadata = [
         "name": "User",
         "description": "Endpoints related to yser management .",
     },
+    {
+        "name": "Admin",
+        "description": "Operational endpoints, e.g. cache inspection and flushing.",
+    },
 ]
 
 
@@ -53,12 +103,14 @@ def create_app() -> FastAPI:
     )
 
     # Register routers per domain
-    app.include_router(agent_router)
-    app.include_router(org_router)
+    app.include_router(agent_router, dependencies=[Depends(require_ready)])
+    app.include_router(org_router, dependencies=[Depends(require_ready)])
     app.include_router(service_router)
+    app.include_router(admin_router)
 
     class HealthCheckFilter(logging.Filter):
         def filter(self, record: logging.LogRecord) -> bool:
-            return "/health" not in record.getMessage()
+            message = record.getMessage()
+            return "/health" not in message and "/ready" not in message and "/metrics" not in message
     logging.getLogger("uvicorn.access").addFilter(HealthCheckFilter())
     return app
@@ -58,6 +58,19 @@ class StreamInput(UserInput):
         description="Whether to stream LLM tokens to the client.",
         default=True,
     )
+    coalesce_tokens_ms: float = Field(
+        description="Merge streamed tokens into one event until the oldest is this many milliseconds old. "
+                    "0 sends every token as it arrives.",
+        default=0,
+        ge=0,
+        examples=[50],
+    )
+    coalesce_tokens_bytes: int = Field(
+        description="Merge streamed tokens into one event until it holds this many bytes. 0 disables the limit.",
+        default=0,
+        ge=0,
+        examples=[64],
+    )
 
 
 class ToolCall(TypedDict):
@@ -97,6 +110,12 @@ class ChatMessage(BaseModel):
         default=None,
         examples=["847c6285-8fc9-4560-a83f-4e6285809254"],
     )
+    thread_id: str | None = Field(
+        description="Thread of the conversation; send it back as `thread_id` to continue the conversation. "
+                    "Absent on answers served from the response cache, which do not start a thread.",
+        default=None,
+        examples=["847c6285-8fc9-4560-a83f-4e6285809254"],
+    )
     response_metadata: dict[str, Any] = Field(
         description="Response metadata. For example: response headers, logprobs, token counts.",
         default=None,
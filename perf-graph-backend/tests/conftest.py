@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# core's settings are read from the environment on import; nothing is sent to OpenAI.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="perf-tests-"), "embeddings.sqlite3"))
@@ -0,0 +1,93 @@
+"""
+`MilvusClientWrapper` writes are upserts that never lose the stored rows: the texts are embedded before
+anything is written, and existing collections are written with Milvus' upsert instead of delete + insert.
+The langchain vector store and the Milvus collection are replaced by in-memory stand-ins.
+"""
+from typing import Optional
+
+import pytest
+from langchain_core.documents import Document
+
+from core.persistence.vector_db import MilvusClientWrapper
+
+
+class FakeEmbeddings:
+    def __init__(self, error: Optional[Exception] = None):
+        self.error = error
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FakeCollection:
+    def __init__(self, rows: Optional[dict[str, dict]] = None):
+        self.rows = dict(rows or {})
+
+    def upsert(self, rows: list[dict], timeout: Optional[float] = None):
+        for row in rows:
+            self.rows[row["pk"]] = row
+
+    def delete(self, expr: str, **kwargs):
+        raise AssertionError("an upsert must not delete rows")
+
+
+class FakeVectorStore:
+    _primary_field = "pk"
+    _text_field = "text"
+    _vector_field = "vector"
+    timeout = None
+
+    def __init__(self, embedding_func: FakeEmbeddings, col: Optional[FakeCollection] = None):
+        self.embedding_func = embedding_func
+        self.col = col
+
+    def add_embeddings(self, texts, embeddings, metadatas, ids, batch_size):
+        self.col = FakeCollection()
+        self.col.upsert([
+            {**metadata, "pk": doc_id, "text": text, "vector": vector}
+            for doc_id, text, vector, metadata in zip(ids, texts, embeddings, metadatas)
+        ])
+
+
+def _client(vectorstore: FakeVectorStore) -> MilvusClientWrapper:
+    client = MilvusClientWrapper.__new__(MilvusClientWrapper)
+    client.vectorstore = vectorstore
+    client.partition_key = "user_id"
+    return client
+
+
+def test_failed_embedding_keeps_existing_rows():
+    old = {"pk": "u1", "text": "old profile", "vector": [1.0, 1.0], "user_id": "u1"}
+    collection = FakeCollection({"u1": old})
+    client = _client(FakeVectorStore(FakeEmbeddings(error=RuntimeError("rate limited")), collection))
+
+    with pytest.raises(RuntimeError):
+        client.add_documents(["u1", "u2"], [Document(page_content="new profile"), Document(page_content="other")])
+    with pytest.raises(RuntimeError):
+        client.add_document("u1", Document(page_content="new profile"))
+
+    assert collection.rows == {"u1": old}
+
+
+def test_rewrite_replaces_row_by_primary_key():
+    collection = FakeCollection({"u1": {"pk": "u1", "text": "old profile", "vector": [1.0, 1.0], "user_id": "u1"}})
+    client = _client(FakeVectorStore(FakeEmbeddings(), collection))
+
+    client.add_documents(["u1", "u2"], [Document(page_content="new profile"), Document(page_content="other")])
+    client.update_document("u2", Document(page_content="updated"))
+
+    assert set(collection.rows) == {"u1", "u2"}
+    assert collection.rows["u1"] == {"pk": "u1", "text": "new profile", "vector": [11.0, 1.0], "user_id": "u1"}
+    assert collection.rows["u2"]["text"] == "updated"
+
+
+def test_first_write_creates_the_collection():
+    vectorstore = FakeVectorStore(FakeEmbeddings())
+    client = _client(vectorstore)
+
+    client.add_document("u1", Document(page_content="profile"))
+
+    assert vectorstore.col.rows["u1"]["text"] == "profile"
+    assert vectorstore.col.rows["u1"]["user_id"] == "u1"
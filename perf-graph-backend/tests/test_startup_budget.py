@@ -0,0 +1,45 @@
+"""
+Startup-time budget: fails when importing the app, or becoming ready, takes longer than allowed.
+
+Runs the profile of `benchmarks/startup_profile.py` (fresh interpreters, local vector store, nothing
+sent to OpenAI) and asserts the fastest of STARTUP_BUDGET_REPEAT runs against the budgets below,
+which can be overridden from the environment for slower CI machines.
+
+Run from perf-graph-backend/:
+    python -m pytest tests/test_startup_budget.py
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+import startup_profile  # noqa: E402
+
+IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_IMPORT_MS", 3000))
+READY_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_READY_MS", 6000))
+REPEAT = int(os.environ.get("STARTUP_BUDGET_REPEAT", 3))
+
+
+@pytest.fixture(scope="module")
+def report():
+    return startup_profile._main(startup_profile.parse_args(["--repeat", str(REPEAT), "--top", "5"]))
+
+
+def test_import_within_budget(report):
+    imports = report["imports"]
+    slowest = ", ".join(f"{module['module']} {module['self_ms']:.0f} ms" for module in imports["modules"])
+    assert imports["total_ms"] <= IMPORT_BUDGET_MS, (
+        f"import main took {imports['total_ms']:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); slowest: {slowest}"
+    )
+
+
+def test_ready_within_budget(report):
+    startup = report["startup"]
+    steps = {name: step["status"] for name, step in startup["steps"].items()}
+    assert startup["ready_ms"] is not None, f"not ready within --ready-timeout: {steps}"
+    assert startup["ready_ms"] <= READY_BUDGET_MS, (
+        f"ready after {startup['ready_ms']:.0f} ms (budget {READY_BUDGET_MS:.0f} ms): {startup['steps']}"
+    )